@@ -0,0 +1,196 @@
+"""
+app/ai/analysis_queue.py — Fila assíncrona de análises do Claude.
+
+O auto-cadastro grava o animal/pessoa imediatamente (sem descrição) e
+enfileira o crop aqui. Um pool de threads consome a fila com:
+  - fila limitada (jobs excedentes são descartados, o cadastro já existe)
+  - rate limit global (token bucket, ANALYSIS_RATE_PER_MIN)
+  - retry com backoff exponencial por job
+  - circuit breaker: após N falhas seguidas, pausa as chamadas por um tempo
+
+O resultado é entregue ao callback `on_result(job, analysis)`, que grava a
+descrição no banco e notifica os clientes.
+"""
+
+import queue
+import threading
+import time
+from dataclasses import dataclass
+
+import numpy as np
+
+from app.core.config import (
+    ANALYSIS_BREAKER_COOLDOWN,
+    ANALYSIS_BREAKER_FAILURES,
+    ANALYSIS_MAX_RETRIES,
+    ANALYSIS_QUEUE_SIZE,
+    ANALYSIS_RATE_PER_MIN,
+    ANALYSIS_WORKERS,
+)
+
+BACKOFF_BASE = 2.0    # segundos; dobra a cada tentativa
+BACKOFF_MAX = 60.0
+
+
+@dataclass
+class AnalysisJob:
+    farm_id: int
+    entity_type: str      # "animal" | "person"
+    entity_id: int
+    name: str
+    crop_bgr: np.ndarray
+    camera_id: int = 0
+    camera_name: str = ""
+    attempts: int = 0
+
+
+class _TokenBucket:
+    def __init__(self, rate_per_min: float):
+        self.rate = max(rate_per_min, 0.01) / 60.0
+        self.capacity = max(1.0, self.rate * 60.0 / 6)   # rajada de ~10s
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return
+                wait = (1.0 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class _CircuitBreaker:
+    """closed -> open (após N falhas seguidas) -> half-open (após cooldown) -> closed."""
+
+    def __init__(self, failures: int, cooldown: float):
+        self.max_failures = max(1, failures)
+        self.cooldown = cooldown
+        self._failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._failures < self.max_failures:
+                return "closed"
+            return "open" if time.monotonic() - self._opened_at < self.cooldown else "half-open"
+
+    def wait_until_allowed(self) -> None:
+        while True:
+            with self._lock:
+                if self._failures < self.max_failures:
+                    return
+                remaining = self.cooldown - (time.monotonic() - self._opened_at)
+                if remaining <= 0:
+                    # half-open: deixa uma tentativa passar e re-arma o cooldown
+                    self._opened_at = time.monotonic()
+                    return
+            time.sleep(min(remaining, 5.0))
+
+    def record(self, ok: bool) -> None:
+        with self._lock:
+            if ok:
+                self._failures = 0
+            else:
+                self._failures += 1
+                if self._failures >= self.max_failures:
+                    self._opened_at = time.monotonic()
+
+
+class AnalysisQueue:
+    """Pool de workers que chamam analyzer.analyze() fora da thread da câmera."""
+
+    def __init__(self, get_analyzer, on_result):
+        self._get_analyzer = get_analyzer
+        self._on_result = on_result
+        self._queue: queue.Queue[AnalysisJob] = queue.Queue(maxsize=ANALYSIS_QUEUE_SIZE)
+        self._bucket = _TokenBucket(ANALYSIS_RATE_PER_MIN)
+        self._breaker = _CircuitBreaker(ANALYSIS_BREAKER_FAILURES, ANALYSIS_BREAKER_COOLDOWN)
+        self._threads: list[threading.Thread] = []
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {"submitted": 0, "completed": 0, "failed": 0, "retried": 0, "dropped": 0}
+
+    def _start(self) -> None:
+        with self._start_lock:
+            if self._threads:
+                return
+            for i in range(max(1, ANALYSIS_WORKERS)):
+                t = threading.Thread(target=self._worker, name=f"analysis-{i}", daemon=True)
+                t.start()
+                self._threads.append(t)
+
+    def _count(self, key: str) -> None:
+        with self._stats_lock:
+            self._stats[key] += 1
+
+    def submit(self, job: AnalysisJob) -> bool:
+        """Enfileira sem bloquear. Retorna False se a fila estiver cheia."""
+        self._start()
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            self._count("dropped")
+            print(f"[Analysis] Fila cheia — {job.entity_type} {job.name} ficará sem descrição.")
+            return False
+        self._count("submitted")
+        return True
+
+    def _retry_later(self, job: AnalysisJob) -> None:
+        delay = min(BACKOFF_MAX, BACKOFF_BASE * (2 ** (job.attempts - 1)))
+
+        def _requeue():
+            try:
+                self._queue.put_nowait(job)
+            except queue.Full:
+                self._count("dropped")
+
+        timer = threading.Timer(delay, _requeue)
+        timer.daemon = True
+        timer.start()
+        self._count("retried")
+
+    def _worker(self) -> None:
+        while True:
+            job = self._queue.get()
+            analyzer = self._get_analyzer()
+            if not analyzer.available:
+                continue
+            self._breaker.wait_until_allowed()
+            self._bucket.acquire()
+            job.attempts += 1
+            try:
+                analysis = analyzer.analyze(job.crop_bgr, raise_errors=True)
+            except Exception as e:
+                self._breaker.record(False)
+                if job.attempts <= ANALYSIS_MAX_RETRIES:
+                    self._retry_later(job)
+                else:
+                    self._count("failed")
+                    print(f"[Analysis] Desistindo de {job.name} após {job.attempts} tentativas: {e}")
+                continue
+            self._breaker.record(True)
+            try:
+                self._on_result(job, analysis)
+                self._count("completed")
+            except Exception as e:
+                self._count("failed")
+                print(f"[Analysis] Falha ao gravar descrição de {job.name}: {e}")
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            out = dict(self._stats)
+        out.update({
+            "queue_depth":   self._queue.qsize(),
+            "queue_size":    self._queue.maxsize,
+            "workers":       len(self._threads),
+            "breaker_state": self._breaker.state,
+        })
+        return out
@@ -0,0 +1,308 @@
+"""
+app/ai/ann.py — Índice aproximado (IVF) para bancos de identidade grandes.
+
+IVF em NumPy puro: os vetores são particionados em `nlist` listas por
+k-means esférico; a busca compara a query só com os `nprobe` centróides
+mais próximos e varre apenas as listas correspondentes.
+
+O índice é mantido incrementalmente pelo EmbeddingBank (add/remove/update
+por linha). Enquanto o banco tem menos de `min_train` vetores, search()
+retorna None e o banco usa a busca exata; o k-means é refeito quando o banco
+cresce 4x desde o último treino. O re-treino roda em uma thread sobre uma
+cópia da matriz — quem adiciona (cadastro automático, sob o lock do banco)
+não espera o k-means. Até a troca, as buscas seguem no índice atual (ou na
+busca exata) e as alterações feitas nesse meio tempo são reaplicadas no
+índice novo antes de ele entrar em uso.
+
+Knobs:
+  nprobe   — listas varridas por consulta (recall x latência)
+  storage  — dtype dos vetores nas listas (float32 ou float16, metade da memória)
+  rerank_k — re-ranqueia os k melhores candidatos com o vetor float32 exato
+             do banco (útil com storage=float16; 0 desativa)
+"""
+
+import threading
+
+import numpy as np
+
+RETRAIN_GROWTH = 4          # re-treina quando o banco cresce 4x
+MAX_TRAIN_SAMPLE = 20_000   # amostra máxima usada no k-means
+
+
+class _InvertedList:
+    __slots__ = ("vecs", "rows", "size")
+
+    def __init__(self, dim: int, dtype, capacity: int = 16):
+        self.vecs = np.empty((capacity, dim), dtype=dtype)
+        self.rows = np.empty(capacity, dtype=np.int64)
+        self.size = 0
+
+    def append(self, row: int, vec: np.ndarray) -> int:
+        if self.size == len(self.rows):
+            cap = len(self.rows) * 2
+            vecs = np.empty((cap, self.vecs.shape[1]), dtype=self.vecs.dtype)
+            vecs[:self.size] = self.vecs[:self.size]
+            rows = np.empty(cap, dtype=np.int64)
+            rows[:self.size] = self.rows[:self.size]
+            self.vecs, self.rows = vecs, rows
+        pos = self.size
+        self.vecs[pos] = vec
+        self.rows[pos] = row
+        self.size += 1
+        return pos
+
+
+class IVFIndex:
+    """Índice IVF-flat incremental, endereçado pela linha do EmbeddingBank."""
+
+    def __init__(
+        self,
+        nprobe: int = 8,
+        rerank_k: int = 0,
+        min_train: int = 2048,
+        storage: str = "float32",
+        kmeans_iters: int = 10,
+        seed: int = 0,
+    ):
+        self.nprobe = max(1, nprobe)
+        self.rerank_k = max(0, rerank_k)
+        self.min_train = max(1, min_train)
+        self.dtype = np.dtype(storage)
+        self.kmeans_iters = kmeans_iters
+        self._rng = np.random.default_rng(seed)
+        self._ready_lock = threading.Lock()
+        self._generation = 0
+        self.reset()
+
+    def reset(self) -> None:
+        self._centroids: np.ndarray | None = None
+        self._lists: list[_InvertedList] = []
+        self._where: dict[int, tuple[int, int]] = {}   # linha -> (lista, posição)
+        self._count = 0
+        self._trained_at = 0
+        # Re-treino em segundo plano: thread, alterações desde a cópia e resultado pronto.
+        # A geração invalida o resultado de um re-treino iniciado antes do reset.
+        self._retrain: threading.Thread | None = None
+        self._journal: list[tuple] = []
+        with self._ready_lock:
+            self._generation += 1
+            self._ready: tuple | None = None
+
+    @property
+    def trained(self) -> bool:
+        return self._centroids is not None
+
+    @property
+    def nlist(self) -> int:
+        return len(self._lists)
+
+    @property
+    def retraining(self) -> bool:
+        return self._retrain is not None
+
+    # --- Manutenção (chamada pelo EmbeddingBank sob o lock dele) ---
+
+    def add(self, row: int, vec: np.ndarray, matrix: np.ndarray) -> None:
+        """`matrix` é a view [0, size) do banco, já contendo `vec` em `row`."""
+        self._swap_retrained()
+        self._count += 1
+        if self._retrain is not None:
+            self._journal.append(("add", row, vec.copy()))
+        elif self._count >= max(self.min_train, self._trained_at * RETRAIN_GROWTH):
+            self._start_retrain(matrix)   # a cópia já contém `row`
+        if self.trained:
+            self._insert(row, vec)
+
+    def update(self, row: int, vec: np.ndarray) -> None:
+        """Vetor da linha foi sobrescrito (upsert por nome)."""
+        self._swap_retrained()
+        if self._retrain is not None:
+            self._journal.append(("update", row, vec.copy()))
+        if self.trained:
+            self._apply(("update", row, vec))
+
+    def remove(self, row: int, last: int) -> None:
+        """Linha `row` removida; o banco moveu a linha `last` para `row`."""
+        self._swap_retrained()
+        self._count -= 1
+        if self._retrain is not None:
+            self._journal.append(("remove", row, last))
+        if self.trained:
+            self._apply(("remove", row, last))
+
+    def rebuild(self, matrix: np.ndarray) -> None:
+        """Reconstrução em lote (carga completa do banco)."""
+        self.reset()
+        self._count = len(matrix)
+        if self._count >= self.min_train:
+            self.fit(matrix)
+
+    def fit(self, matrix: np.ndarray) -> None:
+        """
+        (Re)treina os centróides com k-means esférico e reconstrói as listas,
+        de forma síncrona. Descarta qualquer re-treino em segundo plano.
+        """
+        built = _build(matrix, self.dtype, self.kmeans_iters, self._rng)
+        self.reset()
+        self._count = len(matrix)
+        if built is not None:
+            self._centroids, self._lists, self._where = built
+            self._trained_at = len(matrix)
+
+    # --- Busca ---
+
+    def search(self, query: np.ndarray, matrix: np.ndarray) -> tuple[int, float] | None:
+        """
+        Retorna (linha, similaridade) do melhor candidato, ou None se o
+        índice ainda não foi treinado (o chamador deve usar a busca exata).
+        """
+        self._swap_retrained()
+        if not self.trained:
+            return None
+        cs = self._centroids @ query
+        nprobe = min(self.nprobe, len(cs))
+        probe = np.argpartition(cs, -nprobe)[-nprobe:]
+
+        rows, scores = [], []
+        for li in probe:
+            lst = self._lists[li]
+            if lst.size:
+                rows.append(lst.rows[:lst.size])
+                scores.append(lst.vecs[:lst.size].astype(np.float32, copy=False) @ query)
+        if not rows:
+            return None
+        rows = np.concatenate(rows)
+        scores = np.concatenate(scores)
+
+        if self.rerank_k and len(scores) > 1:
+            k = min(self.rerank_k, len(scores))
+            top = rows[np.argpartition(scores, -k)[-k:]]
+            exact = matrix[top] @ query
+            best = int(np.argmax(exact))
+            return int(top[best]), float(exact[best])
+        best = int(np.argmax(scores))
+        return int(rows[best]), float(scores[best])
+
+    # --- Re-treino em segundo plano ---
+
+    def _start_retrain(self, matrix: np.ndarray) -> None:
+        snapshot = matrix.copy()
+        rng = np.random.default_rng(int(self._rng.integers(1 << 62)))   # Generator não é thread-safe
+        self._retrain = threading.Thread(
+            target=self._retrain_worker, args=(self._generation, snapshot, rng),
+            name="ivf-retrain", daemon=True,
+        )
+        self._retrain.start()
+
+    def _retrain_worker(self, generation: int, snapshot: np.ndarray, rng: np.random.Generator) -> None:
+        try:
+            built = _build(snapshot, self.dtype, self.kmeans_iters, rng)
+        except Exception as e:
+            print(f"[IVFIndex] Falha no re-treino ({len(snapshot)} vetores): {e}")
+            built = None
+        with self._ready_lock:
+            if generation == self._generation:
+                self._ready = (len(snapshot), built)
+
+    def _swap_retrained(self) -> None:
+        """Troca pelo índice re-treinado, se pronto, reaplicando as alterações feitas durante o treino."""
+        if self._ready is None:
+            return
+        with self._ready_lock:
+            ready, self._ready = self._ready, None
+        if ready is None:
+            return
+        n, built = ready
+        journal, self._journal = self._journal, []
+        self._retrain = None
+        if built is None:
+            # Falhou (ou vetores de menos): tenta de novo só no próximo crescimento.
+            self._trained_at = max(self._trained_at, n)
+            return
+        self._centroids, self._lists, self._where = built
+        self._trained_at = n
+        for op in journal:
+            self._apply(op)
+
+    # --- Internos ---
+
+    def _apply(self, op: tuple) -> None:
+        kind, row, arg = op
+        if kind == "add":
+            self._insert(row, arg)
+        elif kind == "update":
+            self._drop(row)
+            self._insert(row, arg)
+        else:
+            last = arg
+            self._drop(row)
+            if last != row:
+                li, pos = self._where.pop(last)
+                self._lists[li].rows[pos] = row
+                self._where[row] = (li, pos)
+
+
+    def _insert(self, row: int, vec: np.ndarray) -> None:
+        li = int(np.argmax(self._centroids @ vec))
+        self._where[row] = (li, self._lists[li].append(row, vec))
+
+    def _drop(self, row: int) -> None:
+        li, pos = self._where.pop(row)
+        lst = self._lists[li]
+        last = lst.size - 1
+        if pos != last:
+            lst.vecs[pos] = lst.vecs[last]
+            moved = int(lst.rows[last])
+            lst.rows[pos] = moved
+            self._where[moved] = (li, pos)
+        lst.size -= 1
+
+
+def _build(matrix: np.ndarray, dtype, iters: int, rng: np.random.Generator):
+    """Centróides, listas invertidas e mapa linha -> (lista, posição); None se houver vetores de menos."""
+    n, dim = matrix.shape
+    nlist = max(16, int(np.sqrt(n)))
+    if n < nlist:
+        return None
+    sample = matrix
+    if n > MAX_TRAIN_SAMPLE:
+        sample = matrix[rng.choice(n, MAX_TRAIN_SAMPLE, replace=False)]
+    centroids = _spherical_kmeans(sample, nlist, iters, rng)
+
+    lists = [_InvertedList(dim, dtype) for _ in range(nlist)]
+    where = {}
+    assign = _assign(matrix, centroids)
+    for row in range(n):
+        li = int(assign[row])
+        where[row] = (li, lists[li].append(row, matrix[row]))
+    return centroids, lists, where
+
+
+def _assign(x: np.ndarray, centroids: np.ndarray, chunk: int = 8192) -> np.ndarray:
+    out = np.empty(len(x), dtype=np.int64)
+    for start in range(0, len(x), chunk):
+        out[start:start + chunk] = np.argmax(x[start:start + chunk] @ centroids.T, axis=1)
+    return out
+
+
+def _spherical_kmeans(x: np.ndarray, k: int, iters: int, rng: np.random.Generator) -> np.ndarray:
+    centroids = x[rng.choice(len(x), k, replace=False)].astype(np.float32)
+    for _ in range(iters):
+        assign = _assign(x, centroids)
+        order = np.argsort(assign, kind="stable")
+        labels, starts = np.unique(assign[order], return_index=True)
+        sums = np.add.reduceat(x[order], starts, axis=0)
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        ok = norms[:, 0] > 1e-8
+        centroids[labels[ok]] = sums[ok] / norms[ok]   # clusters vazios mantêm o centróide
+    return centroids
+
+
+def make_index(kind: str, **kwargs) -> IVFIndex | None:
+    """Fábrica usada pelo DualIdentifier. 'exact' (ou vazio) = sem índice."""
+    kind = (kind or "exact").lower()
+    if kind == "exact":
+        return None
+    if kind == "ivf":
+        return IVFIndex(**kwargs)
+    raise ValueError(f"Índice ANN desconhecido: {kind!r} (use 'exact' ou 'ivf')")
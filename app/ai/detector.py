@@ -6,8 +6,22 @@ Classes COCO detectadas:
   - 14: bird  | 15: cat   | 16: dog   | 17: horse
   - 18: sheep | 19: cow   | 20: elephant | 21: bear
   - 22: zebra | 23: giraffe
+
+Engines (DETECTOR_ENGINE):
+  - torch          — ultralytics em PyTorch eager (padrão)
+  - onnx           — modelo exportado para ONNX (ONNX Runtime, batch dinâmico)
+  - openvino       — IR do OpenVINO (FP32)
+  - openvino-int8  — IR do OpenVINO quantizado em INT8, calibrado com o
+                     dataset local de DETECTOR_INT8_DATA (obrigatório: sem ele
+                     o ultralytics tentaria baixar o dataset padrão)
+O artefato exportado fica em cache em MODELS_DIR, com uma chave derivada do
+checkpoint (tamanho + mtime) e do dataset de calibração — trocar o .pt com o
+mesmo nome gera uma nova exportação. Os próximos startups carregam direto do
+cache. O formato de saída (Detection) é o mesmo.
 """
 
+import hashlib
+import shutil
 import sys
 from pathlib import Path
 
@@ -23,6 +37,87 @@ COCO_PERSON_CLASS = 0
 COCO_ANIMAL_CLASSES = {14, 15, 16, 17, 18, 19, 20, 21, 22, 23}
 COCO_DETECT_CLASSES = [COCO_PERSON_CLASS] + sorted(COCO_ANIMAL_CLASSES)
 
+IMGSZ = 640
+ENGINES = ("torch", "onnx", "openvino", "openvino-int8")
+_EXPORT_SUFFIX = {
+    "onnx":          ".onnx",
+    "openvino":      "_openvino_model",       # ultralytics reconhece o diretório pelo sufixo
+    "openvino-int8": "_int8_openvino_model",
+}
+
+
+def _cache_key(model_path: str, int8_data: str = "") -> str:
+    """Identifica o checkpoint (tamanho + mtime; nome se ainda não baixado) e o dataset de calibração."""
+    src = Path(model_path)
+    ident = f"{src.resolve()}:{src.stat().st_size}:{src.stat().st_mtime_ns}" if src.is_file() else model_path
+    if int8_data:
+        data = Path(int8_data)
+        ident += f"|{data.resolve()}:{data.stat().st_mtime_ns}" if data.is_file() else f"|{int8_data}"
+    return hashlib.sha1(ident.encode()).hexdigest()[:10]
+
+
+def load_yolo(model_path: str, engine: str = "torch", cache_dir: str | Path = "models",
+              int8_data: str = "") -> YOLO:
+    """
+    Carrega o YOLO no engine pedido, exportando e cacheando o artefato
+    na primeira vez. Em caso de falha na exportação, usa o modelo torch —
+    exceto no openvino-int8, que exige `int8_data` (dataset YAML de
+    calibração local) e levanta erro em vez de rodar outro engine.
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"Engine inválido: {engine!r} (use {', '.join(ENGINES)})")
+    if engine == "torch":
+        return YOLO(model_path)
+    int8 = engine == "openvino-int8"
+    if int8 and not int8_data:
+        raise ValueError("openvino-int8 requer DETECTOR_INT8_DATA (dataset YAML de calibração local)")
+
+    cache_dir = Path(cache_dir)
+    key = _cache_key(model_path, int8_data if int8 else "")
+    target = cache_dir / f"{Path(model_path).stem}_{key}{_EXPORT_SUFFIX[engine]}"
+    if not target.exists():
+        print(f"[Detector] Exportando {model_path} para {engine}: {target}")
+        try:
+            exported = YOLO(model_path).export(
+                format="onnx" if engine == "onnx" else "openvino",
+                imgsz=IMGSZ,
+                dynamic=True,
+                int8=int8,
+                **({"data": int8_data} if int8 else {}),
+                verbose=False,
+            )
+            cache_dir.mkdir(parents=True, exist_ok=True)
+            shutil.move(str(exported), str(target))
+        except Exception as e:
+            if int8:
+                # Sem fallback: cair para torch esconderia que o INT8 nunca roda
+                raise RuntimeError(f"Exportação openvino-int8 falhou: {e}") from e
+            print(f"[Detector] Exportação falhou ({e}) — usando engine torch.")
+            return YOLO(model_path)
+    return YOLO(str(target), task="detect")
+
+
+def scale_detections(detections: list[Detection], sx: float, sy: float) -> list[Detection]:
+    """
+    Mapeia caixas detectadas num frame reduzido (ou sub-stream) para as
+    coordenadas do frame principal. Preserva entity_type.
+    """
+    if sx == 1.0 and sy == 1.0:
+        return detections
+    out = []
+    for d in detections:
+        det = Detection(
+            x1=int(round(d.x1 * sx)),
+            y1=int(round(d.y1 * sy)),
+            x2=int(round(d.x2 * sx)),
+            y2=int(round(d.y2 * sy)),
+            confidence=d.confidence,
+            class_id=d.class_id,
+        )
+        det.entity_type = getattr(d, "entity_type", "animal")
+        out.append(det)
+    return out
+
 
 class DualDetector:
     """
@@ -40,31 +135,51 @@ class DualDetector:
         conf_threshold: float = 0.40,
         iou_threshold: float = 0.45,
         device: str = "",
+        engine: str = "torch",
+        cache_dir: str | Path = "models",
+        int8_data: str = "",
     ):
         self.conf_threshold = conf_threshold
         self.iou_threshold = iou_threshold
-        self.device = device
-        self.model = YOLO(model_path)
+        self.engine = engine
+        # Modelos exportados rodam em CPU (ONNX Runtime / OpenVINO)
+        self.device = device if engine == "torch" else "cpu"
+        self.model = load_yolo(model_path, engine, cache_dir, int8_data)
 
     def detect(self, bgr_frame: np.ndarray) -> list[Detection]:
         """
         Detecta pessoas e animais no frame BGR.
         Retorna lista de Detection com entity_type definido.
         """
+        return self.detect_batch([bgr_frame])[0]
+
+    def detect_batch(self, bgr_frames: list[np.ndarray]) -> list[list[Detection]]:
+        """
+        Detecta em vários frames com um único predict do YOLO.
+        Retorna uma lista de detecções por frame, na ordem de entrada.
+        """
+        if not bgr_frames:
+            return []
         results = self.model.predict(
-            source=bgr_frame,
+            source=bgr_frames,
             conf=self.conf_threshold,
             iou=self.iou_threshold,
             classes=COCO_DETECT_CLASSES,
+            imgsz=IMGSZ,
             verbose=False,
             device=self.device,
         )
+        out = [self._to_detections(r) for r in results] if results else []
+        out.extend([] for _ in range(len(bgr_frames) - len(out)))
+        return out
 
+    @staticmethod
+    def _to_detections(result) -> list[Detection]:
         detections: list[Detection] = []
-        if not results or results[0].boxes is None:
+        if result.boxes is None:
             return detections
 
-        boxes = results[0].boxes
+        boxes = result.boxes
         for i in range(len(boxes)):
             xyxy = boxes.xyxy[i].cpu().numpy().astype(int)
             conf = float(boxes.conf[i].cpu().numpy())
@@ -82,8 +197,8 @@ class DualDetector:
 
         return detections
 
+    @staticmethod
     def crop(
-        self,
         bgr_frame: np.ndarray,
         det: Detection,
         padding: int = 10,
@@ -9,6 +9,7 @@ from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent))
 from embedder import CattleEmbedder  # noqa: E402
+from app.core.config import EMBED_BACKEND, EMBED_MAX_BATCH, MODELS_DIR
 
 # Instância singleton — carregada uma vez no startup do FastAPI
 _embedder: CattleEmbedder | None = None
@@ -17,5 +18,9 @@ _embedder: CattleEmbedder | None = None
 def get_embedder() -> CattleEmbedder:
     global _embedder
     if _embedder is None:
-        _embedder = CattleEmbedder()
+        _embedder = CattleEmbedder(
+            max_batch_size=EMBED_MAX_BATCH,
+            backend=EMBED_BACKEND,
+            model_dir=MODELS_DIR,
+        )
     return _embedder
@@ -4,6 +4,7 @@ app/ai/identifier.py — DualIdentifier: bancos separados para animais e pessoas
 Cosine similarity via dot product (embeddings L2-normalizados).
 """
 
+import threading
 from dataclasses import dataclass, field
 
 import numpy as np
@@ -21,79 +22,209 @@ class IdentityMatch:
     description: str = field(default="")
 
 
+class EmbeddingBank:
+    """
+    Banco de embeddings em matriz float32 contígua pré-alocada.
+
+    Linhas [0, size) da matriz são válidas; ids, nomes e descrições ficam em
+    arrays paralelos indexados pela mesma linha. Inserções crescem a
+    capacidade em dobro (custo amortizado O(1)) e remoções trocam a linha
+    removida pela última (swap-remove, O(1)). A busca usa uma view da matriz,
+    sem cópia nem np.stack por consulta.
+
+    Um índice aproximado opcional (ver app/ai/ann.py) é mantido em sincronia
+    com as linhas e consultado antes da busca exata.
+    """
+
+    def __init__(self, capacity: int = 64, index=None):
+        self._capacity = max(1, capacity)
+        self.index = index
+        self._matrix: np.ndarray | None = None   # alocada no primeiro add (dim inferida)
+        self._ids = np.empty(self._capacity, dtype=np.int64)
+        self._names: list[str] = []
+        self._descriptions: list[str] = []
+        self._rows: dict[str, int] = {}          # nome -> linha
+        self._lock = threading.Lock()
+
+    # --- Internos (chamar com _lock adquirido) ---
+
+    def _reserve(self, size: int, dim: int) -> None:
+        if self._matrix is None:
+            self._capacity = max(self._capacity, size)
+            self._matrix = np.empty((self._capacity, dim), dtype=np.float32)
+            self._ids = np.empty(self._capacity, dtype=np.int64)
+            return
+        if size <= self._capacity:
+            return
+        new_cap = self._capacity
+        while new_cap < size:
+            new_cap *= 2
+        n = len(self._names)
+        matrix = np.empty((new_cap, self._matrix.shape[1]), dtype=np.float32)
+        matrix[:n] = self._matrix[:n]
+        ids = np.empty(new_cap, dtype=np.int64)
+        ids[:n] = self._ids[:n]
+        self._matrix, self._ids, self._capacity = matrix, ids, new_cap
+
+    def _put(self, entity_id: int, name: str, embedding: np.ndarray, description: str) -> bool:
+        """Grava a linha; retorna True se a identidade é nova."""
+        row = self._rows.get(name)
+        is_new = row is None
+        if is_new:
+            row = len(self._names)
+            self._reserve(row + 1, embedding.shape[0])
+            self._names.append(name)
+            self._descriptions.append(description)
+            self._rows[name] = row
+        else:
+            self._descriptions[row] = description
+        self._matrix[row] = embedding
+        self._ids[row] = entity_id
+        return is_new
+
+    # --- Escrita ---
+
+    def load(self, records: list[dict]) -> None:
+        """Substitui todo o conteúdo do banco pelos registros informados."""
+        with self._lock:
+            self._matrix = None
+            self._names.clear()
+            self._descriptions.clear()
+            self._rows.clear()
+            if records:
+                self._reserve(len(records), records[0]["embedding"].shape[0])
+                for r in records:
+                    self._put(r["id"], r["name"], r["embedding"], r.get("description", ""))
+            if self.index is not None:
+                n = len(self._names)
+                self.index.rebuild(self._matrix[:n] if n else np.empty((0, 0), np.float32))
+
+    def add(self, entity_id: int, name: str, embedding: np.ndarray, description: str = "") -> None:
+        """Insere ou sobrescreve (por nome) uma identidade."""
+        with self._lock:
+            is_new = self._put(entity_id, name, embedding, description)
+            if self.index is not None:
+                row = self._rows[name]
+                if is_new:
+                    self.index.add(row, self._matrix[row], self._matrix[:row + 1])
+                else:
+                    self.index.update(row, self._matrix[row])
+
+    def remove(self, name: str) -> None:
+        with self._lock:
+            row = self._rows.pop(name, None)
+            if row is None:
+                return
+            last = len(self._names) - 1
+            if row != last:
+                moved = self._names[last]
+                self._matrix[row] = self._matrix[last]
+                self._ids[row] = self._ids[last]
+                self._names[row] = moved
+                self._descriptions[row] = self._descriptions[last]
+                self._rows[moved] = row
+            self._names.pop()
+            self._descriptions.pop()
+            if self.index is not None:
+                self.index.remove(row, last)
+
+    def set_description(self, name: str, description: str) -> None:
+        with self._lock:
+            row = self._rows.get(name)
+            if row is not None:
+                self._descriptions[row] = description
+
+    # --- Leitura ---
+
+    def search(self, query: np.ndarray) -> tuple[int, str, float, str] | None:
+        """
+        Retorna (entity_id, nome, similaridade, descrição) do melhor match,
+        ou None se o banco estiver vazio.
+        """
+        with self._lock:
+            n = len(self._names)
+            if n == 0:
+                return None
+            hit = self.index.search(query, self._matrix[:n]) if self.index is not None else None
+            if hit is not None:
+                best, sim = hit
+            else:
+                sims = self._matrix[:n] @ query
+                best = int(np.argmax(sims))
+                sim = float(sims[best])
+            return (
+                int(self._ids[best]),
+                self._names[best],
+                sim,
+                self._descriptions[best],
+            )
+
+    def max_similarity(self, query: np.ndarray) -> float:
+        """Maior similaridade contra o banco (0.0 se vazio)."""
+        hit = self.search(query)
+        return hit[2] if hit else 0.0
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+
 class DualIdentifier:
     """
     Dois bancos in-memory independentes: animais e pessoas.
     Operações thread-safe para leitura concorrente do stream MJPEG.
+
+    index_factory (opcional) cria um índice aproximado por banco
+    (ex.: app.ai.ann.make_index); None mantém a busca exata.
     """
 
-    def __init__(self, threshold: float = COSINE_THRESHOLD):
+    def __init__(self, threshold: float = COSINE_THRESHOLD, index_factory=None):
         self.threshold = threshold
-        self._animals: dict[str, dict] = {}
-        self._people: dict[str, dict] = {}
+        self._animals = EmbeddingBank(index=index_factory() if index_factory else None)
+        self._people = EmbeddingBank(index=index_factory() if index_factory else None)
 
     # --- Carregamento ---
 
     def load_animals(self, records: list[dict]) -> None:
-        self._animals.clear()
-        for r in records:
-            self._animals[r["name"]] = {
-                "id":          r["id"],
-                "embedding":   r["embedding"],
-                "description": r.get("description", ""),
-            }
+        self._animals.load(records)
 
     def load_people(self, records: list[dict]) -> None:
-        self._people.clear()
-        for r in records:
-            self._people[r["name"]] = {
-                "id":          r["id"],
-                "embedding":   r["embedding"],
-                "description": r.get("description", ""),
-            }
+        self._people.load(records)
 
     # --- Hot-reload (após cadastro sem reiniciar) ---
 
     def add_animal(self, entity_id: int, name: str, embedding: np.ndarray, description: str = "") -> None:
-        self._animals[name] = {
-            "id":          entity_id,
-            "embedding":   embedding.copy(),
-            "description": description,
-        }
+        self._animals.add(entity_id, name, embedding, description)
 
     def add_person(self, entity_id: int, name: str, embedding: np.ndarray, description: str = "") -> None:
-        self._people[name] = {
-            "id":          entity_id,
-            "embedding":   embedding.copy(),
-            "description": description,
-        }
+        self._people.add(entity_id, name, embedding, description)
 
     def remove_animal(self, name: str) -> None:
-        self._animals.pop(name, None)
+        self._animals.remove(name)
 
     def remove_person(self, name: str) -> None:
-        self._people.pop(name, None)
+        self._people.remove(name)
+
+    def update_description(self, entity_type: str, name: str, description: str) -> None:
+        self._bank(entity_type).set_description(name, description)
 
     # --- Identificação ---
 
-    def _identify(self, bank: dict, query: np.ndarray) -> IdentityMatch:
-        if not bank:
-            return IdentityMatch(name=UNKNOWN_LABEL, entity_id=-1, similarity=0.0, is_known=False)
+    def _bank(self, entity_type: str) -> EmbeddingBank:
+        return self._people if entity_type == "person" else self._animals
 
-        names = list(bank.keys())
-        matrix = np.stack([bank[n]["embedding"] for n in names], axis=0)
-        sims = matrix @ query
-        best_idx = int(np.argmax(sims))
-        best_name = names[best_idx]
-        best_sim = float(sims[best_idx])
+    def _identify(self, bank: EmbeddingBank, query: np.ndarray) -> IdentityMatch:
+        hit = bank.search(query)
+        if hit is None:
+            return IdentityMatch(name=UNKNOWN_LABEL, entity_id=-1, similarity=0.0, is_known=False)
 
+        entity_id, best_name, best_sim, description = hit
         if best_sim >= self.threshold:
             return IdentityMatch(
                 name=best_name,
-                entity_id=bank[best_name]["id"],
+                entity_id=entity_id,
                 similarity=best_sim,
                 is_known=True,
-                description=bank[best_name]["description"],
+                description=description,
             )
         return IdentityMatch(
             name=UNKNOWN_LABEL, entity_id=-1, similarity=best_sim, is_known=False
@@ -110,6 +241,10 @@ class DualIdentifier:
             return self.identify_person(query)
         return self.identify_animal(query)
 
+    def max_similarity(self, query: np.ndarray, entity_type: str) -> float:
+        """Maior similaridade no banco do tipo (usado pelo guard de duplicatas)."""
+        return self._bank(entity_type).max_similarity(query)
+
     # --- Contagens ---
 
     @property
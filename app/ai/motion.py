@@ -0,0 +1,70 @@
+"""
+app/ai/motion.py — Gate de movimento barato antes da detecção.
+
+Compara uma versão reduzida (cinza, borrada) do frame com a referência do
+último frame que passou pelo YOLO. Se a fração de pixels alterados ficar
+abaixo de `threshold`, o frame é considerado estático e o worker reaproveita
+as detecções anteriores. A comparação é contra o último frame processado
+(e não o anterior), para que movimentos lentos acumulem até disparar.
+
+Uma detecção completa é forçada a cada `force_interval` segundos.
+"""
+
+import time
+
+import cv2
+import numpy as np
+
+GATE_WIDTH = 160       # largura do frame reduzido usado na comparação
+PIXEL_DELTA = 25       # diferença de intensidade para contar um pixel como alterado
+
+
+class MotionGate:
+    def __init__(self, threshold: float = 0.002, force_interval: float = 10.0):
+        """
+        threshold — fração de pixels alterados que conta como movimento
+                    (menor = mais sensível; 0 desativa o gate).
+        """
+        self.threshold = threshold
+        self.force_interval = force_interval
+        self._reference: np.ndarray | None = None
+        self._last_full = 0.0
+        self.frames = 0
+        self.skipped = 0
+
+    def _small(self, bgr_frame: np.ndarray) -> np.ndarray:
+        h, w = bgr_frame.shape[:2]
+        size = (GATE_WIDTH, max(1, int(h * GATE_WIDTH / w)))
+        gray = cv2.cvtColor(cv2.resize(bgr_frame, size, interpolation=cv2.INTER_AREA), cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(gray, (5, 5), 0)
+
+    def should_process(self, bgr_frame: np.ndarray) -> bool:
+        """True se o frame deve passar pela detecção completa."""
+        self.frames += 1
+        if self.threshold <= 0:
+            return True
+        small = self._small(bgr_frame)
+        now = time.monotonic()
+        if (
+            self._reference is None
+            or self._reference.shape != small.shape
+            or now - self._last_full >= self.force_interval
+        ):
+            changed = True
+        else:
+            diff = cv2.absdiff(small, self._reference)
+            changed = bool(np.count_nonzero(diff > PIXEL_DELTA) >= self.threshold * diff.size)
+        if changed:
+            self._reference = small
+            self._last_full = now
+        else:
+            self.skipped += 1
+        return changed
+
+    def stats(self) -> dict:
+        return {
+            "motion_threshold": self.threshold,
+            "frames":           self.frames,
+            "frames_skipped":   self.skipped,
+            "skip_ratio":       round(self.skipped / self.frames, 4) if self.frames else 0.0,
+        }
@@ -0,0 +1,230 @@
+"""
+app/ai/scheduler.py — Serviço de inferência compartilhado entre câmeras.
+
+Um único DualDetector e um único CattleEmbedder por processo. Os workers
+enviam pedidos de detecção (um frame) ou de embedding (lista de crops) e
+recebem um Future; uma thread dedicada agrupa os pedidos pendentes de todas
+as câmeras até INFER_MAX_BATCH pedidos ou até INFER_MAX_WAIT_MS de espera
+(o que vier primeiro), roda o YOLO uma vez para todos os frames do lote e
+um único extract_batch() para todos os crops.
+
+Detecção e embedding são pedidos separados para que o worker possa rastrear
+as detecções (app/ai/tracker.py) e embedar apenas os crops necessários.
+
+Falhas ficam contidas: os grupos de detecção e de embedding rodam
+separadamente e, se um grupo falhar, seus pedidos são refeitos um a um —
+só o pedido problemático (ex.: um frame corrompido de uma câmera) recebe a
+exceção. Falha ao carregar um modelo é guardada e a carga só é tentada de
+novo após um backoff exponencial (MODEL_RETRY_MIN..MODEL_RETRY_MAX).
+"""
+
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+from dataclasses import dataclass
+
+import numpy as np
+
+from app.ai.detector import DualDetector
+from app.ai.embedder import get_embedder
+from app.core.config import (DETECTION_CONF, DETECTOR_ENGINE, DETECTOR_INT8_DATA, INFER_MAX_BATCH,
+                             INFER_MAX_WAIT_MS, MODELS_DIR, YOLO_MODEL)
+
+MODEL_RETRY_MIN = 5.0     # segundos até a primeira nova tentativa de carregar um modelo
+MODEL_RETRY_MAX = 300.0   # teto do backoff
+
+
+class ModelUnavailableError(RuntimeError):
+    """O modelo não pôde ser carregado; nova tentativa só após o backoff."""
+
+
+@dataclass
+class _Request:
+    kind: str                     # "detect" | "embed"
+    payload: object               # frame BGR | list de crops BGR
+    future: Future
+    enqueued_at: float
+
+
+class InferenceScheduler:
+    """
+    Fila única de inferência com batching dinâmico.
+
+    Thread-safe: detect()/embed() podem ser chamados de qualquer thread de câmera.
+    Os modelos são carregados na própria thread do scheduler, no primeiro lote.
+    """
+
+    def __init__(self, max_batch: int = INFER_MAX_BATCH, max_wait_ms: float = INFER_MAX_WAIT_MS):
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self._queue: queue.Queue[_Request] = queue.Queue()
+        self._models: dict[str, object] = {}                                # kind -> DualDetector | embedder
+        self._load_errors: dict[str, tuple[Exception, float, float]] = {}   # kind -> (erro, retry_at, delay)
+        self._thread: threading.Thread | None = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._batch_sizes: Counter[int] = Counter()
+        self._frames = 0
+        self._crops = 0
+        self._requests = 0
+        self._failed = 0
+        self._wait_total = 0.0
+        self._infer_total = 0.0
+
+    def start(self) -> None:
+        with self._start_lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._loop, name="inference", daemon=True)
+            self._thread.start()
+
+    def submit(self, kind: str, payload) -> Future:
+        """Enfileira um pedido ("detect" ou "embed") e retorna o Future do resultado."""
+        self.start()
+        fut: Future = Future()
+        self._queue.put(_Request(kind, payload, fut, time.perf_counter()))
+        return fut
+
+    def detect(self, bgr_frame: np.ndarray) -> list:
+        """Detecções (lista de Detection) do frame. Bloqueante."""
+        return self.submit("detect", bgr_frame).result()
+
+    def embed(self, bgr_crops: list[np.ndarray]) -> np.ndarray:
+        """Embeddings (N, 1280) dos crops, na ordem de entrada. Bloqueante."""
+        if not bgr_crops:
+            return np.empty((0, 0), dtype=np.float32)
+        return self.submit("embed", list(bgr_crops)).result()
+
+    # --- Loop ---
+
+    def _collect(self) -> list[_Request]:
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0
+                             else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _loop(self) -> None:
+        while True:
+            batch = self._collect()
+            t0 = time.perf_counter()
+            failed = 0
+            for kind in ("detect", "embed"):
+                group = [r for r in batch if r.kind == kind]
+                if group:
+                    failed += self._run_group(kind, group)
+            t1 = time.perf_counter()
+            with self._stats_lock:
+                self._batch_sizes[len(batch)] += 1
+                self._requests += len(batch)
+                self._failed += failed
+                self._frames += sum(1 for r in batch if r.kind == "detect")
+                self._crops += sum(len(r.payload) for r in batch if r.kind == "embed")
+                self._wait_total += sum(t0 - r.enqueued_at for r in batch)
+                self._infer_total += t1 - t0
+
+    def _run_group(self, kind: str, group: list[_Request]) -> int:
+        """Resolve os Futures do grupo; retorna quantos pedidos falharam."""
+        try:
+            model = self._model(kind)
+        except ModelUnavailableError as e:
+            for r in group:
+                r.future.set_exception(e)
+            return len(group)
+        try:
+            results = self._infer(kind, model, [r.payload for r in group])
+        except Exception as e:
+            if len(group) > 1:
+                print(f"[Inference] Erro no lote de {kind} ({len(group)} pedidos): {e} — refazendo um a um")
+                return sum(self._run_one(kind, model, r) for r in group)
+            print(f"[Inference] Erro no pedido de {kind}: {e}")
+            group[0].future.set_exception(e)
+            return 1
+        for r, res in zip(group, results):
+            r.future.set_result(res)
+        return 0
+
+    def _run_one(self, kind: str, model, req: _Request) -> int:
+        try:
+            res = self._infer(kind, model, [req.payload])[0]
+        except Exception as e:
+            print(f"[Inference] Pedido de {kind} descartado: {e}")
+            req.future.set_exception(e)
+            return 1
+        req.future.set_result(res)
+        return 0
+
+    def _model(self, kind: str):
+        """Modelo do grupo, carregado na primeira chamada; falhas respeitam o backoff."""
+        model = self._models.get(kind)
+        if model is not None:
+            return model
+        now = time.monotonic()
+        error, retry_at, delay = self._load_errors.get(kind, (None, 0.0, 0.0))
+        if error is not None and now < retry_at:
+            raise ModelUnavailableError(f"Modelo de {kind} indisponível: {error}") from error
+        try:
+            if kind == "detect":
+                model = DualDetector(model_path=YOLO_MODEL, conf_threshold=DETECTION_CONF,
+                                     engine=DETECTOR_ENGINE, cache_dir=MODELS_DIR,
+                                     int8_data=DETECTOR_INT8_DATA)
+            else:
+                model = get_embedder()
+        except Exception as e:
+            delay = min(MODEL_RETRY_MAX, delay * 2) if delay else MODEL_RETRY_MIN
+            self._load_errors[kind] = (e, now + delay, delay)
+            print(f"[Inference] Falha ao carregar o modelo de {kind}: {e} — nova tentativa em {delay:.0f}s")
+            raise ModelUnavailableError(f"Modelo de {kind} indisponível: {e}") from e
+        self._load_errors.pop(kind, None)
+        self._models[kind] = model
+        return model
+
+    def _infer(self, kind: str, model, payloads: list) -> list:
+        if kind == "detect":
+            return model.detect_batch(payloads)
+        crops = [c for p in payloads for c in p]
+        embs = model.extract_batch(crops)
+        results, start = [], 0
+        for p in payloads:
+            results.append(embs[start:start + len(p)])
+            start += len(p)
+        return results
+
+    # --- Estatísticas ---
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            batches = sum(self._batch_sizes.values())
+            return {
+                "queue_depth":     self._queue.qsize(),
+                "max_batch":       self.max_batch,
+                "max_wait_ms":     self.max_wait * 1000.0,
+                "batches":         batches,
+                "requests":        self._requests,
+                "failed":          self._failed,
+                "frames":          self._frames,
+                "crops":           self._crops,
+                "avg_batch_size":  round(self._requests / batches, 2) if batches else 0.0,
+                "batch_size_hist": {str(k): v for k, v in sorted(self._batch_sizes.items())},
+                "avg_wait_ms":     round(self._wait_total / self._requests * 1000.0, 2) if self._requests else 0.0,
+                "avg_batch_ms":    round(self._infer_total / batches * 1000.0, 2) if batches else 0.0,
+            }
+
+
+_scheduler: InferenceScheduler | None = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> InferenceScheduler:
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = InferenceScheduler()
+    return _scheduler
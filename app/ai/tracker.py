@@ -0,0 +1,127 @@
+"""
+app/ai/tracker.py — Rastreador multi-objeto leve (estilo ByteTrack) por câmera.
+
+Associa as detecções de cada frame às tracks existentes por IoU, em dois
+estágios: primeiro as detecções de alta confiança, depois as de baixa
+confiança contra as tracks que sobraram. A posição de cada track é prevista
+com um filtro alfa-beta de velocidade constante (Kalman de ganho fixo).
+
+Cada track carrega a última identidade (IdentityMatch) obtida para ela, de
+modo que o worker só precisa re-embedar tracks novas, de baixa confiança
+ou a cada `reid_interval` frames.
+"""
+
+from dataclasses import dataclass, field
+
+import numpy as np
+
+HIGH_CONF = 0.50        # detecções acima disso entram no 1º estágio
+MATCH_IOU = 0.30        # IoU mínimo para associar detecção a track
+MAX_AGE = 30            # frames sem detecção antes de descartar a track
+ALPHA, BETA = 0.6, 0.2  # ganhos do filtro de posição/velocidade
+
+
+@dataclass
+class Track:
+    track_id: int
+    entity_type: str
+    box: np.ndarray                              # x1, y1, x2, y2 (float)
+    velocity: np.ndarray = field(default_factory=lambda: np.zeros(4))
+    match: object = None                         # IdentityMatch da última re-identificação
+    reid_frame: int = -1                         # frame da última re-identificação
+    misses: int = 0
+
+    def predict(self) -> np.ndarray:
+        return self.box + self.velocity
+
+    def correct(self, measured: np.ndarray) -> None:
+        predicted = self.predict()
+        residual = measured - predicted
+        self.box = predicted + ALPHA * residual
+        self.velocity = self.velocity + BETA * residual
+        self.misses = 0
+
+
+def _iou_matrix(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """IoU entre todas as caixas de a (N,4) e b (M,4)."""
+    if len(a) == 0 or len(b) == 0:
+        return np.zeros((len(a), len(b)))
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-6)
+
+
+class IoUTracker:
+    """Rastreador por câmera. Não é thread-safe (uso exclusivo do worker)."""
+
+    def __init__(self, reid_interval: int = 30, confident_sim: float = 0.85):
+        self.reid_interval = max(1, reid_interval)
+        self.confident_sim = confident_sim
+        self.frame = 0
+        self._tracks: list[Track] = []
+        self._next_id = 1
+
+    def update(self, detections: list) -> list[Track]:
+        """
+        Associa as detecções do frame às tracks.
+        Retorna a Track de cada detecção, na mesma ordem de `detections`.
+        """
+        self.frame += 1
+        boxes = np.array([[d.x1, d.y1, d.x2, d.y2] for d in detections], dtype=float).reshape(-1, 4)
+        types = [getattr(d, "entity_type", "animal") for d in detections]
+        assigned: list[Track | None] = [None] * len(detections)
+
+        free = list(self._tracks)
+        high = [i for i, d in enumerate(detections) if d.confidence >= HIGH_CONF]
+        low = [i for i, d in enumerate(detections) if d.confidence < HIGH_CONF]
+        for stage in (high, low):
+            if not stage or not free:
+                continue
+            predicted = np.array([t.predict() for t in free])
+            iou = _iou_matrix(boxes[stage], predicted)
+            for di, ti in zip(*np.unravel_index(np.argsort(-iou, axis=None), iou.shape)):
+                if iou[di, ti] < MATCH_IOU:
+                    break
+                det_idx, track = stage[di], free[ti]
+                if assigned[det_idx] is not None or track is None or track.entity_type != types[det_idx]:
+                    continue
+                track.correct(boxes[det_idx])
+                assigned[det_idx] = track
+                free[ti] = None
+            free = [t for t in free if t is not None]
+
+        for i, t in enumerate(assigned):
+            if t is None:
+                t = Track(track_id=self._next_id, entity_type=types[i], box=boxes[i].copy())
+                self._next_id += 1
+                self._tracks.append(t)
+                assigned[i] = t
+
+        for t in free:
+            t.misses += 1
+            t.box = t.predict()
+        self._tracks = [t for t in self._tracks if t.misses <= MAX_AGE]
+        return assigned
+
+    def needs_reid(self, track: Track) -> bool:
+        """Track nova, desconhecida, de baixa similaridade ou com identidade vencida."""
+        m = track.match
+        return (
+            m is None
+            or not m.is_known
+            or m.similarity < self.confident_sim
+            or self.frame - track.reid_frame >= self.reid_interval
+        )
+
+    def set_identity(self, track: Track, match) -> None:
+        track.match = match
+        track.reid_frame = self.frame
+
+    @property
+    def active_tracks(self) -> int:
+        return len(self._tracks)
@@ -7,6 +7,7 @@ from fastapi.responses import FileResponse
 
 import app.db.database as db
 from app.api.auth import get_current_user
+from app.db.cache import response_cache
 from app.db.schemas import AnimalOut, AnimalUpdate
 
 router = APIRouter(prefix="/api/animals", tags=["animals"])
@@ -17,7 +18,8 @@ def list_animals(
     status: str | None = None,
     current_user: dict = Depends(get_current_user),
 ):
-    return db.list_animals(current_user["farm_id"], status)
+    farm_id = current_user["farm_id"]
+    return response_cache.get("animals", farm_id, (status,), lambda: db.list_animals(farm_id, status))
 
 
 @router.get("/{animal_id}", response_model=AnimalOut)
@@ -26,6 +26,15 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(bearer)
         raise HTTPException(status_code=401, detail="Token invalido ou expirado")
 
 
+def user_from_token(token: str) -> dict | None:
+    """Usuario do token (ex.: query string de websocket), ou None se invalido."""
+    try:
+        payload = decode_token(token)
+    except JWTError:
+        return None
+    return db.get_user_by_id(int(payload["sub"]))
+
+
 def require_admin(current_user: dict = Depends(get_current_user)) -> dict:
     """Dependency: exige que o usuario seja administrador."""
     if current_user["role"] != "admin":
@@ -1,20 +1,35 @@
-import asyncio, random, threading, time
+import functools, random, threading, time
 from collections import deque
 from datetime import datetime
 import cv2, numpy as np
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from fastapi import APIRouter, Depends, Query, WebSocket, WebSocketDisconnect
 import app.db.database as db
+from app.ai.analysis_queue import AnalysisJob, AnalysisQueue
 from app.ai.analyzer import get_analyzer
-from app.ai.detector import DualDetector
-from app.ai.embedder import get_embedder
+from app.ai.ann import make_index
+from app.ai.detector import DualDetector, scale_detections
+from app.ai.motion import MotionGate
 from app.ai.identifier import DualIdentifier, IdentityMatch, UNKNOWN_LABEL
-from app.core.config import DETECTION_CONF, PHOTOS_DIR, SIMILARITY_THRESHOLD, YOLO_MODEL
+from app.ai.scheduler import get_scheduler
+from app.ai.tracker import IoUTracker
+from app.api.auth import get_current_user, require_admin, user_from_token
+from app.core.broadcaster import StreamFrame, all_broadcasters, get_broadcaster
+from app.core.capture import FrameGrabber
+from app.core.events import EventHub
+from app.core.metrics import (CAMERA_AUTO_REGISTRATIONS, CAMERA_DETECTIONS, CAMERA_FRAMES, CAMERA_FRAMES_DROPPED,
+                              CAMERA_STAGE_SECONDS)
+from app.core.tracing import TraceCapture
+from app.db.writer import get_writer
+from app.core.config import (ANN_INDEX, ANN_MIN_TRAIN, ANN_NPROBE, ANN_RERANK_K, ANN_STORAGE,
+                             CAMERA_WORKER_MODE, DETECT_MAX_SIDE, INFER_TARGET_FPS, MOTION_FORCE_INTERVAL, MOTION_THRESHOLD, PHOTOS_DIR, SIMILARITY_THRESHOLD,
+                             TRACK_CONFIDENT_SIM, TRACK_REID_INTERVAL)
 
 router = APIRouter(prefix="/api/camera", tags=["camera"])
 IDENTIFY_THRESHOLD = SIMILARITY_THRESHOLD
 DEDUP_GUARD = 0.60
 BUFFER_TTL = 10.0
 BUFFER_SIM = 0.68
+MAIN_FRAME_TIMEOUT = 0.5   # s de espera pelo frame do stream principal (modo sub-stream)
 
 _CATTLE_NAMES = [
     "Mimosa","Estrela","Pintada","Moreninha","Branquinha","Caramelo",
@@ -48,7 +63,7 @@ def _auto_visitor_name(farm_id: int) -> str:
     return name
 
 
-_ws_clients: list[WebSocket] = []
+_event_hub: EventHub | None = None   # criado no event loop (startup)
 _workers: dict[int,"CameraWorker"] = {}
 _workers_lock = threading.Lock()
 _identifiers: dict[int,DualIdentifier] = {}
@@ -59,10 +74,24 @@ _reg_lock = threading.Lock()
 _no_photo: set[tuple] = set()
 _no_photo_lock = threading.Lock()
 _main_loop = None
+# Em processos de câmera (app/api/camera_process.py): eventos e novas identidades vão pelo pipe,
+# e "entrada do dia" e auto-cadastro são decididos pelo processo da API (_coordinator)
+_event_sink = None
+_identity_sink = None
+_coordinator = None
 
 
 def set_main_loop(loop) -> None:
-    global _main_loop; _main_loop = loop
+    global _main_loop, _event_hub; _main_loop = loop; _event_hub = EventHub()
+
+
+def set_process_sinks(event_sink, identity_sink) -> None:
+    global _event_sink, _identity_sink; _event_sink = event_sink; _identity_sink = identity_sink
+
+
+def set_coordinator(coordinator) -> None:
+    """mark_seen/unmark_seen/claim_registration/release compartilhados entre processos (ver camera_process)."""
+    global _coordinator; _coordinator = coordinator
 
 
 def _load_no_photo(farm_id: int) -> None:
@@ -73,10 +102,15 @@ def _load_no_photo(farm_id: int) -> None:
         for pid in missing["people"]: _no_photo.add((farm_id,"person",pid))
 
 
+def _make_ann_index():
+    return make_index(ANN_INDEX, nprobe=ANN_NPROBE, rerank_k=ANN_RERANK_K,
+                      min_train=ANN_MIN_TRAIN, storage=ANN_STORAGE)
+
+
 def get_identifier(farm_id: int) -> DualIdentifier:
     with _identifiers_lock:
         if farm_id not in _identifiers:
-            ident = DualIdentifier(threshold=IDENTIFY_THRESHOLD)
+            ident = DualIdentifier(threshold=IDENTIFY_THRESHOLD, index_factory=_make_ann_index)
             ident.load_animals(db.load_all_animals_with_embeddings(farm_id))
             ident.load_people(db.load_all_people_with_embeddings(farm_id))
             _identifiers[farm_id] = ident
@@ -93,13 +127,32 @@ def reload_identifier(farm_id=None) -> None:
                 _identifiers[fid].load_animals(db.load_all_animals_with_embeddings(fid))
                 _identifiers[fid].load_people(db.load_all_people_with_embeddings(fid))
         _load_no_photo(fid)
+    if CAMERA_WORKER_MODE == "process":
+        from app.api.camera_process import relay_reload
+        relay_reload(farm_id)
+
 
+def add_identity(farm_id: int, entity_type: str, entity_id: int, name: str, embedding, description: str="") -> None:
+    """Inclui no identificador da fazenda uma identidade cadastrada em outro processo."""
+    with _identifiers_lock: ident = _identifiers.get(farm_id)
+    if ident is None: return
+    if entity_type=="animal": ident.add_animal(entity_id,name,embedding,description)
+    else: ident.add_person(entity_id,name,embedding,description)
 
-def start_worker(cam_id: int, source_url: str, cam_name: str="", farm_id: int=0) -> None:
+
+def start_worker(cam_id: int, source_url: str, cam_name: str="", farm_id: int=0,
+                 motion_threshold: float | None = None, detect_source_url: str | None = None,
+                 detect_max_side: int | None = None) -> None:
+    options = dict(motion_threshold=motion_threshold, detect_source_url=detect_source_url,
+                   detect_max_side=detect_max_side)
     with _workers_lock:
         if cam_id in _workers: _workers[cam_id].stop()
-        identifier = get_identifier(farm_id)
-        w = CameraWorker(cam_id, source_url, cam_name, identifier, farm_id)
+        if CAMERA_WORKER_MODE == "process":
+            # Pipeline roda num processo filho; aqui fica só o proxy (mesma interface)
+            from app.api.camera_process import ProcessCameraWorker
+            w = ProcessCameraWorker(cam_id, source_url, cam_name, farm_id, **options)
+        else:
+            w = CameraWorker(cam_id, source_url, cam_name, get_identifier(farm_id), farm_id, **options)
         w.start(); _workers[cam_id] = w
 
 
@@ -119,19 +172,31 @@ def stop_all_workers() -> None:
 
 
 def _is_duplicate(embedding, entity_type, identifier) -> bool:
-    bank = identifier._animals if entity_type=="animal" else identifier._people
-    if not bank: return False
-    matrix = np.stack([bank[n]["embedding"] for n in bank], axis=0)
-    return float(np.max(matrix @ embedding)) >= DEDUP_GUARD
+    return identifier.max_similarity(embedding, entity_type) >= DEDUP_GUARD
+
+
+def _mark_no_photo(farm_id, entity_type, entity_id) -> None:
+    """Cadastro continua sem foto: a próxima aparição tenta salvar de novo."""
+    with _no_photo_lock: _no_photo.add((farm_id,entity_type,entity_id))
 
 
-def _save_crop(crop_bgr, name: str) -> str:
+def _save_crop(crop_bgr, name: str, entity_type, entity_id, farm_id) -> str | None:
+    """
+    Define o caminho da foto e enfileira a gravação no DbWriter, que grava o
+    photo_path do cadastro só depois do arquivo. Não toca o disco. Retorna o
+    caminho, ou None se o DbWriter recusou (fila cheia ou fechado).
+    """
     PHOTOS_DIR.mkdir(exist_ok=True)
     ts = datetime.now().strftime("%Y%m%d_%H%M%S")
     safe = "".join(c if c.isalnum() or c in "-_" else "_" for c in name)
-    path = PHOTOS_DIR / f"{safe}_{ts}.jpg"
-    cv2.imwrite(str(path), crop_bgr)
-    return str(path)
+    path = str(PHOTOS_DIR / f"{safe}_{ts}.jpg")
+    if not get_writer().save_photo(path, crop_bgr.copy(), entity_type, entity_id, farm_id):
+        return None
+    return path
+
+
+# Falha ao gravar/vincular a foto no DbWriter devolve o cadastro a _no_photo
+get_writer().set_photo_failure_listener(_mark_no_photo)
 
 
 def _extract_breed(description: str) -> str:
@@ -141,54 +206,99 @@ def _extract_breed(description: str) -> str:
     return ""
 
 
-def _auto_register(worker, crop_bgr, embedding, entity_type):
+def _db_time(ts) -> str | None:
+    return ts.strftime("%Y-%m-%d %H:%M:%S") if ts else None
+
+
+def _auto_register(worker, crop_bgr, embedding, entity_type, detected_at=None):
     farm_id = worker.farm_id
     with _reg_lock:
         if worker._is_in_buffer(embedding) or _is_duplicate(embedding, entity_type, worker.identifier):
             return None
+        t0 = time.perf_counter()
+        # Modo processo: outro host pode estar cadastrando o mesmo animal agora — o processo da API decide
+        claim = _coordinator.claim_registration(farm_id, entity_type, embedding) if _coordinator else None
+        if _coordinator and claim is None:
+            return None
+        t0 = worker._observe("db", t0, "coordinator.claim")
         name = _random_cattle_name(farm_id) if entity_type=="animal" else _auto_visitor_name(farm_id)
-        analyzer = get_analyzer()
-        analysis = analyzer.analyze(crop_bgr) if analyzer.available else {}
-        description = analysis.get("description","")
-        breed = analysis.get("breed","") or _extract_breed(description)
-        weight = analysis.get("weight")
-        photo_path = _save_crop(crop_bgr, name)
+        t0 = worker._observe("db", t0, "db.pick_name")
         try:
+            # Cadastro sem foto: o DbWriter preenche photo_path depois que o JPEG existir
             if entity_type=="animal":
-                entity_id = db.register_animal(name,embedding,description,photo_path,
-                                               breed=breed,weight=weight,farm_id=farm_id)
-                worker.identifier.add_animal(entity_id,name,embedding,description)
+                entity_id = db.register_animal(name,embedding,"","",farm_id=farm_id)
+                t0 = worker._observe("db", t0, "db.register_animal")
+                worker.identifier.add_animal(entity_id,name,embedding,"")
             else:
                 entity_id = db.register_person(name,embedding,role="visitor",
-                                               description=description,photo_path=photo_path,farm_id=farm_id)
-                worker.identifier.add_person(entity_id,name,embedding,description)
-            source = f"camera_{worker.cam_id}"
-            db.add_movement(entity_type,entity_id,name,"entry",source,farm_id=farm_id)
-            with _seen_lock:
-                _seen_today[(farm_id,entity_type,entity_id)] = datetime.now().date().isoformat()
+                                               description="",photo_path="",farm_id=farm_id)
+                t0 = worker._observe("db", t0, "db.register_person")
+                worker.identifier.add_person(entity_id,name,embedding,"")
+            photo_path = _save_crop(crop_bgr, name, entity_type, entity_id, farm_id)
+            if photo_path is None: _mark_no_photo(farm_id, entity_type, entity_id)
+            t0 = worker._observe("photo", t0, "save_crop")
+            if _identity_sink: _identity_sink(farm_id,entity_type,entity_id,name,embedding)
+            t0 = worker._span("identifier.add", "register", t0)
+            queued = get_writer().add_movement(entity_type,entity_id,name,"entry",worker.movement_source,
+                                               farm_id=farm_id,detected_at=_db_time(detected_at))
+            worker._observe("db", t0, "writer.add_movement")
+            # Fila cheia: não marca como visto, a próxima aparição tenta gravar a entrada de novo
+            if queued:
+                worker._mark_seen((farm_id,entity_type,entity_id),
+                                  (detected_at or datetime.now()).date().isoformat())
             worker._reg_buffer.append((embedding.copy(),time.time()))
-            return {"event":"auto_registered","entity_type":entity_type,"entity_id":entity_id,
-                    "name":name,"description":description,"photo_path":photo_path,
-                    "camera_id":worker.cam_id,"camera_name":worker.cam_name}
         except Exception as e:
             print(f"[Camera {worker.cam_id}] Auto-cadastro falhou: {e}"); return None
+        finally:
+            # Depois do "identity" (mesmo pipe, em ordem): o processo da API já conhece a identidade
+            if claim is not None: _coordinator.release(claim)
+    # Descrição do Claude chega depois, via fila (evento "description_ready")
+    if get_analyzer().available:
+        get_analysis_queue().submit(AnalysisJob(farm_id=farm_id,entity_type=entity_type,entity_id=entity_id,
+                                                name=name,crop_bgr=crop_bgr,camera_id=worker.cam_id,
+                                                camera_name=worker.cam_name))
+    return {"event":"auto_registered","entity_type":entity_type,"entity_id":entity_id,
+            "name":name,"description":"","photo_path":photo_path or "",
+            "camera_id":worker.cam_id,"camera_name":worker.cam_name}
+
+
+def _on_analysis_done(job, analysis: dict) -> None:
+    description = analysis.get("description","")
+    if not description: return
+    weight = analysis.get("weight")
+    if job.entity_type=="animal":
+        breed = analysis.get("breed","") or _extract_breed(description)
+        db.update_animal(job.entity_id,description=description,breed=breed or None,
+                         weight=weight,farm_id=job.farm_id)
+    else:
+        db.update_person(job.entity_id,description=description,weight=weight,farm_id=job.farm_id)
+    with _identifiers_lock: ident = _identifiers.get(job.farm_id)
+    if ident: ident.update_description(job.entity_type,job.name,description)
+    _broadcast_from_thread(job.farm_id,{"event":"description_ready","entity_type":job.entity_type,
+                            "entity_id":job.entity_id,"name":job.name,"description":description,
+                            "camera_id":job.camera_id,"camera_name":job.camera_name})
+
 
+_analysis_queue = None
+_analysis_queue_lock = threading.Lock()
 
-async def _broadcast(event: dict) -> None:
-    dead = []
-    for ws in _ws_clients:
-        try: await ws.send_json(event)
-        except Exception: dead.append(ws)
-    for ws in dead:
-        if ws in _ws_clients: _ws_clients.remove(ws)
 
+def get_analysis_queue() -> AnalysisQueue:
+    global _analysis_queue
+    with _analysis_queue_lock:
+        if _analysis_queue is None:
+            _analysis_queue = AnalysisQueue(get_analyzer, _on_analysis_done)
+    return _analysis_queue
 
-def _broadcast_from_thread(event: dict) -> None:
-    if _main_loop and not _main_loop.is_closed():
-        asyncio.run_coroutine_threadsafe(_broadcast(event), _main_loop)
 
+def _broadcast_from_thread(farm_id: int, event: dict) -> None:
+    """Entrega o evento aos clientes websocket da fazenda (chamável de qualquer thread)."""
+    if _event_sink: _event_sink(farm_id, event); return
+    if _event_hub and _main_loop and not _main_loop.is_closed():
+        _main_loop.call_soon_threadsafe(_event_hub.publish, farm_id, event)
 
-def _annotate(frame, detections, matches):
+
+def _annotate(frame, detections, matches, ts=None):
     display = frame.copy()
     font = cv2.FONT_HERSHEY_SIMPLEX
     for det,match in zip(detections,matches):
@@ -200,103 +310,349 @@ def _annotate(frame, detections, matches):
         (lw,lh),_ = cv2.getTextSize(label,font,0.55,1)
         cv2.rectangle(display,(det.x1,ly-lh-4),(det.x1+lw+4,ly+2),color,-1)
         cv2.putText(display,label,(det.x1+2,ly-2),font,0.55,(255,255,255),1)
-    ts = datetime.now().strftime("%H:%M:%S")
+    ts = (ts or datetime.now()).strftime("%H:%M:%S")
     cv2.putText(display,f"Cattle AI | {ts}",(10,22),font,0.55,(0,0,0),3)
     cv2.putText(display,f"Cattle AI | {ts}",(10,22),font,0.55,(255,255,255),1)
     return display
 
 
-class CameraWorker:
-    def __init__(self,cam_id,source_url,cam_name,identifier,farm_id=0):
+def _downscale(frame, max_side):
+    """Reduz o frame para que o lado maior tenha no máximo max_side px (0 = sem redução)."""
+    h,w=frame.shape[:2]
+    if max_side<=0 or max(h,w)<=max_side: return frame
+    s=max_side/max(h,w)
+    return cv2.resize(frame,(max(1,round(w*s)),max(1,round(h*s))),interpolation=cv2.INTER_AREA)
+
+
+STAGES = ("capture","motion","detect","track","embed","identify","db","photo","annotate","frame")
+
+
+class _WorkerMetrics:
+    """Filhos das métricas de uma câmera, resolvidos uma vez (o hot path só chama observe/inc)."""
+
+    def __init__(self,cam_id):
+        cam=str(cam_id)
+        self.stage={s:CAMERA_STAGE_SECONDS.labels(cam,s).observe for s in STAGES}
+        self.frames={r:CAMERA_FRAMES.labels(cam,r).inc for r in ("processed","motion_skipped","error")}
+        self.dropped=CAMERA_FRAMES_DROPPED.labels(cam).inc
+        self.detections=CAMERA_DETECTIONS.labels(cam).observe
+        self.auto_registered={et:CAMERA_AUTO_REGISTRATIONS.labels(cam,et).inc for et in ("animal","person")}
+
+
+class IdentitySource:
+    """
+    Identificação, movimentos e auto-cadastro comuns à câmera ao vivo e à
+    ingestão de vídeo. Subclasses definem cam_id, cam_name, farm_id,
+    identifier e _reg_buffer; `metrics` (opcional) recebe os tempos por etapa.
+    """
+
+    metrics: _WorkerMetrics | None = None
+    trace: TraceCapture | None = None   # captura de spans ligada pelo admin; None = desligada
+
+    @property
+    def movement_source(self):
+        return f"camera_{self.cam_id}"
+
+    def _mark_seen(self,key,day):
+        """
+        Marca a identidade como vista no dia; False se já estava marcada.
+        Em processo de câmera, a marca local é só cache: quem grava a entrada
+        é decidido pelo processo da API, comum a todos os hosts.
+        """
+        with _seen_lock:
+            if _seen_today.get(key)==day: return False
+            _seen_today[key]=day
+        if _coordinator is None: return True
+        owned=_coordinator.mark_seen(key,day)
+        if owned is None:
+            # Sem resposta do processo da API: a próxima aparição pergunta de novo
+            with _seen_lock:
+                if _seen_today.get(key)==day: del _seen_today[key]
+            return False
+        return owned
+
+    def _unmark_seen(self,key,day):
+        """Desfaz _mark_seen (ex.: a entrada não pôde ser enfileirada)."""
+        with _seen_lock:
+            if _seen_today.get(key)==day: del _seen_today[key]
+        if _coordinator is not None: _coordinator.unmark_seen(key,day)
+
+    def _observe(self,stage,t0,name=None,args=None):
+        """
+        Registra o tempo desde t0 (perf_counter) na métrica da etapa e, com
+        trace ligado, um span `name` (padrão: a etapa). Retorna o instante atual.
+        """
+        t=time.perf_counter()
+        if self.metrics: self.metrics.stage[stage](t-t0)
+        if self.trace: self.trace.span(name or stage,stage,t0,t,args)
+        return t
+
+    def _span(self,name,cat,t0,args=None):
+        """Span só de trace (sem métrica). Retorna o instante atual."""
+        t=time.perf_counter()
+        if self.trace: self.trace.span(name,cat,t0,t,args)
+        return t
+
+    def _is_in_buffer(self,embedding):
+        now=time.time()
+        for prev_emb,ts in self._reg_buffer:
+            if now-ts<=BUFFER_TTL and float(np.dot(prev_emb,embedding))>=BUFFER_SIM: return True
+        return False
+
+    def _identify(self,et,crop,emb,pending_events,detected_at=None):
+        """
+        Identifica o crop; registra movimento/foto ou auto-cadastra desconhecidos.
+        detected_at: hora da cena (datetime); None = agora.
+        """
+        t0=time.perf_counter()
+        match=self.identifier.identify(emb,et)
+        t0=self._observe("identify",t0,args={"entity_type":et,"name":match.name,
+                                             "similarity":round(match.similarity,4)} if self.trace else None)
+        if not match.is_known:
+            event=_auto_register(self,crop,emb,et,detected_at)
+            self._span("auto_register","register",t0,{"entity_type":et,"registered":event["name"] if event
+                                                      else None} if self.trace else None)
+            if event:
+                if self.metrics: self.metrics.auto_registered[et]()
+                pending_events.append(event)
+                match=IdentityMatch(name=event["name"],entity_id=event["entity_id"],similarity=1.0,
+                                    is_known=True,description=event["description"])
+            return match
+        key=(self.farm_id,et,match.entity_id); day=(detected_at or datetime.now()).date().isoformat()
+        if self._mark_seen(key,day):
+            if not get_writer().add_movement(et,match.entity_id,match.name,"entry",self.movement_source,
+                                             farm_id=self.farm_id,detected_at=_db_time(detected_at)):
+                self._unmark_seen(key,day)   # fila cheia: a próxima aparição tenta de novo
+            self._observe("db",t0,"writer.add_movement")
+        no_photo_key=(self.farm_id,et,match.entity_id)
+        with _no_photo_lock: needs_photo=no_photo_key in _no_photo
+        if needs_photo:
+            # Sai da lista antes de enfileirar: recusa aqui ou falha no DbWriter devolve via _mark_no_photo
+            with _no_photo_lock: _no_photo.discard(no_photo_key)
+            t0=time.perf_counter()
+            if _save_crop(crop,match.name,et,match.entity_id,self.farm_id) is None:
+                _mark_no_photo(*no_photo_key)
+            self._observe("photo",t0,"save_crop")
+        return match
+
+    def _track_and_identify(self,detections,get_full,scheduler,tracker,pending_events,detected_at=None):
+        """Rastreia as detecções e re-identifica (embed + identify) só as tracks que precisam."""
+        t0=time.perf_counter()
+        tracks=tracker.update(detections)
+        t0=self._observe("track",t0)
+        crops={}
+        reid=[i for i in range(len(detections)) if tracker.needs_reid(tracks[i])]
+        full=get_full() if reid else None
+        for i in (reid if full is not None else []):
+            crop=DualDetector.crop(full,detections[i],padding=10)
+            if crop.size>0 and min(crop.shape[:2])>=20: crops[i]=crop
+        t0=self._span("crops","embed",t0,{"reid":len(reid),"crops":len(crops)} if self.trace else None)
+        if crops:
+            # Um único lote por frame: os crops de todas as detecções vão juntos ao scheduler
+            embs=dict(zip(crops,scheduler.embed(list(crops.values()))))
+            self._observe("embed",t0,args={"crops":len(crops)} if self.trace else None)
+        else:
+            embs={}
+        matches=[]
+        for i,det in enumerate(detections):
+            track=tracks[i]
+            if i in embs:
+                match=self._identify(getattr(det,"entity_type","animal"),crops[i],embs[i],pending_events,
+                                     detected_at)
+                tracker.set_identity(track,match)
+            else:
+                match=track.match or IdentityMatch(name=UNKNOWN_LABEL,entity_id=-1,similarity=0.0,is_known=False)
+            matches.append(match)
+        return matches
+
+
+class CameraWorker(IdentitySource):
+    def __init__(self,cam_id,source_url,cam_name,identifier,farm_id=0,motion_threshold=None,
+                 detect_source_url=None,detect_max_side=None,broadcaster=None):
         self.cam_id=cam_id; self.source_url=source_url; self.cam_name=cam_name
         self.identifier=identifier; self.farm_id=farm_id
-        self._lock=threading.Lock(); self._latest_frame=None
+        self.motion_gate=MotionGate(MOTION_THRESHOLD if motion_threshold is None else motion_threshold,
+                                    MOTION_FORCE_INTERVAL)
+        self.broadcaster=broadcaster or get_broadcaster(cam_id)
+        self.metrics=_WorkerMetrics(cam_id)
+        # Detecção em baixa resolução: sub-stream dedicado ou o principal reduzido uma vez.
+        # Com sub-stream, o principal só é convertido para BGR quando há crops, fotos ou viewers.
+        self.detect_source_url=detect_source_url or None
+        self.detect_max_side=DETECT_MAX_SIDE if detect_max_side is None else detect_max_side
+        self.grabber=FrameGrabber(source_url,name=f"grab-{cam_id}",on_demand=bool(self.detect_source_url),
+                                  observe=self._on_capture)
+        self.sub_grabber=(FrameGrabber(self.detect_source_url,name=f"grab-{cam_id}-sub",observe=self._on_capture)
+                          if self.detect_source_url else None)
+        self._main_seq=0; self._main_frame=None
+        self.target_fps=INFER_TARGET_FPS; self._infer_fps=0.0
         self._running=False; self._thread=None; self._reg_buffer=deque(maxlen=50)
 
     def start(self):
         if self._running: return
         self._running=True
+        self.grabber.start()
+        if self.sub_grabber: self.sub_grabber.start()
         self._thread=threading.Thread(target=self._loop,name=f"cam-{self.cam_id}",daemon=True)
         self._thread.start()
         print(f"[Camera {self.cam_id}] Worker iniciado (farm={self.farm_id}) -> {self.source_url}")
 
-    def stop(self): self._running=False
+    def stop(self):
+        self._running=False; self.grabber.stop()
+        if self.sub_grabber: self.sub_grabber.stop()
+        if self.trace: self.trace.finish("stopped")
 
-    def get_latest_frame(self):
-        with self._lock: return self._latest_frame
-
-    def _set_frame(self,fb):
-        with self._lock: self._latest_frame=fb
+    def start_trace(self,capture):
+        """Liga a captura de spans (app/core/tracing.py); False se já há uma em andamento."""
+        if not self._running or (self.trace and self.trace.active): return False
+        self.trace=capture; return True
 
-    def _is_in_buffer(self,embedding):
-        now=time.time()
-        for prev_emb,ts in self._reg_buffer:
-            if now-ts<=BUFFER_TTL and float(np.dot(prev_emb,embedding))>=BUFFER_SIM: return True
-        return False
+    def _on_capture(self,seconds):
+        # Chamado pela thread de captura a cada frame decodificado
+        self.metrics.stage["capture"](seconds)
+        if self.trace:
+            t=time.perf_counter(); self.trace.span("capture","capture",t-seconds,t)
 
-    def _open_capture(self):
-        src=self.source_url
-        cap=cv2.VideoCapture(int(src) if src.isdigit() else src)
-        cap.set(cv2.CAP_PROP_BUFFERSIZE,1); return cap
+    def get_latest_frame(self):
+        """JPEG (tier padrão) do último frame, ou None."""
+        frame=self.broadcaster.latest()[1]
+        return frame.jpeg() if frame else None
+
+    def stats(self) -> dict:
+        return {"camera_id":self.cam_id,"running":self._running,"target_fps":self.target_fps,
+                "inference_fps":round(self._infer_fps,2),"capture":self.grabber.stats(),
+                "detect_capture":self.sub_grabber.stats() if self.sub_grabber else None,
+                "detect_max_side":self.detect_max_side,
+                "motion":self.motion_gate.stats(),"stream":self.broadcaster.stats(),
+                "db_writer":get_writer().stats()}
+
+    def _set_frame(self,frame,detections,matches):
+        # Anotação e JPEG só acontecem quando algum viewer pedir o frame
+        ts=datetime.now()
+        def render():
+            t0=time.perf_counter(); image=_annotate(frame,detections,matches,ts)
+            self._observe("annotate",t0); return image
+        self.broadcaster.publish(StreamFrame(render))
+
+    def _frame_interval(self):
+        """Intervalo mínimo entre frames processados: min(FPS da fonte, target_fps)."""
+        fps=(self.sub_grabber or self.grabber).source_fps
+        if self.target_fps>0: fps=min(fps,self.target_fps) if fps>0 else self.target_fps
+        return 1.0/fps if fps>0 else 0.0
+
+    def _fetch_main_frame(self):
+        """Frame atual do stream principal (modo sub-stream: retrieve sob demanda)."""
+        got=self.grabber.latest(after=self._main_seq,timeout=MAIN_FRAME_TIMEOUT)
+        if got: self._main_seq,self._main_frame=got
+        return self._main_frame
+
+    def _process(self,det_frame,get_full,main_size,scheduler,tracker,pending_events):
+        """
+        Detecção no frame reduzido + rastreamento + re-identificação das tracks
+        que precisam. Caixas são mapeadas para main_size (largura, altura);
+        crops saem do frame em resolução cheia (get_full).
+        """
+        dh,dw=det_frame.shape[:2]
+        t0=time.perf_counter()
+        detections=scale_detections(scheduler.detect(det_frame),main_size[0]/dw,main_size[1]/dh)
+        self._observe("detect",t0,args={"detections":len(detections),"size":[dw,dh]} if self.trace else None)
+        self.metrics.detections(len(detections))
+        return detections,self._track_and_identify(detections,get_full,scheduler,tracker,pending_events)
 
     def _loop(self):
-        detector=DualDetector(model_path=YOLO_MODEL,conf_threshold=DETECTION_CONF)
-        embedder=get_embedder(); cap=None
+        scheduler=get_scheduler(); last_seq=0; prev_started=0.0
+        tracker=IoUTracker(reid_interval=TRACK_REID_INTERVAL,confident_sim=TRACK_CONFIDENT_SIM)
+        detections,matches=[],[]
         while self._running:
-            if cap is None or not cap.isOpened():
-                if cap: cap.release()
-                try: cap=self._open_capture()
-                except Exception as e:
-                    print(f"[Camera {self.cam_id}] Erro ao abrir: {e}"); time.sleep(3.0); continue
-                if not cap.isOpened(): time.sleep(3.0); continue
-            ret,frame=cap.read()
-            if not ret: time.sleep(0.05); continue
+            # Sempre o frame mais recente da thread de captura; os intermediários são descartados
+            t_wait=time.perf_counter()
+            got=(self.sub_grabber or self.grabber).latest(after=last_seq,timeout=1.0)
+            if got is None: continue
+            if last_seq and got[0]-last_seq>1: self.metrics.dropped(got[0]-last_seq-1)
+            last_seq,frame=got
+            started=time.monotonic(); t_frame=self._span("wait_frame","capture",t_wait)
             try:
-                detections=detector.detect(frame); matches=[]; pending_events=[]
-                for det in detections:
-                    et=getattr(det,"entity_type","animal")
-                    crop=detector.crop(frame,det,padding=10)
-                    if crop.size==0 or min(crop.shape[:2])<20:
-                        matches.append(IdentityMatch(name=UNKNOWN_LABEL,entity_id=-1,similarity=0.0,is_known=False))
-                        continue
-                    emb=embedder.extract_from_bgr(crop)
-                    match=self.identifier.identify(emb,et); matches.append(match)
-                    if not match.is_known:
-                        event=_auto_register(self,crop,emb,et)
-                        if event: pending_events.append(event)
-                    else:
-                        key=(self.farm_id,et,match.entity_id); today=datetime.now().date().isoformat()
-                        with _seen_lock:
-                            if _seen_today.get(key)!=today:
-                                db.add_movement(et,match.entity_id,match.name,"entry",
-                                                f"camera_{self.cam_id}",farm_id=self.farm_id)
-                                _seen_today[key]=today
-                        no_photo_key=(self.farm_id,et,match.entity_id)
-                        with _no_photo_lock: needs_photo=no_photo_key in _no_photo
-                        if needs_photo:
-                            photo_path=_save_crop(crop,match.name)
-                            if et=="animal": db.update_animal_photo(match.entity_id,photo_path)
-                            else: db.update_person_photo(match.entity_id,photo_path)
-                            with _no_photo_lock: _no_photo.discard(no_photo_key)
-                annotated=_annotate(frame,detections,matches)
-                _,buf=cv2.imencode(".jpg",annotated,[cv2.IMWRITE_JPEG_QUALITY,75])
-                self._set_frame(buf.tobytes())
-                for ev in pending_events: _broadcast_from_thread(ev)
+                pending_events=[]
+                if self.sub_grabber:
+                    det_frame=frame; get_full=functools.cache(self._fetch_main_frame)
+                    main_size=self.grabber.frame_size
+                else:
+                    det_frame=_downscale(frame,self.detect_max_side); get_full=lambda: frame
+                    main_size=(frame.shape[1],frame.shape[0])
+                if main_size is None: continue   # stream principal ainda não conectou
+                t0=self._span("prepare","frame",t_frame)
+                moved=self.motion_gate.should_process(det_frame)
+                self._observe("motion",t0)
+                if moved:
+                    detections,matches=self._process(det_frame,get_full,main_size,scheduler,tracker,
+                                                     pending_events)
+                    self.metrics.frames["processed"]()
+                else:
+                    # Cena estática — reaproveita detecções e identidades do último frame processado
+                    self.metrics.frames["motion_skipped"]()
+                t0=time.perf_counter()
+                if not self.sub_grabber or self.broadcaster.viewers:
+                    full=get_full()
+                    if full is not None: self._set_frame(full,detections,matches)
+                for ev in pending_events: _broadcast_from_thread(self.farm_id,ev)
+                self._span("publish","frame",t0)
             except Exception as e:
+                self.metrics.frames["error"]()
                 print(f"[Camera {self.cam_id}] Erro no loop: {e}")
-            time.sleep(0.033)
-        if cap: cap.release()
+            self._observe("frame",t_frame,args={"seq":last_seq,"detections":len(detections)} if self.trace else None)
+            if self.trace and not self.trace.frame_done(): self.trace=None
+            if prev_started:
+                inst=1.0/max(started-prev_started,1e-6)
+                self._infer_fps=0.9*self._infer_fps+0.1*inst if self._infer_fps else inst
+            prev_started=started
+            # Cadência: não processa acima de min(FPS da fonte, target_fps)
+            delay=started+self._frame_interval()-time.monotonic()
+            if delay>0: time.sleep(delay)
 
 
 @router.websocket("/events")
-async def camera_events(websocket: WebSocket):
-    await websocket.accept(); _ws_clients.append(websocket)
+async def camera_events(websocket: WebSocket, token: str = Query("")):
+    """Eventos da fazenda do usuario. Token JWT via ?token= (navegador nao envia header)."""
+    user = user_from_token(token) if token else None
+    if not user or not user.get("farm_id") or _event_hub is None:
+        await websocket.close(code=1008); return
+    await websocket.accept()
+    client = _event_hub.connect(user["farm_id"], websocket)
     try:
         while True: await websocket.receive_text()
     except WebSocketDisconnect:
-        if websocket in _ws_clients: _ws_clients.remove(websocket)
+        pass
+    finally:
+        _event_hub.disconnect(client)
+
+
+@router.get("/events/stats")
+async def events_stats(current_user: dict = Depends(get_current_user)):
+    """Estatísticas do hub restritas aos clientes da fazenda do usuário."""
+    return _event_hub.stats(current_user["farm_id"]) if _event_hub else {}
 
 
 @router.post("/reload")
 async def reload_models():
     reload_identifier(); return {"status":"reloaded"}
+
+
+@router.get("/inference/stats")
+async def inference_stats(current_user: dict = Depends(require_admin)):
+    return get_scheduler().stats()
+
+
+@router.get("/stream/stats")
+def stream_stats(current_user: dict = Depends(get_current_user)):
+    """Broadcasters das câmeras da fazenda do usuário."""
+    cams = {c["id"] for c in db.list_cameras(current_user["farm_id"])}
+    return [b.stats() for b in all_broadcasters() if b.cam_id in cams]
+
+
+@router.get("/analysis/stats")
+async def analysis_stats(current_user: dict = Depends(require_admin)):
+    return get_analysis_queue().stats()
+
+
+@router.get("/writer/stats")
+async def writer_stats(current_user: dict = Depends(require_admin)):
+    return get_writer().stats()
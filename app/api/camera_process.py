@@ -0,0 +1,481 @@
+"""
+app/api/camera_process.py — Workers de câmera em processos separados.
+
+Ativado com CAMERA_WORKER_MODE=process. Cada processo filho ("host") roda
+até CAMERA_PROCESS_GROUP CameraWorkers completos (captura, detecção,
+identificação, banco), fora do GIL do processo da API. A comunicação é:
+  - API → host (pipe): start/stop de câmera, tiers assistidos, reload e
+    novas identidades cadastradas por outros hosts
+  - host → API (pipe): eventos websocket, estatísticas, avisos de frame e
+    versões de dados alteradas (invalidam o cache de respostas da API)
+  - host → API (shared memory): os JPEGs anotados, num ShmRing por câmera
+
+No processo da API, ProcessCameraWorker é um proxy com a mesma interface do
+CameraWorker (start/stop/get_latest_frame/stats), então start_worker,
+stop_worker e get_worker mantêm a mesma semântica. O host só codifica os
+tiers que têm viewers no processo da API; sem viewers, nada é codificado.
+
+Cada host carrega seus próprios modelos e identificadores, mas as decisões
+que não podem ser por processo passam pelo processo da API (_Coordinator),
+por pedido e resposta no pipe:
+  - "entrada do dia": só o primeiro host que vê a identidade no dia grava
+  - auto-cadastro: o host reserva o embedding antes de inserir; a reserva é
+    negada se o identificador da API (ou outra reserva em andamento) já tem
+    alguém parecido, e liberada depois que o "identity" chega
+Sem resposta em RPC_TIMEOUT, o host não grava e tenta na próxima aparição.
+As métricas do host chegam como snapshot junto com as estatísticas e entram
+no GET /api/metrics.
+"""
+
+import multiprocessing as mp
+import threading
+import time
+from collections import Counter
+
+import numpy as np
+
+import app.api.camera as camera
+import app.db.database as db
+from app.core.broadcaster import StreamFrame, get_broadcaster
+from app.core.config import CAMERA_PROCESS_GROUP, CAMERA_SHM_SLOT_MB, CAMERA_SHM_SLOTS
+from app.core.metrics import CAMERA_STAGE_SECONDS, REGISTRY
+from app.core.shm_ring import ShmRing
+from app.db.writer import get_writer
+
+STATS_INTERVAL = 1.0    # s entre envios de estatísticas do host
+RESPAWN_DELAY = 3.0     # s antes de recriar um host que morreu
+STOP_JOIN = 2.0         # s de espera pela thread do worker ao parar uma câmera
+SLOT_SIZE = int(CAMERA_SHM_SLOT_MB * (1 << 20))
+RPC_TIMEOUT = 2.0       # s de espera do host pela decisão do processo da API
+CLAIM_TTL = 30.0        # s até uma reserva de cadastro sem release expirar (host que morreu)
+
+_ctx = mp.get_context("spawn")
+
+
+# ---------------------------------------------------------------------------
+# Processo filho
+# ---------------------------------------------------------------------------
+
+class _RingPublisher:
+    """Substitui o FrameBroadcaster dentro do host: codifica os tiers assistidos no ring."""
+
+    def __init__(self, cam_id: int, ring: ShmRing, send):
+        self.cam_id = cam_id
+        self.ring = ring
+        self.tiers: set[str] = set()
+        self._send = send
+        self._seq = 0
+        self._latest: StreamFrame | None = None
+        self._encodes: Counter[str] = Counter()
+        self._too_big = 0
+        self._encode_seconds = CAMERA_STAGE_SECONDS.labels(cam_id, "encode").observe
+
+    @property
+    def viewers(self) -> int:
+        return len(self.tiers)
+
+    def latest(self):
+        return self._seq, self._latest
+
+    def publish(self, frame: StreamFrame) -> int:
+        self._seq += 1
+        self._latest = frame
+        frame._on_encode = lambda tier, seconds: self._encode_seconds(seconds)
+        slots = {}
+        for tier in set(self.tiers):
+            slot = self.ring.write(frame.jpeg(tier))
+            if slot is None:
+                self._too_big += 1
+                continue
+            slots[tier] = slot
+            self._encodes[tier] += 1
+        if slots:
+            self._send(("frame", self.cam_id, slots))
+        return self._seq
+
+    def stats(self) -> dict:
+        return {
+            "sequence":        self._seq,
+            "watched_tiers":   sorted(self.tiers),
+            "encodes_by_tier": dict(self._encodes),
+            "frames_too_big":  self._too_big,
+        }
+
+
+class _HostCoordinator:
+    """No host: encaminha as decisões ao _Coordinator do processo da API e espera a resposta."""
+
+    def __init__(self, send):
+        self._send = send
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self._pending: dict[int, list] = {}   # req_id -> [Event, resposta]
+
+    def _call(self, op: str, *args):
+        with self._lock:
+            self._next_id += 1
+            req_id = self._next_id
+            slot = self._pending[req_id] = [threading.Event(), None]
+        self._send((op, req_id, *args))
+        answered = slot[0].wait(RPC_TIMEOUT)
+        with self._lock:
+            self._pending.pop(req_id, None)
+        return slot[1] if answered else None
+
+    def resolve(self, req_id: int, value) -> None:
+        with self._lock:
+            slot = self._pending.get(req_id)
+        if slot:
+            slot[1] = value
+            slot[0].set()
+
+    def mark_seen(self, key: tuple, day: str) -> bool | None:
+        """True: este host grava a entrada; False: já gravada; None: sem resposta."""
+        owned = self._call("seen", key, day)
+        if owned is None:
+            self.unmark_seen(key, day)   # a resposta perdida pode ter marcado o dia no processo da API
+        return owned
+
+    def unmark_seen(self, key: tuple, day: str) -> None:
+        self._send(("unseen", key, day))
+
+    def claim_registration(self, farm_id: int, entity_type: str, embedding) -> int | None:
+        """Id da reserva, ou None (duplicata, ou sem resposta)."""
+        return self._call("claim", farm_id, entity_type, embedding)
+
+    def release(self, claim: int) -> None:
+        self._send(("release", claim))
+
+
+def _host_main(conn, host_id: int) -> None:
+    send_lock = threading.Lock()
+
+    def send(msg) -> None:
+        with send_lock:
+            try:
+                conn.send(msg)
+            except (BrokenPipeError, EOFError, OSError):
+                pass
+
+    camera.set_process_sinks(lambda farm_id, ev: send(("event", farm_id, ev)),
+                             lambda *identity: send(("identity", *identity)))
+    coordinator = _HostCoordinator(send)
+    camera.set_coordinator(coordinator)
+    # Escritas deste processo invalidam o cache de respostas do processo da API
+    db.set_version_listener(lambda farm_id: send(("version", farm_id)))
+    workers: dict[int, camera.CameraWorker] = {}
+    rings: dict[int, ShmRing] = {}
+
+    def stop(cam_id: int) -> None:
+        w = workers.pop(cam_id, None)
+        if w:
+            w.stop()
+            if w._thread:
+                w._thread.join(STOP_JOIN)
+        ring = rings.pop(cam_id, None)
+        if ring:
+            ring.close()
+
+    def report() -> None:
+        while True:
+            time.sleep(STATS_INTERVAL)
+            for cam_id, w in list(workers.items()):
+                send(("stats", cam_id, w.stats()))
+            send(("metrics", REGISTRY.snapshot()))
+
+    threading.Thread(target=report, name="host-stats", daemon=True).start()
+    print(f"[CameraHost {host_id}] Processo iniciado (pid={mp.current_process().pid})")
+
+    while True:
+        try:
+            msg = conn.recv()
+        except (EOFError, OSError):
+            break   # processo da API terminou
+        op = msg[0]
+        try:
+            if op == "start":
+                _, cam_id, opts, ring_name = msg
+                stop(cam_id)
+                ring = ShmRing(ring_name, CAMERA_SHM_SLOTS, SLOT_SIZE)
+                w = camera.CameraWorker(
+                    cam_id, opts["source_url"], opts["cam_name"], camera.get_identifier(opts["farm_id"]),
+                    opts["farm_id"], motion_threshold=opts["motion_threshold"],
+                    detect_source_url=opts["detect_source_url"], detect_max_side=opts["detect_max_side"],
+                    broadcaster=_RingPublisher(cam_id, ring, send),
+                )
+                w.start()
+                workers[cam_id], rings[cam_id] = w, ring
+            elif op == "stop":
+                stop(msg[1])
+            elif op == "tiers":
+                w = workers.get(msg[1])
+                if w:
+                    w.broadcaster.tiers = set(msg[2])
+            elif op == "reload":
+                camera.reload_identifier(msg[1])
+            elif op == "identity":
+                camera.add_identity(*msg[1:])
+            elif op == "reply":
+                coordinator.resolve(msg[1], msg[2])
+            elif op == "shutdown":
+                break
+        except Exception as e:
+            print(f"[CameraHost {host_id}] Erro em {op!r}: {e}")
+
+    for cam_id in list(workers):
+        stop(cam_id)
+    get_writer().close()
+
+
+# ---------------------------------------------------------------------------
+# Processo da API
+# ---------------------------------------------------------------------------
+
+class _Coordinator:
+    """
+    "Entrada do dia" e reservas de auto-cadastro comuns a todos os hosts (e
+    à ingestão, que roda no processo da API). Mesma interface do _HostCoordinator.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._seen: dict[tuple, str] = {}
+        self._claims: dict[int, tuple] = {}   # id -> (farm_id, entity_type, embedding, expira_em)
+        self._next_id = 0
+
+    def mark_seen(self, key: tuple, day: str) -> bool:
+        with self._lock:
+            if self._seen.get(key) == day:
+                return False
+            self._seen[key] = day
+            return True
+
+    def unmark_seen(self, key: tuple, day: str) -> None:
+        with self._lock:
+            if self._seen.get(key) == day:
+                del self._seen[key]
+
+    def claim_registration(self, farm_id: int, entity_type: str, embedding) -> int | None:
+        identifier = camera.get_identifier(farm_id)   # fora do lock: pode carregar do banco
+        with self._lock:
+            now = time.monotonic()
+            self._claims = {k: c for k, c in self._claims.items() if c[3] > now}
+            if camera._is_duplicate(embedding, entity_type, identifier):
+                return None
+            for f, et, emb, _ in self._claims.values():
+                if f == farm_id and et == entity_type and float(np.dot(emb, embedding)) >= camera.DEDUP_GUARD:
+                    return None
+            self._next_id += 1
+            self._claims[self._next_id] = (farm_id, entity_type, embedding, now + CLAIM_TTL)
+            return self._next_id
+
+    def release(self, claim: int) -> None:
+        with self._lock:
+            self._claims.pop(claim, None)
+
+
+_coordinator = _Coordinator()
+
+
+class _ProcessHost:
+    def __init__(self, host_id: int):
+        self.host_id = host_id
+        self.cameras: dict[int, "ProcessCameraWorker"] = {}
+        self.process = None
+        self.metrics: dict = {}   # último snapshot do registro de métricas do host
+        self._send_lock = threading.Lock()
+        self._closing = False
+        self._spawn()
+
+    def _spawn(self) -> None:
+        parent, child = _ctx.Pipe()
+        self.conn = parent
+        self.process = _ctx.Process(target=_host_main, args=(child, self.host_id),
+                                    name=f"camera-host-{self.host_id}", daemon=True)
+        self.process.start()
+        child.close()
+        threading.Thread(target=self._read_loop, args=(parent,),
+                         name=f"camera-host-{self.host_id}-reader", daemon=True).start()
+
+    def send(self, msg) -> None:
+        with self._send_lock:
+            try:
+                self.conn.send(msg)
+            except (BrokenPipeError, OSError):
+                pass
+
+    def _read_loop(self, conn) -> None:
+        while True:
+            try:
+                msg = conn.recv()
+            except (EOFError, OSError):
+                break
+            try:
+                self._dispatch(msg)
+            except Exception as e:
+                print(f"[CameraHost {self.host_id}] Erro ao tratar {msg[0]!r}: {e}")
+        if not self._closing:
+            print(f"[CameraHost {self.host_id}] Processo terminou inesperadamente — reiniciando.")
+            time.sleep(RESPAWN_DELAY)
+            if not self._closing:
+                self._spawn()
+                for w in list(self.cameras.values()):
+                    w._send_start()
+
+    def _dispatch(self, msg) -> None:
+        op = msg[0]
+        if op == "frame":
+            _, cam_id, slots = msg
+            w = self.cameras.get(cam_id)
+            if not w:
+                return
+            jpegs = {}
+            for tier, (slot, seq) in slots.items():
+                data = w.ring.read(slot, seq)
+                if data is not None:
+                    jpegs[tier] = data
+            if jpegs:
+                w.broadcaster.publish(StreamFrame.from_jpegs(jpegs))
+        elif op == "event":
+            camera._broadcast_from_thread(msg[1], msg[2])
+        elif op == "stats":
+            w = self.cameras.get(msg[1])
+            if w:
+                w._child_stats = msg[2]
+        elif op == "metrics":
+            self.metrics = msg[1]
+        elif op == "version":
+            db.bump_version(msg[1], notify=False)
+        elif op == "seen":
+            self.send(("reply", msg[1], _coordinator.mark_seen(msg[2], msg[3])))
+        elif op == "unseen":
+            _coordinator.unmark_seen(msg[1], msg[2])
+        elif op == "claim":
+            self.send(("reply", msg[1], _coordinator.claim_registration(*msg[2:])))
+        elif op == "release":
+            _coordinator.release(msg[1])
+        elif op == "identity":
+            camera.add_identity(*msg[1:])
+            with _hosts_lock:
+                others = [h for h in _hosts if h is not self]
+            for h in others:
+                h.send(msg)
+
+    def shutdown(self) -> None:
+        self._closing = True
+        self.send(("shutdown",))
+        self.process.join(5.0)
+        if self.process.is_alive():
+            self.process.terminate()
+
+
+_hosts: list[_ProcessHost] = []
+_hosts_lock = threading.Lock()
+_next_host_id = 1
+
+
+def _acquire_host(worker: "ProcessCameraWorker") -> _ProcessHost:
+    global _next_host_id
+    # Ingestão (neste processo) também reserva pelo coordenador, junto com os hosts
+    camera.set_coordinator(_coordinator)
+    with _hosts_lock:
+        host = next((h for h in _hosts if len(h.cameras) < max(1, CAMERA_PROCESS_GROUP)), None)
+        if host is None:
+            host = _ProcessHost(_next_host_id)
+            _next_host_id += 1
+            _hosts.append(host)
+        host.cameras[worker.cam_id] = worker
+        return host
+
+
+def _release_host(host: _ProcessHost, worker: "ProcessCameraWorker") -> None:
+    with _hosts_lock:
+        if host.cameras.get(worker.cam_id) is worker:
+            del host.cameras[worker.cam_id]
+        if host.cameras or host not in _hosts:
+            return
+        _hosts.remove(host)
+    # Host vazio: encerra em background para não bloquear quem chamou stop
+    threading.Thread(target=host.shutdown, daemon=True).start()
+
+
+def host_metrics() -> list[dict]:
+    """Snapshots de métricas dos hosts ativos (para REGISTRY.render)."""
+    with _hosts_lock:
+        return [h.metrics for h in _hosts if h.metrics]
+
+
+def relay_reload(farm_id: int | None) -> None:
+    """Repassa reload_identifier() aos hosts (None = todas as fazendas)."""
+    with _hosts_lock:
+        hosts = list(_hosts)
+    for h in hosts:
+        h.send(("reload", farm_id))
+
+
+class ProcessCameraWorker:
+    """Proxy, no processo da API, de um CameraWorker que roda num host."""
+
+    def __init__(self, cam_id, source_url, cam_name, farm_id=0, motion_threshold=None,
+                 detect_source_url=None, detect_max_side=None):
+        self.cam_id = cam_id
+        self.source_url = source_url
+        self.cam_name = cam_name
+        self.farm_id = farm_id
+        self.broadcaster = get_broadcaster(cam_id)
+        self.ring: ShmRing | None = None
+        self.host: _ProcessHost | None = None
+        self._options = dict(source_url=source_url, cam_name=cam_name, farm_id=farm_id,
+                             motion_threshold=motion_threshold, detect_source_url=detect_source_url,
+                             detect_max_side=detect_max_side)
+        self._child_stats: dict = {}
+        self._running = False
+
+    def start(self) -> None:
+        if self._running:
+            return
+        camera.get_identifier(self.farm_id)   # o _Coordinator confere cadastros contra este identificador
+        self.ring = ShmRing(slots=CAMERA_SHM_SLOTS, slot_size=SLOT_SIZE, create=True)
+        self._running = True
+        self.host = _acquire_host(self)
+        self.broadcaster.on_viewers_changed = self._send_tiers
+        self._send_start()
+        print(f"[Camera {self.cam_id}] Worker iniciado no host {self.host.host_id} "
+              f"(farm={self.farm_id}) -> {self.source_url}")
+
+    def _send_start(self) -> None:
+        self.host.send(("start", self.cam_id, self._options, self.ring.name))
+        self._send_tiers(self.broadcaster.watched_tiers())
+
+    def _send_tiers(self, tiers: set[str]) -> None:
+        if self._running:
+            self.host.send(("tiers", self.cam_id, sorted(tiers)))
+
+    def stop(self) -> None:
+        if not self._running:
+            return
+        self._running = False
+        if self.broadcaster.on_viewers_changed == self._send_tiers:
+            self.broadcaster.on_viewers_changed = None
+        self.host.send(("stop", self.cam_id))
+        _release_host(self.host, self)
+        self.ring.unlink()
+
+    def get_latest_frame(self):
+        """JPEG (tier padrão) do último frame, ou None."""
+        frame = self.broadcaster.latest()[1]
+        return frame.jpeg() if frame else None
+
+    def stats(self) -> dict:
+        out = {"camera_id": self.cam_id, **self._child_stats}
+        out["process_stream"] = out.pop("stream", None)
+        out.update({
+            "running": self._running,
+            "process": {
+                "host":  self.host.host_id if self.host else None,
+                "pid":   self.host.process.pid if self.host else None,
+                "alive": bool(self.host and self.host.process.is_alive()),
+            },
+            "stream": self.broadcaster.stats(),
+        })
+        return out
@@ -6,19 +6,27 @@ Endpoints:
   POST   /api/cameras              — adiciona camera
   PUT    /api/cameras/{id}         — edita camera (nome, URL, tipo, ativo)
   DELETE /api/cameras/{id}         — remove camera
-  GET    /api/cameras/{id}/stream  — MJPEG com anotacoes YOLO
+  GET    /api/cameras/{id}/stats   — estatisticas do worker (gate de movimento, viewers, etc.)
+  GET    /api/cameras/{id}/stream  — MJPEG com anotacoes YOLO (?tier=thumb|standard|full)
+  POST   /api/cameras/{id}/trace   — (admin) captura spans por N frames ou T segundos
+  GET    /api/cameras/{id}/traces  — capturas recentes da camera
+  GET    /api/cameras/{id}/trace/{trace_id}           — status da captura
+  GET    /api/cameras/{id}/trace/{trace_id}/download  — JSON no formato Chrome trace (Perfetto)
 """
 
 import asyncio
 
 import cv2
 import numpy as np
-from fastapi import APIRouter, Depends, HTTPException
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import JSONResponse, StreamingResponse
 
 import app.db.database as db
-from app.api.auth import get_current_user
+from app.api.auth import get_current_user, require_admin
 from app.api.camera import get_worker, start_worker, stop_worker
+from app.core.broadcaster import DEFAULT_TIER, STREAM_TIERS, get_broadcaster
+from app.core.config import TRACE_MAX_SECONDS
+from app.core.tracing import TraceCapture, get_capture, list_captures, register_capture
 from app.db.schemas import CameraCreate, CameraOut, CameraUpdate
 
 router = APIRouter(prefix="/api/cameras", tags=["cameras"])
@@ -40,6 +48,7 @@ def _no_signal_jpeg() -> bytes:
 
 
 _PLACEHOLDER = _no_signal_jpeg()   # gerado uma vez
+_PLACEHOLDER_INTERVAL = 1.0        # s sem frame novo até reenviar o placeholder
 
 
 # ---------------------------------------------------------------------------
@@ -54,10 +63,15 @@ def list_cameras(current_user: dict = Depends(get_current_user)):
 @router.post("", response_model=CameraOut, status_code=201)
 def add_camera(body: CameraCreate, current_user: dict = Depends(get_current_user)):
     farm_id = current_user["farm_id"]
-    cam_id = db.add_camera(body.name, body.source_url, body.type or "ip", farm_id)
+    cam_id = db.add_camera(body.name, body.source_url, body.type or "ip", farm_id,
+                           motion_threshold=body.motion_threshold,
+                           detect_source_url=body.detect_source_url or None,
+                           detect_max_side=body.detect_max_side)
     cam = db.get_camera(cam_id, farm_id)
     if cam["is_active"]:
-        start_worker(cam_id, body.source_url, body.name, farm_id)
+        start_worker(cam_id, body.source_url, body.name, farm_id,
+                     motion_threshold=cam["motion_threshold"],
+                     detect_source_url=cam["detect_source_url"], detect_max_side=cam["detect_max_side"])
     return cam
 
 
@@ -78,12 +92,17 @@ def update_camera(
         cam_type=body.type,
         is_active=body.is_active,
         farm_id=farm_id,
+        motion_threshold=body.motion_threshold,
+        detect_source_url=body.detect_source_url,
+        detect_max_side=body.detect_max_side,
     )
     cam = db.get_camera(cam_id, farm_id)
 
     if cam["is_active"]:
         stop_worker(cam_id)
-        start_worker(cam_id, cam["source_url"], cam["name"], farm_id)
+        start_worker(cam_id, cam["source_url"], cam["name"], farm_id,
+                     motion_threshold=cam["motion_threshold"],
+                     detect_source_url=cam["detect_source_url"], detect_max_side=cam["detect_max_side"])
     else:
         stop_worker(cam_id)
 
@@ -102,28 +121,105 @@ def delete_camera(
     db.delete_camera(cam_id, farm_id)
 
 
+@router.get("/{cam_id}/stats")
+def camera_stats(cam_id: int, current_user: dict = Depends(get_current_user)):
+    if not db.get_camera(cam_id, current_user["farm_id"]):
+        raise HTTPException(status_code=404, detail="Camera nao encontrada")
+    worker = get_worker(cam_id)
+    if worker:
+        return worker.stats()
+    return {"camera_id": cam_id, "running": False, "stream": get_broadcaster(cam_id).stats()}
+
+
 # ---------------------------------------------------------------------------
 # Stream MJPEG
 # ---------------------------------------------------------------------------
 
 @router.get("/{cam_id}/stream")
-async def stream_camera(cam_id: int):
+async def stream_camera(cam_id: int, tier: str = Query(DEFAULT_TIER)):
     """
     Stream MJPEG da camera com bounding boxes do YOLO.
     Nao requer autenticacao para compatibilidade com <img src=...>.
+    tier: thumb (320px), standard (ate 1280px) ou full (resolucao original).
     """
     if not db.get_camera(cam_id):
         raise HTTPException(status_code=404, detail="Camera nao encontrada")
+    if tier not in STREAM_TIERS:
+        raise HTTPException(status_code=422, detail=f"tier invalido (use {', '.join(STREAM_TIERS)})")
+    broadcaster = get_broadcaster(cam_id)
 
     async def gen():
-        while True:
-            worker = get_worker(cam_id)
-            frame  = worker.get_latest_frame() if worker else None
-            yield (
+        # Um envio por frame novo; cliente lento pula direto para o mais recente
+        async for frame in broadcaster.frames(tier, timeout=_PLACEHOLDER_INTERVAL):
+            if frame is None and get_worker(cam_id):
+                # Sem frame novo (cena parada / camera travada): reenvia o ultimo
+                latest = broadcaster.latest()[1]
+                frame = await asyncio.to_thread(latest.jpeg, tier) if latest else None
+            chunk = (
                 b"--frame\r\nContent-Type: image/jpeg\r\n\r\n"
                 + (frame or _PLACEHOLDER)
                 + b"\r\n"
             )
-            await asyncio.sleep(0.033)
+            yield chunk
+            broadcaster.record_sent(len(chunk))
 
     return StreamingResponse(gen(), media_type="multipart/x-mixed-replace; boundary=frame")
+
+
+# ---------------------------------------------------------------------------
+# Trace por frame
+# ---------------------------------------------------------------------------
+
+def _get_trace(cam_id: int, trace_id: str, farm_id: int) -> TraceCapture:
+    capture = get_capture(trace_id)
+    if not capture or capture.cam_id != cam_id or not db.get_camera(cam_id, farm_id):
+        raise HTTPException(status_code=404, detail="Trace nao encontrado")
+    return capture
+
+
+@router.post("/{cam_id}/trace", status_code=202)
+def start_trace(
+    cam_id: int,
+    frames: int = Query(0, ge=0),
+    seconds: float = Query(0.0, ge=0, le=TRACE_MAX_SECONDS),
+    current_user: dict = Depends(require_admin),
+):
+    """
+    Grava spans de cada etapa do worker ate `frames` frames ou `seconds`
+    segundos (o que vier primeiro; sem nenhum dos dois, TRACE_MAX_SECONDS).
+    """
+    if not db.get_camera(cam_id, current_user["farm_id"]):
+        raise HTTPException(status_code=404, detail="Camera nao encontrada")
+    worker = get_worker(cam_id)
+    if not worker:
+        raise HTTPException(status_code=409, detail="Camera nao esta rodando")
+    if not hasattr(worker, "start_trace"):
+        raise HTTPException(status_code=409, detail="Trace disponivel apenas com CAMERA_WORKER_MODE=thread")
+    capture = TraceCapture(cam_id, frames=frames, seconds=seconds)
+    if not worker.start_trace(capture):
+        raise HTTPException(status_code=409, detail="Ja existe uma captura em andamento nesta camera")
+    register_capture(capture)
+    return capture.info()
+
+
+@router.get("/{cam_id}/traces")
+def list_traces(cam_id: int, current_user: dict = Depends(require_admin)):
+    if not db.get_camera(cam_id, current_user["farm_id"]):
+        raise HTTPException(status_code=404, detail="Camera nao encontrada")
+    return [c.info() for c in reversed(list_captures(cam_id))]
+
+
+@router.get("/{cam_id}/trace/{trace_id}")
+def trace_status(cam_id: int, trace_id: str, current_user: dict = Depends(require_admin)):
+    return _get_trace(cam_id, trace_id, current_user["farm_id"]).info()
+
+
+@router.get("/{cam_id}/trace/{trace_id}/download")
+def download_trace(cam_id: int, trace_id: str, current_user: dict = Depends(require_admin)):
+    """Arquivo .json para abrir em ui.perfetto.dev ou chrome://tracing."""
+    capture = _get_trace(cam_id, trace_id, current_user["farm_id"])
+    if capture.active:
+        raise HTTPException(status_code=409, detail="Captura ainda em andamento")
+    filename = f"camera{cam_id}_{capture.created_at:%Y%m%d_%H%M%S}_{trace_id}.json"
+    return JSONResponse(capture.to_chrome(),
+                        headers={"Content-Disposition": f'attachment; filename="{filename}"'})
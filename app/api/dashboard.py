@@ -2,10 +2,13 @@
 app/api/dashboard.py — Estatisticas para o dashboard.
 """
 
-from fastapi import APIRouter, Depends
+from datetime import date
+
+from fastapi import APIRouter, Depends, Query
 
 import app.db.database as db
-from app.api.auth import get_current_user
+from app.api.auth import get_current_user, require_admin
+from app.db.cache import response_cache
 from app.db.schemas import DashboardStats
 
 router = APIRouter(prefix="/api/dashboard", tags=["dashboard"])
@@ -13,4 +16,19 @@ router = APIRouter(prefix="/api/dashboard", tags=["dashboard"])
 
 @router.get("/stats", response_model=DashboardStats)
 def get_stats(current_user: dict = Depends(get_current_user)):
-    return db.get_dashboard_stats(current_user["farm_id"])
+    farm_id = current_user["farm_id"]
+    # A data entra na chave: "hoje", o mês e a janela de vacinas mudam sem escrita
+    return response_cache.get("dashboard", farm_id, (date.today().isoformat(),),
+                              lambda: db.get_dashboard_stats(farm_id))
+
+
+@router.get("/cache/stats")
+def cache_stats(current_user: dict = Depends(get_current_user)):
+    """Hits/misses por endpoint e ocupação do cache de respostas, da fazenda do usuário."""
+    return response_cache.stats(current_user["farm_id"])
+
+
+@router.post("/stats/check")
+def check_stats(repair: bool = Query(False), current_user: dict = Depends(require_admin)):
+    """Confere os contadores do dashboard contra as tabelas; repair=true reconstrói se divergirem."""
+    return db.check_dashboard_stats(current_user["farm_id"], repair=repair)
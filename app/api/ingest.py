@@ -0,0 +1,301 @@
+"""
+app/api/ingest.py — Ingestão offline de vídeos (gravações, dumps de cartão SD).
+
+Endpoints:
+  POST /api/ingest/videos               — upload de vídeo (multipart, até INGEST_MAX_UPLOAD_MB) e início do job
+  POST /api/ingest/videos/path          — vídeo já presente no servidor (admin)
+  GET  /api/ingest/jobs                 — jobs da fazenda
+  GET  /api/ingest/jobs/{id}            — progresso de um job
+  POST /api/ingest/jobs/{id}/cancel     — cancela um job
+
+O job roda o mesmo pipeline das câmeras (detecção → rastreamento → embedding
+→ identificação/auto-cadastro) tão rápido quanto o hardware permite, sem
+pacing em tempo real: processa 1 a cada `stride` frames (os demais só passam
+por grab()), envia lotes de INGEST_BATCH frames de uma vez ao scheduler de
+inferência e grava movimentos com a hora original de cada frame
+(started_at + índice/fps).
+
+Jobs terminados ficam na listagem por INGEST_JOB_TTL_H horas (no máximo
+INGEST_JOB_HISTORY deles) e são podados a cada novo job.
+"""
+
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Optional
+
+import cv2
+from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile
+
+from app.ai.detector import scale_detections
+from app.ai.scheduler import get_scheduler
+from app.ai.tracker import IoUTracker
+from app.api.auth import get_current_user, require_admin
+from app.api.camera import IdentitySource, _broadcast_from_thread, _downscale, get_identifier
+from app.core.config import (DETECT_MAX_SIDE, INGEST_BATCH, INGEST_DIR, INGEST_JOB_HISTORY, INGEST_JOB_TTL_H,
+                             INGEST_MAX_JOBS, INGEST_MAX_UPLOAD_MB, INGEST_SAMPLE_FPS, TRACK_CONFIDENT_SIM,
+                             TRACK_REID_INTERVAL)
+from app.db.schemas import VideoIngestRequest
+from app.db.writer import get_writer
+
+router = APIRouter(prefix="/api/ingest", tags=["ingest"])
+
+FALLBACK_FPS = 25.0   # quando o container não informa o FPS
+VIDEO_EXTENSIONS = {".mp4", ".m4v", ".mov", ".avi", ".mkv", ".webm", ".ts", ".mts", ".mpg", ".mpeg",
+                    ".h264", ".h265", ".dav"}
+FINISHED = ("done", "failed", "cancelled")
+
+
+class VideoIngestJob(IdentitySource):
+    """Processa um arquivo de vídeo inteiro para uma fazenda."""
+
+    def __init__(self, farm_id: int, path: Path, filename: str, started_at: datetime | None = None,
+                 stride: int | None = None, delete_after: bool = False):
+        self.job_id = uuid.uuid4().hex[:12]
+        self.cam_id = 0
+        self.cam_name = f"Vídeo {filename}"
+        self.farm_id = farm_id
+        self.path = path
+        self.filename = filename
+        self.started_at = started_at
+        self.stride = stride
+        self.delete_after = delete_after
+        self.identifier = get_identifier(farm_id)
+        self._reg_buffer = deque(maxlen=50)
+        self._seen: dict[tuple, str] = {}
+        self._cancel = threading.Event()
+        self.status = "queued"
+        self.error = ""
+        self.created_at = datetime.now()
+        self.finished_at: datetime | None = None
+        self.frames_total = 0
+        self.frames_read = 0
+        self.frames_processed = 0
+        self.detections = 0
+        self.registered = 0
+        self.movements = 0
+        self.elapsed = 0.0
+        self.source_fps = 0.0
+
+    @property
+    def movement_source(self):
+        return f"video_{self.job_id}"
+
+    def _mark_seen(self, key, day):
+        # Controle por job: o dia vem da gravação, não pode se misturar com o das câmeras ao vivo
+        if self._seen.get(key) == day:
+            return False
+        self._seen[key] = day
+        self.movements += 1
+        return True
+
+    def _unmark_seen(self, key, day):
+        if self._seen.get(key) == day:
+            del self._seen[key]
+            self.movements -= 1
+
+    def cancel(self) -> None:
+        self._cancel.set()
+
+    def run(self) -> None:
+        if self._cancel.is_set():
+            self.status = "cancelled"
+            self.finished_at = datetime.now()
+            if self.delete_after:
+                self.path.unlink(missing_ok=True)
+            return
+        self.status = "running"
+        t0 = time.perf_counter()
+        cap = cv2.VideoCapture(str(self.path))
+        try:
+            if not cap.isOpened():
+                raise RuntimeError("não foi possível abrir o vídeo")
+            self._process(cap, t0)
+            get_writer().flush()   # "done" só depois de movimentos e fotos gravados
+            self.status = "cancelled" if self._cancel.is_set() else "done"
+        except Exception as e:
+            self.status, self.error = "failed", str(e)
+            print(f"[Ingest {self.job_id}] Falhou: {e}")
+        finally:
+            cap.release()
+            self.elapsed = time.perf_counter() - t0
+            self.finished_at = datetime.now()
+            if self.delete_after:
+                self.path.unlink(missing_ok=True)
+        print(f"[Ingest {self.job_id}] {self.status}: {self.frames_read} frames lidos, "
+              f"{self.frames_processed} processados em {self.elapsed:.1f}s")
+
+    def _process(self, cap, t0: float) -> None:
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        self.source_fps = fps if 0 < fps < 1000 else FALLBACK_FPS
+        self.frames_total = max(0, int(cap.get(cv2.CAP_PROP_FRAME_COUNT)))
+        stride = self.stride or max(1, round(self.source_fps / max(INGEST_SAMPLE_FPS, 0.01)))
+        self.stride = stride
+        if self.started_at is None:
+            # Sem hora informada: assume que o arquivo foi fechado ao fim da gravação
+            mtime = datetime.fromtimestamp(self.path.stat().st_mtime)
+            self.started_at = mtime - timedelta(seconds=self.frames_total / self.source_fps)
+
+        scheduler = get_scheduler()
+        tracker = IoUTracker(reid_interval=TRACK_REID_INTERVAL, confident_sim=TRACK_CONFIDENT_SIM)
+        eof = False
+        while not eof and not self._cancel.is_set():
+            chunk = []   # (índice do frame, frame)
+            while len(chunk) < max(1, INGEST_BATCH):
+                idx = self.frames_read
+                if idx % stride == 0:
+                    ok, frame = cap.read()
+                    if ok:
+                        chunk.append((idx, frame))
+                else:
+                    ok = cap.grab()   # frame pulado: sem conversão para BGR
+                if not ok:
+                    eof = True
+                    break
+                self.frames_read += 1
+
+            # Todos os frames do lote vão juntos ao scheduler, que os agrupa em lotes do YOLO
+            det_frames = [_downscale(f, DETECT_MAX_SIDE) for _, f in chunk]
+            futures = [scheduler.submit("detect", df) for df in det_frames]
+            for (idx, frame), det_frame, fut in zip(chunk, det_frames, futures):
+                dh, dw = det_frame.shape[:2]
+                detections = scale_detections(fut.result(), frame.shape[1] / dw, frame.shape[0] / dh)
+                pending_events = []
+                self._track_and_identify(detections, lambda f=frame: f, scheduler, tracker, pending_events,
+                                         detected_at=self.started_at + timedelta(seconds=idx / self.source_fps))
+                self.detections += len(detections)
+                self.registered += len(pending_events)
+                for ev in pending_events:
+                    _broadcast_from_thread(self.farm_id, ev)
+                self.frames_processed += 1
+            self.elapsed = time.perf_counter() - t0
+
+    def to_dict(self) -> dict:
+        elapsed = self.elapsed or 1e-9
+        return {
+            "job_id":           self.job_id,
+            "filename":         self.filename,
+            "status":           self.status,
+            "error":            self.error,
+            "created_at":       self.created_at.isoformat(timespec="seconds"),
+            "started_at":       self.started_at.isoformat(timespec="seconds") if self.started_at else None,
+            "stride":           self.stride,
+            "source_fps":       round(self.source_fps, 2),
+            "frames_total":     self.frames_total,
+            "frames_read":      self.frames_read,
+            "frames_processed": self.frames_processed,
+            "progress":         round(self.frames_read / self.frames_total, 4) if self.frames_total else 0.0,
+            "fps":              round(self.frames_read / elapsed, 2) if self.elapsed else 0.0,
+            "processed_fps":    round(self.frames_processed / elapsed, 2) if self.elapsed else 0.0,
+            "elapsed_s":        round(self.elapsed, 2),
+            "detections":       self.detections,
+            "registered":       self.registered,
+            "movements":        self.movements,
+        }
+
+
+_jobs: dict[str, VideoIngestJob] = {}
+_jobs_lock = threading.Lock()
+_executor = ThreadPoolExecutor(max_workers=max(1, INGEST_MAX_JOBS), thread_name_prefix="ingest")
+
+
+def _prune_jobs() -> None:
+    """Remove jobs terminados além do TTL e, acima de INGEST_JOB_HISTORY, os mais antigos. Chamar com _jobs_lock."""
+    cutoff = datetime.now() - timedelta(hours=INGEST_JOB_TTL_H)
+    finished = sorted((j for j in _jobs.values() if j.status in FINISHED and j.finished_at),
+                      key=lambda j: j.finished_at)
+    excess = len(finished) - max(0, INGEST_JOB_HISTORY)
+    for i, job in enumerate(finished):
+        if i < excess or job.finished_at < cutoff:
+            del _jobs[job.job_id]
+
+
+def _submit(job: VideoIngestJob) -> dict:
+    with _jobs_lock:
+        _prune_jobs()
+        _jobs[job.job_id] = job
+    _executor.submit(job.run)
+    return job.to_dict()
+
+
+def _get_job(job_id: str, farm_id: int) -> VideoIngestJob:
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+    if not job or job.farm_id != farm_id:
+        raise HTTPException(status_code=404, detail="Job nao encontrado")
+    return job
+
+
+def _is_readable_video(path: Path) -> bool:
+    """O OpenCV abre o arquivo e decodifica o primeiro frame."""
+    cap = cv2.VideoCapture(str(path))
+    try:
+        return cap.isOpened() and cap.grab()
+    finally:
+        cap.release()
+
+
+@router.post("/videos", status_code=202)
+def upload_video(
+    file: UploadFile = File(...),
+    started_at: Optional[datetime] = Form(None),
+    stride: Optional[int] = Form(None, ge=1),
+    current_user: dict = Depends(get_current_user),
+):
+    """Recebe o arquivo, grava em INGEST_DIR e enfileira o processamento."""
+    filename = Path(file.filename or "video").name
+    content_type = (file.content_type or "").lower()
+    if not content_type.startswith("video/") and Path(filename).suffix.lower() not in VIDEO_EXTENSIONS:
+        raise HTTPException(status_code=415, detail="Arquivo nao e um video")
+    INGEST_DIR.mkdir(parents=True, exist_ok=True)
+    path = INGEST_DIR / f"{uuid.uuid4().hex}_{filename}"
+    max_bytes = INGEST_MAX_UPLOAD_MB * 1024 * 1024
+    written = 0
+    try:
+        with path.open("wb") as out:
+            while chunk := file.file.read(1 << 20):
+                written += len(chunk)
+                if written > max_bytes:
+                    raise HTTPException(status_code=413,
+                                        detail=f"Video maior que o limite de {INGEST_MAX_UPLOAD_MB} MB")
+                out.write(chunk)
+        if not _is_readable_video(path):
+            raise HTTPException(status_code=415, detail="Arquivo nao e um video legivel")
+    except BaseException:
+        path.unlink(missing_ok=True)
+        raise
+    job = VideoIngestJob(current_user["farm_id"], path, filename, started_at, stride, delete_after=True)
+    return _submit(job)
+
+
+@router.post("/videos/path", status_code=202)
+def ingest_video_path(body: VideoIngestRequest, current_user: dict = Depends(require_admin)):
+    """Processa um video que ja esta no disco do servidor (ex.: cartao SD montado)."""
+    path = Path(body.path)
+    if not path.is_file():
+        raise HTTPException(status_code=404, detail="Arquivo nao encontrado")
+    job = VideoIngestJob(current_user["farm_id"], path, path.name, body.started_at, body.stride)
+    return _submit(job)
+
+
+@router.get("/jobs")
+def list_jobs(current_user: dict = Depends(get_current_user)):
+    with _jobs_lock:
+        jobs = [j for j in _jobs.values() if j.farm_id == current_user["farm_id"]]
+    return [j.to_dict() for j in sorted(jobs, key=lambda j: j.created_at, reverse=True)]
+
+
+@router.get("/jobs/{job_id}")
+def get_job(job_id: str, current_user: dict = Depends(get_current_user)):
+    return _get_job(job_id, current_user["farm_id"]).to_dict()
+
+
+@router.post("/jobs/{job_id}/cancel")
+def cancel_job(job_id: str, current_user: dict = Depends(get_current_user)):
+    job = _get_job(job_id, current_user["farm_id"])
+    job.cancel()
+    return job.to_dict()
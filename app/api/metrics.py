@@ -0,0 +1,22 @@
+"""
+app/api/metrics.py — Métricas no formato texto do Prometheus.
+
+GET /api/metrics — sem autenticação (scrape do Prometheus), como /api/health.
+"""
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.core.config import CAMERA_WORKER_MODE
+from app.core.metrics import CONTENT_TYPE, REGISTRY
+
+router = APIRouter(prefix="/api", tags=["metrics"])
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    extra = []
+    if CAMERA_WORKER_MODE == "process":
+        from app.api.camera_process import host_metrics
+        extra = host_metrics()
+    return PlainTextResponse(REGISTRY.render(extra), media_type=CONTENT_TYPE)
@@ -7,6 +7,7 @@ from typing import Optional
 
 import app.db.database as db
 from app.api.auth import get_current_user
+from app.db.cache import response_cache
 from app.db.schemas import MovementCreate, MovementOut
 
 router = APIRouter(prefix="/api/movements", tags=["movements"])
@@ -18,7 +19,9 @@ def list_movements(
     limit: int = 100,
     current_user: dict = Depends(get_current_user),
 ):
-    return db.list_movements(entity_type, limit, current_user["farm_id"])
+    farm_id = current_user["farm_id"]
+    return response_cache.get("movements", farm_id, (entity_type, limit),
+                              lambda: db.list_movements(entity_type, limit, farm_id))
 
 
 @router.post("", response_model=MovementOut, status_code=201)
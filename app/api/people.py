@@ -7,6 +7,7 @@ from fastapi.responses import FileResponse
 
 import app.db.database as db
 from app.api.auth import get_current_user
+from app.db.cache import response_cache
 from app.db.schemas import PersonOut, PersonUpdate
 
 router = APIRouter(prefix="/api/people", tags=["people"])
@@ -14,7 +15,8 @@ router = APIRouter(prefix="/api/people", tags=["people"])
 
 @router.get("", response_model=list[PersonOut])
 def list_people(current_user: dict = Depends(get_current_user)):
-    return db.list_people(current_user["farm_id"])
+    farm_id = current_user["farm_id"]
+    return response_cache.get("people", farm_id, (), lambda: db.list_people(farm_id))
 
 
 @router.get("/{person_id}", response_model=PersonOut)
@@ -0,0 +1,218 @@
+"""
+app/core/broadcaster.py — Distribuição de frames MJPEG por câmera.
+
+O worker da câmera publica cada frame com um número de sequência; os
+viewers aguardam a próxima sequência em vez de fazer polling. Cada viewer
+lê sempre o frame mais recente: se o cliente for lento, os frames
+intermediários são descartados (contados em `frames_dropped`) e nada se
+acumula em buffer.
+
+O frame publicado (StreamFrame) não é anotado nem codificado pelo worker:
+a anotação e o JPEG de cada tier (STREAM_TIERS) são gerados sob demanda,
+no máximo uma vez por frame, e compartilhados entre os viewers do tier.
+Sem viewers, nada é codificado.
+
+O broadcaster vive independente do worker (sobrevive a restart da câmera),
+então o stream aberto continua recebendo frames do novo worker.
+"""
+
+import asyncio
+import threading
+import time
+from collections import Counter
+from collections.abc import AsyncIterator, Callable
+
+import cv2
+import numpy as np
+
+from app.core.metrics import CAMERA_STAGE_SECONDS
+
+# tier → (largura máxima em px, 0 = original; qualidade JPEG)
+STREAM_TIERS = {
+    "thumb":    (320, 50),
+    "standard": (1280, 75),
+    "full":     (0, 90),
+}
+DEFAULT_TIER = "standard"
+
+
+def encode_jpeg(image: np.ndarray, tier: str = DEFAULT_TIER) -> bytes:
+    """Reduz a imagem à largura do tier (se maior) e codifica em JPEG."""
+    max_width, quality = STREAM_TIERS[tier]
+    h, w = image.shape[:2]
+    if max_width and w > max_width:
+        image = cv2.resize(image, (max_width, max(1, round(h * max_width / w))),
+                           interpolation=cv2.INTER_AREA)
+    _, buf = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    return buf.tobytes()
+
+
+class StreamFrame:
+    """
+    Frame publicado pelo worker. `render` produz a imagem anotada (BGR) e só
+    é chamado no primeiro jpeg(); cada tier é codificado uma única vez.
+    """
+
+    def __init__(self, render: Callable[[], np.ndarray]):
+        self._render: Callable[[], np.ndarray] | None = render
+        self._image: np.ndarray | None = None
+        self._jpegs: dict[str, bytes] = {}
+        self._lock = threading.Lock()
+        self._on_encode: Callable[[str, float], None] | None = None   # (tier, segundos)
+
+    def jpeg(self, tier: str = DEFAULT_TIER) -> bytes:
+        with self._lock:
+            buf = self._jpegs.get(tier)
+            if buf is None:
+                if self._image is None:
+                    self._image, self._render = self._render(), None
+                t0 = time.perf_counter()
+                buf = self._jpegs[tier] = encode_jpeg(self._image, tier)
+                if self._on_encode:
+                    self._on_encode(tier, time.perf_counter() - t0)
+            return buf
+
+    @classmethod
+    def from_jpegs(cls, jpegs: dict[str, bytes]) -> "StreamFrame":
+        """
+        Frame já codificado (ex.: vindo de um processo de câmera). Um tier
+        ausente é derivado decodificando o melhor JPEG disponível.
+        """
+        best = next(jpegs[t] for t in ("full", "standard", "thumb") if t in jpegs)
+        frame = cls(lambda: cv2.imdecode(np.frombuffer(best, np.uint8), cv2.IMREAD_COLOR))
+        frame._jpegs.update(jpegs)
+        return frame
+
+
+class _Subscriber:
+    __slots__ = ("loop", "event", "tier")
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, tier: str):
+        self.loop = loop
+        self.event = asyncio.Event()
+        self.tier = tier
+
+
+class FrameBroadcaster:
+    """Último frame publicado + lista de viewers. publish() é thread-safe."""
+
+    def __init__(self, cam_id: int):
+        self.cam_id = cam_id
+        self._lock = threading.Lock()
+        self._seq = 0
+        self._frame: StreamFrame | None = None
+        self._subs: set[_Subscriber] = set()
+        self._encodes: Counter[str] = Counter()
+        self._frames_sent = 0
+        self._frames_dropped = 0
+        self._bytes_sent = 0
+        self._encode_seconds = CAMERA_STAGE_SECONDS.labels(cam_id, "encode")
+        # Chamado com o conjunto de tiers assistidos sempre que um viewer entra/sai
+        self.on_viewers_changed: Callable[[set[str]], None] | None = None
+
+    def watched_tiers(self) -> set[str]:
+        with self._lock:
+            return {s.tier for s in self._subs}
+
+    def _viewers_changed(self) -> None:
+        if self.on_viewers_changed:
+            self.on_viewers_changed(self.watched_tiers())
+
+    def publish(self, frame: StreamFrame) -> int:
+        """Publica um novo frame e acorda os viewers. Retorna a sequência."""
+        frame._on_encode = self._count_encode
+        with self._lock:
+            self._seq += 1
+            self._frame = frame
+            seq, subs = self._seq, list(self._subs)
+        for s in subs:
+            try:
+                s.loop.call_soon_threadsafe(s.event.set)
+            except RuntimeError:   # loop já fechado
+                pass
+        return seq
+
+    def _count_encode(self, tier: str, seconds: float) -> None:
+        self._encode_seconds.observe(seconds)
+        with self._lock:
+            self._encodes[tier] += 1
+
+    def latest(self) -> tuple[int, StreamFrame | None]:
+        with self._lock:
+            return self._seq, self._frame
+
+    @property
+    def viewers(self) -> int:
+        with self._lock:
+            return len(self._subs)
+
+    async def frames(self, tier: str = DEFAULT_TIER, timeout: float = 1.0) -> AsyncIterator[bytes | None]:
+        """
+        Gera o JPEG (no tier pedido) de cada frame novo uma única vez, sempre
+        o mais recente. Gera None quando nenhum frame chega em `timeout`
+        segundos (ou ainda não há frame), para o chamador enviar um placeholder.
+        """
+        if tier not in STREAM_TIERS:
+            raise ValueError(f"Tier inválido: {tier!r} (use {', '.join(STREAM_TIERS)})")
+        sub = _Subscriber(asyncio.get_running_loop(), tier)
+        with self._lock:
+            self._subs.add(sub)
+        self._viewers_changed()
+        last = 0
+        try:
+            while True:
+                seq, frame = self.latest()
+                if seq == last or frame is None:
+                    sub.event.clear()
+                    # Revalida após o clear para não perder um publish concorrente
+                    seq, frame = self.latest()
+                    if seq == last or frame is None:
+                        try:
+                            await asyncio.wait_for(sub.event.wait(), timeout)
+                        except asyncio.TimeoutError:
+                            yield None
+                        continue
+                if last and seq - last > 1:
+                    with self._lock:
+                        self._frames_dropped += seq - last - 1
+                last = seq
+                # Anotação/codificação fora do event loop; viewers do mesmo tier compartilham o JPEG
+                yield await asyncio.to_thread(frame.jpeg, tier)
+        finally:
+            with self._lock:
+                self._subs.discard(sub)
+            self._viewers_changed()
+
+    def record_sent(self, nbytes: int) -> None:
+        with self._lock:
+            self._frames_sent += 1
+            self._bytes_sent += nbytes
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "camera_id":       self.cam_id,
+                "viewers":         len(self._subs),
+                "viewers_by_tier": dict(Counter(s.tier for s in self._subs)),
+                "encodes_by_tier": dict(self._encodes),
+                "sequence":        self._seq,
+                "frames_sent":     self._frames_sent,
+                "frames_dropped":  self._frames_dropped,
+                "bytes_sent":      self._bytes_sent,
+            }
+
+
+_broadcasters: dict[int, FrameBroadcaster] = {}
+_broadcasters_lock = threading.Lock()
+
+
+def get_broadcaster(cam_id: int) -> FrameBroadcaster:
+    with _broadcasters_lock:
+        if cam_id not in _broadcasters:
+            _broadcasters[cam_id] = FrameBroadcaster(cam_id)
+        return _broadcasters[cam_id]
+
+
+def all_broadcasters() -> list[FrameBroadcaster]:
+    with _broadcasters_lock:
+        return list(_broadcasters.values())
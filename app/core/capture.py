@@ -0,0 +1,179 @@
+"""
+app/core/capture.py — Leitura contínua da câmera em thread dedicada.
+
+O FrameGrabber drena o stream (RTSP/HTTP/webcam) o tempo todo e guarda
+apenas o último frame decodificado. Assim o decoder nunca acumula frames
+velhos enquanto o pipeline de inferência está ocupado: quem consome pega
+sempre o frame mais recente, e os intermediários são descartados.
+
+Arquivos de vídeo (que o OpenCV lê tão rápido quanto consegue) são
+cadenciados pelo FPS do próprio arquivo; no fim do arquivo a captura
+simplesmente para de entregar frames (o vídeo não recomeça).
+
+Com on_demand=True a thread só faz grab() (demux/decode, sem conversão
+para BGR) e o retrieve() acontece apenas quando alguém pede um frame —
+usado no stream principal quando a detecção roda num sub-stream.
+
+`observe` (opcional) recebe o tempo de grab()+retrieve() de cada frame
+decodificado (métrica de captura).
+"""
+
+import threading
+import time
+from collections.abc import Callable
+
+import cv2
+import numpy as np
+
+RECONNECT_DELAY = 3.0    # s entre tentativas de reabrir a fonte
+READ_FAIL_DELAY = 0.05   # s após uma leitura sem frame
+FPS_EMA = 0.1            # suavização do FPS medido
+
+
+class FrameGrabber:
+    """Thread de captura de uma câmera. latest() é thread-safe."""
+
+    def __init__(self, source_url: str, name: str = "capture", on_demand: bool = False,
+                 observe: Callable[[float], None] | None = None):
+        self.source_url = source_url
+        self.name = name
+        self.on_demand = on_demand
+        self._observe = observe
+        self.frame_size: tuple[int, int] | None = None   # (largura, altura) da fonte
+        self._cond = threading.Condition()
+        self._waiters = 0    # chamadas de latest() esperando frame (on_demand decodifica só com > 0)
+        self._frame: np.ndarray | None = None
+        self._seq = 0
+        self._running = False
+        self._thread: threading.Thread | None = None
+        self._connected = False
+        self._nominal_fps = 0.0     # CAP_PROP_FPS da fonte (0 se desconhecido)
+        self._measured_fps = 0.0
+        self._grabbed = 0
+        self._consumed = 0
+        self._dropped = 0
+        self._last_taken = 0
+
+    def start(self) -> None:
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._loop, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._running = False
+        with self._cond:
+            self._cond.notify_all()
+
+    @property
+    def source_fps(self) -> float:
+        """FPS medido na entrega de frames; usa o nominal enquanto não há medida."""
+        return self._measured_fps or self._nominal_fps
+
+    def latest(self, after: int = 0, timeout: float = 1.0) -> tuple[int, np.ndarray] | None:
+        """
+        Espera um frame com sequência > `after` e retorna (seq, frame).
+        Retorna None se nenhum frame novo chegar em `timeout` segundos.
+        """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            self._waiters += 1
+            try:
+                while self._seq <= after:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or not self._running:
+                        return None
+                    self._cond.wait(remaining)
+            finally:
+                self._waiters -= 1   # timeout/stop também liberam: sem espera, sem decode
+            seq, frame = self._seq, self._frame
+            self._consumed += 1
+            if self._last_taken:
+                self._dropped += max(0, seq - self._last_taken - 1)
+            self._last_taken = seq
+            return seq, frame
+
+    def _open(self):
+        src = self.source_url
+        cap = cv2.VideoCapture(int(src) if src.isdigit() else src)
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        return cap
+
+    def _loop(self) -> None:
+        cap = None
+        is_file = False
+        last_t = 0.0
+        while self._running:
+            if cap is None or not cap.isOpened():
+                if cap:
+                    cap.release()
+                self._connected = False
+                try:
+                    cap = self._open()
+                except Exception as e:
+                    print(f"[{self.name}] Erro ao abrir: {e}")
+                    cap = None
+                if cap is None or not cap.isOpened():
+                    time.sleep(RECONNECT_DELAY)
+                    continue
+                self._connected = True
+                self._nominal_fps = float(cap.get(cv2.CAP_PROP_FPS) or 0.0)
+                if not 0 < self._nominal_fps < 240:
+                    self._nominal_fps = 0.0
+                is_file = cap.get(cv2.CAP_PROP_FRAME_COUNT) > 0
+                w, h = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+                if w > 0 and h > 0:
+                    self.frame_size = (w, h)
+                last_t = 0.0
+
+            t0 = time.perf_counter()
+            ret = cap.grab()
+            grab_time = time.perf_counter() - t0
+            if not ret:
+                time.sleep(READ_FAIL_DELAY)
+                continue
+
+            now = time.monotonic()
+            if last_t:
+                dt = now - last_t
+                if is_file and self._nominal_fps and dt < 1.0 / self._nominal_fps:
+                    time.sleep(1.0 / self._nominal_fps - dt)
+                    now = time.monotonic()
+                    dt = now - last_t
+                if dt > 0:
+                    inst = 1.0 / dt
+                    self._measured_fps = (inst if not self._measured_fps
+                                          else (1 - FPS_EMA) * self._measured_fps + FPS_EMA * inst)
+            last_t = now
+            self._grabbed += 1
+            if self.on_demand and not self._waiters:
+                continue
+            t0 = time.perf_counter()
+            ret, frame = cap.retrieve()
+            if not ret:
+                continue
+            if self._observe:
+                # grab + retrieve, sem a espera de cadência dos arquivos de vídeo
+                self._observe(grab_time + time.perf_counter() - t0)
+            self.frame_size = (frame.shape[1], frame.shape[0])
+            with self._cond:
+                self._frame = frame
+                self._seq += 1
+                self._cond.notify_all()
+
+        if cap:
+            cap.release()
+        self._connected = False
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "connected":       self._connected,
+                "source_fps":      round(self.source_fps, 2),
+                "on_demand":       self.on_demand,
+                "frames_grabbed":  self._grabbed,
+                "frames_decoded":  self._seq,
+                "frames_consumed": self._consumed,
+                "frames_dropped":  self._dropped,
+            }
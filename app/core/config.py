@@ -15,6 +15,19 @@ _DATA_DIR = Path(os.environ.get("DATA_DIR", str(BASE_DIR)))
 # Banco de dados
 DB_PATH = str(_DATA_DIR / "cattle.db")
 PHOTOS_DIR = _DATA_DIR / "photos"
+# Conexões SQLite por thread (WAL): page cache e mmap por conexão (MB), espera por lock (ms)
+DB_CACHE_MB = float(os.environ.get("DB_CACHE_MB", "16"))
+DB_MMAP_MB = float(os.environ.get("DB_MMAP_MB", "256"))
+DB_BUSY_TIMEOUT_MS = float(os.environ.get("DB_BUSY_TIMEOUT_MS", "5000"))
+# Escritor em segundo plano (movimentos/fotos das câmeras): grava a cada N ms ou M operações,
+# fila limitada (cheia = operação descartada, a câmera nunca espera o disco)
+DB_WRITE_FLUSH_MS = float(os.environ.get("DB_WRITE_FLUSH_MS", "200"))
+DB_WRITE_BATCH = int(os.environ.get("DB_WRITE_BATCH", "500"))
+DB_WRITE_QUEUE = int(os.environ.get("DB_WRITE_QUEUE", "10000"))
+# Cache em memória das leituras da API (dashboard, animais, pessoas, movimentações),
+# invalidado pela versão de dados da fazenda; máximo de respostas guardadas (0 desliga).
+# Vale para um único processo de API (uvicorn --workers 1).
+RESPONSE_CACHE_SIZE = int(os.environ.get("RESPONSE_CACHE_SIZE", "512"))
 
 # Porta do servidor (Railway injeta PORT automaticamente)
 PORT = int(os.environ.get("PORT", "8000"))
@@ -29,11 +42,81 @@ CAMERA_SOURCE = os.environ.get("CAMERA_SOURCE", "0")  # 0=webcam, ou caminho/RTS
 
 # IA
 YOLO_MODEL = os.environ.get("YOLO_MODEL", "yolov8n.pt")
+# Engine do detector: torch | onnx | openvino | openvino-int8 (exportado 1x e cacheado em MODELS_DIR)
+DETECTOR_ENGINE = os.environ.get("DETECTOR_ENGINE", "torch")
+# Dataset YAML (formato ultralytics, imagens locais) para calibrar o openvino-int8 — obrigatório nesse engine
+DETECTOR_INT8_DATA = os.environ.get("DETECTOR_INT8_DATA", "")
 DETECTION_CONF = float(os.environ.get("DETECTION_CONF", "0.40"))
 SIMILARITY_THRESHOLD = float(os.environ.get("SIMILARITY_THRESHOLD", "0.75"))
+# Índice de identidades: "exact" (força bruta) ou "ivf" (aproximado, ver app/ai/ann.py)
+ANN_INDEX = os.environ.get("ANN_INDEX", "exact")
+ANN_NPROBE = int(os.environ.get("ANN_NPROBE", "8"))          # listas por consulta (recall x latência)
+ANN_RERANK_K = int(os.environ.get("ANN_RERANK_K", "0"))      # re-rank exato dos top-k (0 = desligado)
+ANN_MIN_TRAIN = int(os.environ.get("ANN_MIN_TRAIN", "2048")) # abaixo disso usa busca exata
+ANN_STORAGE = os.environ.get("ANN_STORAGE", "float32")       # float32 | float16
+# Backend do extrator de embeddings: torch | onnx | onnx-int8 (requer onnxruntime)
+EMBED_BACKEND = os.environ.get("EMBED_BACKEND", "torch")
+MODELS_DIR = _DATA_DIR / "models"   # modelos exportados (ONNX) reaproveitados entre startups
+# Máximo de crops por forward pass do EfficientNet (extract_batch)
+EMBED_MAX_BATCH = int(os.environ.get("EMBED_MAX_BATCH", "32"))
+# Scheduler de inferência compartilhado: frames por lote e espera máxima para formar o lote
+INFER_MAX_BATCH = int(os.environ.get("INFER_MAX_BATCH", "8"))
+INFER_MAX_WAIT_MS = float(os.environ.get("INFER_MAX_WAIT_MS", "20"))
+
+# Taxa alvo de inferência por câmera (frames/s); limitada ao FPS da fonte. 0 = acompanha a fonte
+INFER_TARGET_FPS = float(os.environ.get("INFER_TARGET_FPS", "15"))
+# Lado maior (px) do frame enviado ao YOLO; o frame é reduzido uma vez antes da detecção
+# e as caixas voltam para a resolução original (0 = detecta na resolução original)
+DETECT_MAX_SIDE = int(os.environ.get("DETECT_MAX_SIDE", "640"))
+
+# Workers de câmera: "thread" (no processo da API) ou "process" (processos filhos,
+# CAMERA_PROCESS_GROUP câmeras por processo; JPEGs voltam por shared memory)
+CAMERA_WORKER_MODE = os.environ.get("CAMERA_WORKER_MODE", "thread")
+CAMERA_PROCESS_GROUP = int(os.environ.get("CAMERA_PROCESS_GROUP", "1"))
+CAMERA_SHM_SLOTS = int(os.environ.get("CAMERA_SHM_SLOTS", "8"))
+CAMERA_SHM_SLOT_MB = float(os.environ.get("CAMERA_SHM_SLOT_MB", "4"))
+
+# Ingestão offline de vídeos: uploads, taxa de amostragem (define o passo entre
+# frames processados), frames por lote de detecção e jobs simultâneos
+INGEST_DIR = _DATA_DIR / "uploads"
+INGEST_SAMPLE_FPS = float(os.environ.get("INGEST_SAMPLE_FPS", "5"))
+INGEST_BATCH = int(os.environ.get("INGEST_BATCH", "16"))
+INGEST_MAX_JOBS = int(os.environ.get("INGEST_MAX_JOBS", "1"))
+# Tamanho máximo do upload (MB) e retenção dos jobs terminados (horas e quantidade)
+INGEST_MAX_UPLOAD_MB = int(os.environ.get("INGEST_MAX_UPLOAD_MB", "4096"))
+INGEST_JOB_TTL_H = float(os.environ.get("INGEST_JOB_TTL_H", "24"))
+INGEST_JOB_HISTORY = int(os.environ.get("INGEST_JOB_HISTORY", "100"))
+
+# Captura de trace por câmera (admin): limite de spans e duração máxima em segundos
+TRACE_MAX_EVENTS = int(os.environ.get("TRACE_MAX_EVENTS", "200000"))
+TRACE_MAX_SECONDS = float(os.environ.get("TRACE_MAX_SECONDS", "60"))
+
+# Rastreamento por câmera: re-identifica uma track a cada N frames
+# ou sempre que a similaridade da última identificação for menor que TRACK_CONFIDENT_SIM
+TRACK_REID_INTERVAL = int(os.environ.get("TRACK_REID_INTERVAL", "30"))
+TRACK_CONFIDENT_SIM = float(os.environ.get("TRACK_CONFIDENT_SIM", "0.85"))
+
+# Gate de movimento: fração de pixels alterados para rodar o YOLO (0 desliga)
+# e intervalo máximo em segundos entre detecções completas
+MOTION_THRESHOLD = float(os.environ.get("MOTION_THRESHOLD", "0.002"))
+MOTION_FORCE_INTERVAL = float(os.environ.get("MOTION_FORCE_INTERVAL", "10"))
+
+# Websocket de eventos: fila por cliente (cheia = cliente desconectado),
+# máximo de eventos por mensagem e janela de agrupamento de rajadas
+WS_QUEUE_SIZE = int(os.environ.get("WS_QUEUE_SIZE", "100"))
+WS_BATCH_MAX = int(os.environ.get("WS_BATCH_MAX", "50"))
+WS_COALESCE_MS = float(os.environ.get("WS_COALESCE_MS", "50"))
 
 # Claude
 ANTHROPIC_API_KEY = os.environ.get("ANTHROPIC_API_KEY", "")
 
+# Fila de análises do Claude (descrição assíncrona após o auto-cadastro)
+ANALYSIS_WORKERS = int(os.environ.get("ANALYSIS_WORKERS", "2"))
+ANALYSIS_QUEUE_SIZE = int(os.environ.get("ANALYSIS_QUEUE_SIZE", "200"))
+ANALYSIS_RATE_PER_MIN = float(os.environ.get("ANALYSIS_RATE_PER_MIN", "30"))
+ANALYSIS_MAX_RETRIES = int(os.environ.get("ANALYSIS_MAX_RETRIES", "3"))
+ANALYSIS_BREAKER_FAILURES = int(os.environ.get("ANALYSIS_BREAKER_FAILURES", "5"))
+ANALYSIS_BREAKER_COOLDOWN = float(os.environ.get("ANALYSIS_BREAKER_COOLDOWN", "60"))
+
 # Auto-cadastro: cooldown em segundos antes de registrar nova entrada do mesmo animal
 MOVEMENT_COOLDOWN_SECONDS = int(os.environ.get("MOVEMENT_COOLDOWN", "300"))  # 5 min
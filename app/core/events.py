@@ -0,0 +1,125 @@
+"""
+app/core/events.py — Canais de eventos em tempo real (websocket) por fazenda.
+
+Cada cliente conectado pertence a uma fazenda (tirada do token) e só recebe
+os eventos dela. Cada cliente tem uma fila limitada e uma task de envio
+própria, então um socket lento não atrasa os demais:
+  - eventos em rajada são agrupados numa única mensagem
+    {"event": "batch", "events": [...]} (um evento isolado vai sem envelope)
+  - se a fila do cliente enche, ele ficou para trás demais e é desconectado
+
+Todas as operações rodam no event loop principal; threads publicam via
+loop.call_soon_threadsafe(hub.publish, farm_id, event).
+"""
+
+import asyncio
+from collections import defaultdict
+
+from fastapi import WebSocket
+
+from app.core.config import WS_BATCH_MAX, WS_COALESCE_MS, WS_QUEUE_SIZE
+
+CLOSE_TOO_SLOW = 1013   # "try again later"
+
+
+class _Client:
+    __slots__ = ("farm_id", "ws", "queue", "task")
+
+    def __init__(self, farm_id: int, ws: WebSocket, queue_size: int):
+        self.farm_id = farm_id
+        self.ws = ws
+        self.queue: asyncio.Queue[dict] = asyncio.Queue(maxsize=queue_size)
+        self.task: asyncio.Task | None = None
+
+
+class EventHub:
+    def __init__(self, queue_size: int = WS_QUEUE_SIZE, batch_max: int = WS_BATCH_MAX,
+                 coalesce_ms: float = WS_COALESCE_MS):
+        self.queue_size = max(1, queue_size)
+        self.batch_max = max(1, batch_max)
+        self.coalesce = max(0.0, coalesce_ms) / 1000.0
+        self._farms: dict[int, set[_Client]] = defaultdict(set)
+        self._stats = {"published": 0, "messages_sent": 0, "events_sent": 0, "clients_dropped": 0}
+
+    def connect(self, farm_id: int, ws: WebSocket) -> _Client:
+        client = _Client(farm_id, ws, self.queue_size)
+        client.task = asyncio.create_task(self._sender(client))
+        self._farms[farm_id].add(client)
+        return client
+
+    def disconnect(self, client: _Client) -> None:
+        clients = self._farms.get(client.farm_id)
+        if clients is not None:
+            clients.discard(client)
+            if not clients:
+                del self._farms[client.farm_id]
+        if client.task and client.task is not asyncio.current_task():
+            client.task.cancel()
+
+    def publish(self, farm_id: int, event: dict) -> None:
+        """Enfileira o evento para todos os clientes da fazenda, sem bloquear."""
+        self._stats["published"] += 1
+        for client in list(self._farms.get(farm_id, ())):
+            try:
+                client.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                self._drop(client)
+
+    def _drop(self, client: _Client) -> None:
+        self._stats["clients_dropped"] += 1
+        print(f"[Events] Cliente da fazenda {client.farm_id} atrasado demais — desconectando.")
+        self.disconnect(client)
+        asyncio.create_task(self._close(client.ws))
+
+    @staticmethod
+    async def _close(ws: WebSocket) -> None:
+        try:
+            await ws.close(code=CLOSE_TOO_SLOW)
+        except Exception:
+            pass
+
+    async def _sender(self, client: _Client) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                batch = [await client.queue.get()]
+                # Janela para juntar a rajada, drenando a fila enquanto espera
+                deadline = loop.time() + self.coalesce
+                while len(batch) < self.batch_max:
+                    try:
+                        batch.append(client.queue.get_nowait())
+                        continue
+                    except asyncio.QueueEmpty:
+                        pass
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(client.queue.get(), remaining))
+                    except asyncio.TimeoutError:
+                        break
+                await client.ws.send_json(batch[0] if len(batch) == 1
+                                          else {"event": "batch", "events": batch})
+                self._stats["messages_sent"] += 1
+                self._stats["events_sent"] += len(batch)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self.disconnect(client)
+
+    def stats(self, farm_id: int | None = None) -> dict:
+        """Contadores do hub; com farm_id, clientes só daquela fazenda (sem clients_by_farm)."""
+        if farm_id is not None:
+            clients = list(self._farms.get(farm_id, ()))
+            return {
+                "clients":         len(clients),
+                "queue_size":      self.queue_size,
+                "max_queue_depth": max((cl.queue.qsize() for cl in clients), default=0),
+            }
+        return {
+            **self._stats,
+            "clients":         sum(len(c) for c in self._farms.values()),
+            "clients_by_farm": {str(f): len(c) for f, c in self._farms.items()},
+            "queue_size":      self.queue_size,
+            "max_queue_depth": max((cl.queue.qsize() for c in self._farms.values() for cl in c), default=0),
+        }
@@ -0,0 +1,227 @@
+"""
+app/core/metrics.py — Métricas em formato texto do Prometheus (GET /api/metrics).
+
+Registro mínimo, sem dependências: contadores e histogramas com labels.
+Feito para ficar sempre ligado nos workers de câmera: quem mede guarda o
+filho já resolvido (family.labels(...)) e cada observação custa um bisect
+e um incremento sob um lock sem disputa.
+
+Processos de câmera (CAMERA_WORKER_MODE=process) têm o próprio registro;
+eles enviam snapshot() ao processo da API, que os junta no render().
+"""
+
+import math
+import threading
+from bisect import bisect_left
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Latências de 0.5 ms a 10 s
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34)
+
+
+class _CounterChild:
+    __slots__ = ("_lock", "value")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+    def state(self):
+        return self.value
+
+
+class _HistogramChild:
+    __slots__ = ("_lock", "_buckets", "counts", "sum")
+
+    def __init__(self, buckets: tuple):
+        self._lock = threading.Lock()
+        self._buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)   # por bucket (não cumulativo); o último é +Inf
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        i = bisect_left(self._buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+
+    def state(self):
+        with self._lock:
+            return list(self.counts), self.sum
+
+
+class _Family:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = (), buckets: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._children: dict[tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values):
+        key = tuple(str(v) for v in values)
+        if len(key) != len(self.labelnames):
+            raise ValueError(f"{self.name}: esperado {len(self.labelnames)} labels, recebido {len(key)}")
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            children = list(self._children.items())
+        return {"kind": self.kind, "help": self.help, "labelnames": self.labelnames,
+                "buckets": self.buckets, "children": {k: c.state() for k, c in children}}
+
+
+class Counter(_Family):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+
+class Histogram(_Family):
+    kind = "histogram"
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+
+class Registry:
+    def __init__(self):
+        self._families: dict[str, _Family] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, family: _Family) -> _Family:
+        with self._lock:
+            existing = self._families.get(family.name)
+            if existing is not None:
+                return existing
+            self._families[family.name] = family
+            return family
+
+    def counter(self, name: str, help: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: tuple[str, ...] = (),
+                  buckets: tuple = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help, labelnames, buckets))
+
+    def snapshot(self) -> dict:
+        """Estado serializável (pickle) de todas as famílias."""
+        with self._lock:
+            families = list(self._families.values())
+        return {f.name: f.snapshot() for f in families}
+
+    def render(self, extra: list[dict] = ()) -> str:
+        """Texto do Prometheus com este registro mais os snapshots de outros processos."""
+        merged = self.snapshot()
+        for snap in extra:
+            for name, fam in snap.items():
+                if name not in merged:
+                    merged[name] = {**fam, "children": dict(fam["children"])}
+                    continue
+                children = merged[name]["children"]
+                for key, state in fam["children"].items():
+                    children[key] = state if key not in children else _add_states(children[key], state)
+        lines = []
+        for name in sorted(merged):
+            fam = merged[name]
+            lines.append(f"# HELP {name} {fam['help']}")
+            lines.append(f"# TYPE {name} {fam['kind']}")
+            for key in sorted(fam["children"]):
+                state = fam["children"][key]
+                labels = list(zip(fam["labelnames"], key))
+                if fam["kind"] == "counter":
+                    lines.append(f"{name}{_labels(labels)} {_num(state)}")
+                    continue
+                counts, total = state
+                cumulative = 0
+                for bound, n in zip((*fam["buckets"], math.inf), counts):
+                    cumulative += n
+                    lines.append(f"{name}_bucket{_labels(labels + [('le', _num(bound))])} {cumulative}")
+                lines.append(f"{name}_sum{_labels(labels)} {_num(total)}")
+                lines.append(f"{name}_count{_labels(labels)} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+
+def _add_states(a, b):
+    if isinstance(a, tuple):
+        return [x + y for x, y in zip(a[0], b[0])], a[1] + b[1]
+    return a + b
+
+
+def _num(v: float) -> str:
+    if v == math.inf:
+        return "+Inf"
+    return str(int(v)) if float(v).is_integer() else repr(float(v))
+
+
+def _labels(pairs: list[tuple[str, str]]) -> str:
+    if not pairs:
+        return ""
+    esc = (str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, esc)) + "}"
+
+
+REGISTRY = Registry()
+
+# ---------------------------------------------------------------------------
+# Métricas das câmeras
+# ---------------------------------------------------------------------------
+
+CAMERA_STAGE_SECONDS = REGISTRY.histogram(
+    "cattle_camera_stage_seconds",
+    "Tempo por etapa do pipeline da câmera (capture, motion, detect, track, embed, identify, db, "
+    "photo, annotate, encode, frame)",
+    ("camera", "stage"),
+)
+CAMERA_FRAMES = REGISTRY.counter(
+    "cattle_camera_frames_total",
+    "Frames consumidos pelo worker, por resultado (processed, motion_skipped, error)",
+    ("camera", "result"),
+)
+CAMERA_FRAMES_DROPPED = REGISTRY.counter(
+    "cattle_camera_frames_dropped_total",
+    "Frames capturados e descartados porque o worker estava ocupado",
+    ("camera",),
+)
+CAMERA_DETECTIONS = REGISTRY.histogram(
+    "cattle_camera_detections_per_frame",
+    "Detecções por frame processado",
+    ("camera",),
+    buckets=COUNT_BUCKETS,
+)
+CAMERA_AUTO_REGISTRATIONS = REGISTRY.counter(
+    "cattle_camera_auto_registrations_total",
+    "Identidades auto-cadastradas pela câmera",
+    ("camera", "entity_type"),
+)
+
+# ---------------------------------------------------------------------------
+# Cache de respostas da API
+# ---------------------------------------------------------------------------
+
+RESPONSE_CACHE_REQUESTS = REGISTRY.counter(
+    "cattle_response_cache_requests_total",
+    "Leituras da API servidas pelo cache de respostas, por endpoint e resultado (hit, miss)",
+    ("endpoint", "result"),
+)
+RESPONSE_CACHE_EVICTIONS = REGISTRY.counter(
+    "cattle_response_cache_evictions_total",
+    "Respostas removidas do cache por limite de tamanho (LRU)",
+)
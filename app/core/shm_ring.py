@@ -0,0 +1,73 @@
+"""
+app/core/shm_ring.py — Ring buffer de slots em multiprocessing.shared_memory.
+
+Usado para devolver JPEGs dos processos de câmera ao processo da API sem
+serializar os bytes pelo pipe: o processo filho escreve no próximo slot e
+avisa pelo pipe (slot, seq); o processo da API copia o slot.
+
+Cada slot começa com um cabeçalho (seq u64, tamanho u32). O escritor zera
+o seq antes de escrever e grava o seq definitivo no fim; o leitor confere o
+seq antes e depois da cópia, e descarta a leitura se o slot foi reescrito
+no meio (leitor atrasado mais de `slots` escritas).
+"""
+
+import struct
+from multiprocessing import shared_memory
+
+_HEADER = struct.Struct("<QI")
+
+
+class ShmRing:
+    def __init__(self, name: str | None = None, slots: int = 8, slot_size: int = 4 << 20,
+                 create: bool = False):
+        self.slots = slots
+        self.slot_size = slot_size
+        self._stride = _HEADER.size + slot_size
+        if create:
+            self.shm = shared_memory.SharedMemory(create=True, size=self._stride * slots)   # zerada
+        else:
+            # Quem cria é o dono e faz o unlink; quem anexa (processo filho) só fecha
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.name = self.shm.name
+        self._next = 0
+        self._seq = 0
+
+    def write(self, data: bytes) -> tuple[int, int] | None:
+        """Grava no próximo slot. Retorna (slot, seq), ou None se não couber."""
+        n = len(data)
+        if n > self.slot_size:
+            return None
+        slot = self._next
+        self._next = (self._next + 1) % self.slots
+        self._seq += 1
+        off = slot * self._stride
+        buf = self.shm.buf
+        _HEADER.pack_into(buf, off, 0, n)
+        buf[off + _HEADER.size:off + _HEADER.size + n] = data
+        _HEADER.pack_into(buf, off, self._seq, n)
+        return slot, self._seq
+
+    def read(self, slot: int, seq: int) -> bytes | None:
+        """Cópia do slot se ainda contém a escrita `seq`; None se foi sobrescrito."""
+        off = slot * self._stride
+        buf = self.shm.buf
+        cur, n = _HEADER.unpack_from(buf, off)
+        if cur != seq:
+            return None
+        data = bytes(buf[off + _HEADER.size:off + _HEADER.size + n])
+        if _HEADER.unpack_from(buf, off)[0] != seq:
+            return None
+        return data
+
+    def close(self) -> None:
+        try:
+            self.shm.close()
+        except Exception:
+            pass
+
+    def unlink(self) -> None:
+        self.close()
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,127 @@
+"""
+app/core/tracing.py — Captura sob demanda de spans por frame (Chrome trace).
+
+Um administrador liga a captura numa câmera por N frames ou T segundos; o
+worker grava um span ("ph": "X") para cada etapa de cada frame — inclusive
+cada embed/identify/auto-cadastro e cada chamada ao banco — com a thread
+onde rodou. O resultado é um JSON no formato trace-event do Chrome, que
+abre direto no Perfetto (ui.perfetto.dev) ou em chrome://tracing.
+
+Com a captura desligada o custo no worker é um teste de atributo None por
+etapa; nada é alocado.
+"""
+
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from app.core.config import TRACE_MAX_EVENTS, TRACE_MAX_SECONDS
+
+TRACE_KEEP = 10   # capturas mantidas em memória para download
+
+
+class TraceCapture:
+    """Spans de uma câmera até `frames` frames ou `seconds` segundos (o que vier primeiro)."""
+
+    def __init__(self, cam_id: int, frames: int = 0, seconds: float = 0.0,
+                 max_events: int = TRACE_MAX_EVENTS):
+        self.trace_id = uuid.uuid4().hex[:12]
+        self.cam_id = cam_id
+        self.frames_target = max(0, frames)
+        self.seconds = min(seconds, TRACE_MAX_SECONDS) if seconds > 0 else TRACE_MAX_SECONDS
+        self.max_events = max_events
+        self.status = "running"
+        self.created_at = datetime.now()
+        self.frames = 0
+        self.events_dropped = 0
+        self._events: list[dict] = []
+        self._threads: dict[int, str] = {}
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+        self._deadline = self._origin + self.seconds
+        self._pid = os.getpid()
+
+    @property
+    def active(self) -> bool:
+        if self.status == "running" and time.perf_counter() >= self._deadline:
+            self.finish()
+        return self.status == "running"
+
+    def span(self, name: str, cat: str, t0: float, t1: float, args: dict | None = None) -> None:
+        """Registra um span de t0 a t1 (time.perf_counter) na thread atual."""
+        if self.status != "running":
+            return
+        tid = threading.get_ident()
+        event = {"name": name, "cat": cat, "ph": "X", "pid": self._pid, "tid": tid,
+                 "ts": round((t0 - self._origin) * 1e6, 1), "dur": round((t1 - t0) * 1e6, 1)}
+        if args:
+            event["args"] = args
+        with self._lock:
+            if tid not in self._threads:
+                self._threads[tid] = threading.current_thread().name
+            if len(self._events) < self.max_events:
+                self._events.append(event)
+            else:
+                self.events_dropped += 1
+
+    def frame_done(self) -> bool:
+        """Conta um frame; retorna False quando a captura terminou (frames ou tempo)."""
+        self.frames += 1
+        if self.frames_target and self.frames >= self.frames_target:
+            self.finish()
+        return self.active
+
+    def finish(self, status: str = "done") -> None:
+        if self.status == "running":
+            self.status = status
+
+    def info(self) -> dict:
+        self.active   # fecha por tempo mesmo sem frames chegando
+        with self._lock:
+            n_events = len(self._events)
+        return {
+            "trace_id":       self.trace_id,
+            "camera_id":      self.cam_id,
+            "status":         self.status,
+            "created_at":     self.created_at.isoformat(timespec="seconds"),
+            "frames_target":  self.frames_target,
+            "seconds":        self.seconds,
+            "frames":         self.frames,
+            "events":         n_events,
+            "events_dropped": self.events_dropped,
+        }
+
+    def to_chrome(self) -> dict:
+        """Documento trace-event do Chrome (JSON Object Format)."""
+        with self._lock:
+            events = list(self._events)
+            threads = dict(self._threads)
+        meta = [{"name": "process_name", "ph": "M", "pid": self._pid, "tid": 0,
+                 "args": {"name": f"camera {self.cam_id}"}}]
+        meta += [{"name": "thread_name", "ph": "M", "pid": self._pid, "tid": tid, "args": {"name": name}}
+                 for tid, name in threads.items()]
+        return {"traceEvents": meta + events, "displayTimeUnit": "ms", "otherData": self.info()}
+
+
+_captures: dict[str, TraceCapture] = {}
+_captures_lock = threading.Lock()
+
+
+def register_capture(capture: TraceCapture) -> None:
+    with _captures_lock:
+        _captures[capture.trace_id] = capture
+        # Mantém só as TRACE_KEEP mais recentes (dict preserva a ordem de inserção)
+        while len(_captures) > TRACE_KEEP:
+            del _captures[next(iter(_captures))]
+
+
+def get_capture(trace_id: str) -> TraceCapture | None:
+    with _captures_lock:
+        return _captures.get(trace_id)
+
+
+def list_captures(cam_id: int | None = None) -> list[TraceCapture]:
+    with _captures_lock:
+        return [c for c in _captures.values() if cam_id is None or c.cam_id == cam_id]
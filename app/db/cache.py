@@ -0,0 +1,88 @@
+"""
+app/db/cache.py — Cache em memória das leituras mais consultadas da API.
+
+O frontend consulta dashboard, animais, pessoas e movimentações a cada
+poucos segundos; sem mudança nos dados, a resposta é a mesma. Cada entrada é
+chaveada por (endpoint, fazenda, parâmetros, versão de dados) — a versão vem
+de db.data_version(), incrementada por toda função de escrita do
+app.db.database (e repassada pelos processos de câmera). Nada é apagado na
+escrita: a versão muda e as entradas antigas saem pelo LRU.
+
+A versão é lida antes da consulta ao banco, então uma escrita concorrente no
+máximo guarda dados mais novos sob a versão antiga (que já não será lida).
+"""
+
+import threading
+from collections import OrderedDict
+from collections.abc import Callable
+from typing import Any
+
+import app.db.database as db
+from app.core.config import RESPONSE_CACHE_SIZE
+from app.core.metrics import RESPONSE_CACHE_EVICTIONS, RESPONSE_CACHE_REQUESTS
+
+
+class ResponseCache:
+    """
+    LRU limitado a `max_entries` respostas, com contadores de hit/miss por
+    endpoint (globais nas métricas, por fazenda em stats()).
+    """
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_SIZE):
+        self.max_entries = max(0, max_entries)
+        self._entries: OrderedDict[tuple, Any] = OrderedDict()
+        self._lock = threading.Lock()
+        self._evictions = RESPONSE_CACHE_EVICTIONS.labels()
+        self._farm_counts: dict[int | None, dict[str, dict[str, int]]] = {}   # fazenda -> endpoint -> hit/miss
+        self._farm_evictions: dict[int | None, int] = {}
+
+    def get(self, endpoint: str, farm_id: int | None, params: tuple, compute: Callable[[], Any]) -> Any:
+        """
+        Resposta guardada para a versão atual dos dados da fazenda, ou
+        compute() (guardada em seguida). O valor retornado é compartilhado
+        entre requisições e não deve ser alterado por quem chama.
+        """
+        if not self.max_entries:
+            return compute()
+        key = (endpoint, farm_id, params, db.data_version(farm_id))
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                value = self._entries[key]
+                hit = True
+            else:
+                hit = False
+            counts = self._farm_counts.setdefault(farm_id, {}).setdefault(endpoint, {"hit": 0, "miss": 0})
+            counts["hit" if hit else "miss"] += 1
+        RESPONSE_CACHE_REQUESTS.labels(endpoint, "hit" if hit else "miss").inc()
+        if hit:
+            return value
+        value = compute()
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                evicted, _ = self._entries.popitem(last=False)
+                self._evictions.inc()
+                self._farm_evictions[evicted[1]] = self._farm_evictions.get(evicted[1], 0) + 1
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self, farm_id: int | None) -> dict:
+        """Hits/misses, entradas e evicções da fazenda (max_entries é o limite global)."""
+        with self._lock:
+            entries = sum(1 for key in self._entries if key[1] == farm_id)
+            by_endpoint = {ep: dict(c) for ep, c in self._farm_counts.get(farm_id, {}).items()}
+            evictions = self._farm_evictions.get(farm_id, 0)
+        return {
+            "entries":     entries,
+            "max_entries": self.max_entries,
+            "evictions":   evictions,
+            "endpoints":   by_endpoint,
+        }
+
+
+response_cache = ResponseCache()
@@ -3,24 +3,126 @@ app/db/database.py — Banco de dados com multi-tenancy por fazenda.
 
 Cada fazenda (farm) é isolada: usuários, animais, pessoas, movimentações,
 vacinas, financeiro e câmeras são filtrados por farm_id.
+
+Conexões: cada thread reaproveita as suas (uma de escrita, via get_conn(),
+e uma somente leitura com query_only, via get_read_conn()), abertas uma vez
+e configuradas com WAL, synchronous=NORMAL, cache, mmap e busy_timeout.
+Com WAL, as leituras do dashboard/API não esperam as escritas das câmeras.
+As conexões são usadas como antes (`with get_conn() as conn:` faz commit ou
+rollback) e nunca devem ser fechadas por quem chama.
+
+Cada função de escrita incrementa a versão da fazenda afetada (ou a global,
+quando a fazenda não é conhecida) depois do commit; data_version() é a chave
+de invalidação do cache de respostas (app/db/cache.py).
+
+O dashboard lê contadores por fazenda (farm_stats, farm_daily,
+farm_month_expense) mantidos por triggers na mesma transação de cada
+escrita; check_dashboard_stats() confere e reconstrói esses resumos.
 """
 
+import functools
+import inspect
 import sqlite3
-from datetime import datetime
+import threading
+from datetime import datetime, timedelta
 from pathlib import Path
 
 import numpy as np
 
-from app.core.config import DB_PATH, PHOTOS_DIR
+from app.core.config import DB_BUSY_TIMEOUT_MS, DB_CACHE_MB, DB_MMAP_MB, DB_PATH, PHOTOS_DIR
 
+_local = threading.local()
 
-def get_conn() -> sqlite3.Connection:
-    conn = sqlite3.connect(DB_PATH)
+# Versões de dados: por fazenda e global (escrita sem fazenda conhecida invalida todas)
+_versions: dict[int, int] = {}
+_global_version = 0
+_versions_lock = threading.Lock()
+_version_listener = None   # processos de câmera repassam as versões ao processo da API
+
+
+def _connect(path: str, readonly: bool) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, timeout=DB_BUSY_TIMEOUT_MS / 1000)
     conn.row_factory = sqlite3.Row
+    if not readonly:
+        conn.execute("PRAGMA journal_mode = WAL")   # persistente no arquivo; idempotente
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute(f"PRAGMA busy_timeout = {int(DB_BUSY_TIMEOUT_MS)}")
+    conn.execute(f"PRAGMA cache_size = {-int(DB_CACHE_MB * 1024)}")   # negativo = KiB
+    conn.execute(f"PRAGMA mmap_size = {int(DB_MMAP_MB * (1 << 20))}")
+    conn.execute("PRAGMA temp_store = MEMORY")
     conn.execute("PRAGMA foreign_keys = ON")
+    if readonly:
+        conn.execute("PRAGMA query_only = ON")
     return conn
 
 
+def _thread_conn(readonly: bool) -> sqlite3.Connection:
+    # Chaveado também pelo caminho: DB_PATH pode ser trocado (ex.: benchmarks)
+    conns = getattr(_local, "conns", None)
+    if conns is None:
+        conns = _local.conns = {}
+    key = (DB_PATH, readonly)
+    conn = conns.get(key)
+    if conn is None:
+        conn = conns[key] = _connect(DB_PATH, readonly)
+    return conn
+
+
+def get_conn() -> sqlite3.Connection:
+    """Conexão de escrita da thread atual."""
+    return _thread_conn(readonly=False)
+
+
+def get_read_conn() -> sqlite3.Connection:
+    """Conexão somente leitura (query_only) da thread atual."""
+    return _thread_conn(readonly=True)
+
+
+def data_version(farm_id: int | None) -> tuple[int, int]:
+    """(versão global, versão da fazenda); muda a cada escrita que pode afetar a fazenda."""
+    return _global_version, _versions.get(farm_id, 0)
+
+
+def bump_version(farm_id: int | None = None, notify: bool = True) -> None:
+    """Marca os dados da fazenda (None = todas) como alterados."""
+    global _global_version
+    with _versions_lock:
+        if farm_id is None:
+            _global_version += 1
+        else:
+            _versions[farm_id] = _versions.get(farm_id, 0) + 1
+    if notify and _version_listener:
+        _version_listener(farm_id)
+
+
+def set_version_listener(listener) -> None:
+    global _version_listener
+    _version_listener = listener
+
+
+def _writes(fn):
+    """Função de escrita: ao terminar, incrementa a versão do farm_id recebido (ou a global)."""
+    params = list(inspect.signature(fn).parameters)
+    pos = params.index("farm_id") if "farm_id" in params else None
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            farm_id = args[pos] if pos is not None and len(args) > pos else kwargs.get("farm_id")
+            bump_version(farm_id)
+    return wrapper
+
+
+def close_thread_conns() -> None:
+    """Fecha as conexões da thread atual (reabertas no próximo uso)."""
+    for conn in getattr(_local, "conns", {}).values():
+        conn.close()
+    _local.conns = {}
+
+
+@_writes
 def init_db() -> None:
     """Cria/migra todas as tabelas. Chamado no startup da aplicação."""
     PHOTOS_DIR.mkdir(exist_ok=True)
@@ -47,6 +149,9 @@ def init_db() -> None:
             )
         """)
         _try_add_column(conn, "users", "farm_id", "INTEGER REFERENCES farms(id)")
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_users_farm ON users(farm_id)"
+        )
 
         # --- Gado (cattle) ---
         conn.execute("""
@@ -109,6 +214,9 @@ def init_db() -> None:
                 applied_by   INTEGER REFERENCES users(id)
             )
         """)
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_vaccines_next_due ON vaccines(next_due)"
+        )
 
         # --- Financeiro ---
         conn.execute("""
@@ -127,8 +235,11 @@ def init_db() -> None:
             )
         """)
         _try_add_column(conn, "financials", "farm_id", "INTEGER REFERENCES farms(id)")
+        # (farm_id, occurred_at): filtro por fazenda + intervalo de datas/ordenação;
+        # substitui o antigo idx_financials_farm (prefixo deste)
+        conn.execute("DROP INDEX IF EXISTS idx_financials_farm")
         conn.execute(
-            "CREATE INDEX IF NOT EXISTS idx_financials_farm ON financials(farm_id)"
+            "CREATE INDEX IF NOT EXISTS idx_financials_farm_time ON financials(farm_id, occurred_at)"
         )
 
         # --- Movimentações ---
@@ -146,8 +257,17 @@ def init_db() -> None:
             )
         """)
         _try_add_column(conn, "movements", "farm_id", "INTEGER REFERENCES farms(id)")
+        # farm_time cobre contagem do dia e gráfico semanal (event_type incluso) e a
+        # listagem ordenada por data; farm_entity serve a última movimentação de
+        # uma entidade. Ambos substituem o antigo idx_movements_farm.
+        conn.execute("DROP INDEX IF EXISTS idx_movements_farm")
         conn.execute(
-            "CREATE INDEX IF NOT EXISTS idx_movements_farm ON movements(farm_id)"
+            "CREATE INDEX IF NOT EXISTS idx_movements_farm_time "
+            "ON movements(farm_id, detected_at, event_type)"
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_movements_farm_entity "
+            "ON movements(farm_id, entity_type, entity_id, detected_at)"
         )
 
         # --- Câmeras ---
@@ -163,6 +283,15 @@ def init_db() -> None:
             )
         """)
         _try_add_column(conn, "cameras", "farm_id", "INTEGER REFERENCES farms(id)")
+        # Sensibilidade do gate de movimento (NULL = padrão global, 0 = desligado)
+        _try_add_column(conn, "cameras", "motion_threshold", "REAL")
+        # Detecção em baixa resolução: sub-stream opcional e lado maior do frame
+        # enviado ao YOLO (NULL = padrão global, 0 = resolução original)
+        _try_add_column(conn, "cameras", "detect_source_url", "TEXT")
+        _try_add_column(conn, "cameras", "detect_max_side", "INTEGER")
+
+        # --- Resumos do dashboard (mantidos por triggers) ---
+        _create_rollups(conn)
 
         # --- Migração: fazenda padrão para dados existentes sem farm_id ---
         _migrate_default_farm(conn)
@@ -210,6 +339,7 @@ def _migrate_default_farm(conn: sqlite3.Connection) -> None:
 # Fazendas
 # ---------------------------------------------------------------------------
 
+@_writes
 def create_farm(name: str) -> int:
     with get_conn() as conn:
         cur = conn.execute("INSERT INTO farms (name) VALUES (?)", (name,))
@@ -217,7 +347,7 @@ def create_farm(name: str) -> int:
 
 
 def get_farm_by_id(farm_id: int) -> dict | None:
-    with get_conn() as conn:
+    with get_read_conn() as conn:
         row = conn.execute(
             "SELECT id, name, created_at FROM farms WHERE id=?", (farm_id,)
         ).fetchone()
@@ -228,6 +358,7 @@ def get_farm_by_id(farm_id: int) -> dict | None:
 # Usuários
 # ---------------------------------------------------------------------------
 
+@_writes
 def create_user(name: str, email: str, password_hash: str, role: str, farm_id: int) -> int:
     with get_conn() as conn:
         cur = conn.execute(
@@ -238,7 +369,7 @@ def create_user(name: str, email: str, password_hash: str, role: str, farm_id: i
 
 
 def get_user_by_email(email: str) -> dict | None:
-    with get_conn() as conn:
+    with get_read_conn() as conn:
         row = conn.execute(
             "SELECT id, farm_id, name, email, password_hash, role, created_at FROM users WHERE email=?",
             (email,),
@@ -247,7 +378,7 @@ def get_user_by_email(email: str) -> dict | None:
 
 
 def get_user_by_id(user_id: int) -> dict | None:
-    with get_conn() as conn:
+    with get_read_conn() as conn:
         row = conn.execute(
             "SELECT id, farm_id, name, email, role, created_at FROM users WHERE id=?",
             (user_id,),
@@ -256,7 +387,7 @@ def get_user_by_id(user_id: int) -> dict | None:
 
 
 def list_users(farm_id: int) -> list[dict]:
-    with get_conn() as conn:
+    with get_read_conn() as conn:
         rows = conn.execute(
             "SELECT id, farm_id, name, email, role, created_at FROM users "
             "WHERE farm_id=? ORDER BY created_at",
@@ -265,6 +396,7 @@ def list_users(farm_id: int) -> list[dict]:
     return [dict(r) for r in rows]
 
 
+@_writes
 def delete_user(user_id: int) -> bool:
     with get_conn() as conn:
         cur = conn.execute("DELETE FROM users WHERE id=?", (user_id,))
@@ -275,6 +407,7 @@ def delete_user(user_id: int) -> bool:
 # Gado (cattle)
 # ---------------------------------------------------------------------------
 
+@_writes
 def register_animal(
     name: str,
     embedding: np.ndarray,
@@ -296,7 +429,7 @@ def register_animal(
 
 
 def get_animal(animal_id: int, farm_id: int | None = None) -> dict | None:
-    with get_conn() as conn:
+    with get_read_conn() as conn:
         if farm_id is not None:
             row = conn.execute(
                 "SELECT id, name, description, breed, weight, status, photo_path, registered_at "
@@ -322,11 +455,12 @@ def list_animals(farm_id: int, status: str | None = None) -> list[dict]:
         query += " AND status=?"
         params.append(status)
     query += " ORDER BY registered_at DESC"
-    with get_conn() as conn:
+    with get_read_conn() as conn:
         rows = conn.execute(query, params).fetchall()
     return [dict(r) for r in rows]
 
 
+@_writes
 def update_animal(
     animal_id: int,
     name: str | None = None,
@@ -359,6 +493,7 @@ def update_animal(
     return cur.rowcount > 0
 
 
+@_writes
 def delete_animal(animal_id: int, farm_id: int | None = None) -> bool:
     with get_conn() as conn:
         conn.execute(
@@ -373,6 +508,7 @@ def delete_animal(animal_id: int, farm_id: int | None = None) -> bool:
     return cur.rowcount > 0
 
 
+@_writes
 def update_animal_photo(animal_id: int, photo_path: str) -> bool:
     with get_conn() as conn:
         cur = conn.execute(
@@ -382,7 +518,7 @@ def update_animal_photo(animal_id: int, photo_path: str) -> bool:
 
 
 def load_all_animals_with_embeddings(farm_id: int | None = None) -> list[dict]:
-    with get_conn() as conn:
+    with get_read_conn() as conn:
         if farm_id is not None:
             rows = conn.execute(
                 "SELECT id, name, description, embedding_blob FROM cattle WHERE farm_id=?",
@@ -404,7 +540,7 @@ def load_all_animals_with_embeddings(farm_id: int | None = None) -> list[dict]:
 
 
 def animal_exists(name: str, farm_id: int | None = None) -> bool:
-    with get_conn() as conn:
+    with get_read_conn() as conn:
         if farm_id is not None:
             row = conn.execute(
                 "SELECT 1 FROM cattle WHERE name=? AND farm_id=?", (name, farm_id)
@@ -420,6 +556,7 @@ def animal_exists(name: str, farm_id: int | None = None) -> bool:
 # Pessoas
 # ---------------------------------------------------------------------------
 
+@_writes
 def register_person(
     name: str,
     embedding: np.ndarray,
@@ -440,7 +577,7 @@ def register_person(
 
 
 def get_person(person_id: int, farm_id: int | None = None) -> dict | None:
-    with get_conn() as conn:
+    with get_read_conn() as conn:
         if farm_id is not None:
             row = conn.execute(
                 "SELECT id, name, role, description, weight, photo_path, registered_at "
@@ -457,7 +594,7 @@ def get_person(person_id: int, farm_id: int | None = None) -> dict | None:
 
 
 def list_people(farm_id: int) -> list[dict]:
-    with get_conn() as conn:
+    with get_read_conn() as conn:
         rows = conn.execute(
             "SELECT id, name, role, description, weight, photo_path, registered_at "
             "FROM people WHERE farm_id=? ORDER BY registered_at DESC",
@@ -466,6 +603,7 @@ def list_people(farm_id: int) -> list[dict]:
     return [dict(r) for r in rows]
 
 
+@_writes
 def update_person(
     person_id: int,
     name: str | None = None,
@@ -495,6 +633,7 @@ def update_person(
     return cur.rowcount > 0
 
 
+@_writes
 def delete_person(person_id: int, farm_id: int | None = None) -> bool:
     with get_conn() as conn:
         conn.execute(
@@ -509,6 +648,7 @@ def delete_person(person_id: int, farm_id: int | None = None) -> bool:
     return cur.rowcount > 0
 
 
+@_writes
 def update_person_photo(person_id: int, photo_path: str) -> bool:
     with get_conn() as conn:
         cur = conn.execute(
@@ -519,7 +659,7 @@ def update_person_photo(person_id: int, photo_path: str) -> bool:
 
 def list_ids_without_photo(farm_id: int | None = None) -> dict[str, list[int]]:
     """Retorna IDs de animais e pessoas que ainda não têm foto salva."""
-    with get_conn() as conn:
+    with get_read_conn() as conn:
         if farm_id is not None:
             animal_ids = [r[0] for r in conn.execute(
                 "SELECT id FROM cattle WHERE farm_id=? AND (photo_path IS NULL OR photo_path='')",
@@ -540,7 +680,7 @@ def list_ids_without_photo(farm_id: int | None = None) -> dict[str, list[int]]:
 
 
 def load_all_people_with_embeddings(farm_id: int | None = None) -> list[dict]:
-    with get_conn() as conn:
+    with get_read_conn() as conn:
         if farm_id is not None:
             rows = conn.execute(
                 "SELECT id, name, description, embedding_blob FROM people WHERE farm_id=?",
@@ -562,7 +702,7 @@ def load_all_people_with_embeddings(farm_id: int | None = None) -> list[dict]:
 
 
 def person_exists(name: str, farm_id: int | None = None) -> bool:
-    with get_conn() as conn:
+    with get_read_conn() as conn:
         if farm_id is not None:
             row = conn.execute(
                 "SELECT 1 FROM people WHERE name=? AND farm_id=?", (name, farm_id)
@@ -578,6 +718,7 @@ def person_exists(name: str, farm_id: int | None = None) -> bool:
 # Vacinas
 # ---------------------------------------------------------------------------
 
+@_writes
 def add_vaccine(
     animal_id: int,
     vaccine_name: str,
@@ -615,11 +756,12 @@ def list_vaccines(animal_id: int | None = None, farm_id: int | None = None) -> l
     if conditions:
         query += " WHERE " + " AND ".join(conditions)
     query += " ORDER BY v.applied_at DESC"
-    with get_conn() as conn:
+    with get_read_conn() as conn:
         rows = conn.execute(query, params).fetchall()
     return [dict(r) for r in rows]
 
 
+@_writes
 def delete_vaccine(vaccine_id: int, farm_id: int | None = None) -> bool:
     with get_conn() as conn:
         if farm_id is not None:
@@ -640,15 +782,14 @@ def list_upcoming_vaccines(days: int = 30, farm_id: int | None = None) -> list[d
                v.vaccine_name, v.next_due
         FROM vaccines v
         JOIN cattle c ON c.id = v.animal_id
-        WHERE v.next_due IS NOT NULL
-          AND date(v.next_due) BETWEEN date('now') AND date('now', '+' || ? || ' days')
+        WHERE v.next_due >= date('now') AND v.next_due < date('now', '+' || ? || ' days')
     """
-    params: list = [days]
+    params: list = [days + 1]
     if farm_id is not None:
         query += " AND c.farm_id=?"
         params.append(farm_id)
     query += " ORDER BY v.next_due ASC"
-    with get_conn() as conn:
+    with get_read_conn() as conn:
         rows = conn.execute(query, params).fetchall()
     return [dict(r) for r in rows]
 
@@ -657,6 +798,7 @@ def list_upcoming_vaccines(days: int = 30, farm_id: int | None = None) -> list[d
 # Movimentações
 # ---------------------------------------------------------------------------
 
+@_writes
 def add_movement(
     entity_type: str,
     entity_id: int,
@@ -665,16 +807,45 @@ def add_movement(
     source: str = "webcam",
     notes: str = "",
     farm_id: int | None = None,
+    detected_at: str | None = None,
 ) -> int:
+    """detected_at: 'YYYY-MM-DD HH:MM:SS' (ex.: hora do frame de um vídeo); None = agora."""
     with get_conn() as conn:
         cur = conn.execute(
-            "INSERT INTO movements (farm_id, entity_type, entity_id, entity_name, event_type, source, notes) "
-            "VALUES (?,?,?,?,?,?,?)",
-            (farm_id, entity_type, entity_id, entity_name, event_type, source, notes),
+            "INSERT INTO movements (farm_id, entity_type, entity_id, entity_name, event_type, source, notes, "
+            "detected_at) VALUES (?,?,?,?,?,?,?,COALESCE(?, datetime('now','localtime')))",
+            (farm_id, entity_type, entity_id, entity_name, event_type, source, notes, detected_at),
         )
         return cur.lastrowid
 
 
+def write_batch(
+    movements: list[tuple] = (),
+    animal_photos: list[tuple[str, int]] = (),
+    person_photos: list[tuple[str, int]] = (),
+) -> None:
+    """
+    Grava um lote numa única transação (usado pelo DbWriter).
+    movements: (farm_id, entity_type, entity_id, entity_name, event_type, source, notes, detected_at)
+    *_photos: (photo_path, id)
+    """
+    with get_conn() as conn:
+        if movements:
+            conn.executemany(
+                "INSERT INTO movements (farm_id, entity_type, entity_id, entity_name, event_type, source, notes, "
+                "detected_at) VALUES (?,?,?,?,?,?,?,COALESCE(?, datetime('now','localtime')))",
+                movements,
+            )
+        if animal_photos:
+            conn.executemany("UPDATE cattle SET photo_path=? WHERE id=?", animal_photos)
+        if person_photos:
+            conn.executemany("UPDATE people SET photo_path=? WHERE id=?", person_photos)
+    for farm_id in {m[0] for m in movements}:
+        bump_version(farm_id)
+    if animal_photos or person_photos:
+        bump_version(None)   # fotos chegam só com o id; a fazenda não é conhecida aqui
+
+
 def list_movements(
     entity_type: str | None = None,
     limit: int = 100,
@@ -697,17 +868,23 @@ def list_movements(
         query += " WHERE " + " AND ".join(conditions)
     query += " ORDER BY detected_at DESC LIMIT ?"
     params.append(limit)
-    with get_conn() as conn:
+    with get_read_conn() as conn:
         rows = conn.execute(query, params).fetchall()
     return [dict(r) for r in rows]
 
 
-def get_last_movement(entity_type: str, entity_id: int) -> dict | None:
-    with get_conn() as conn:
+def get_last_movement(entity_type: str, entity_id: int, farm_id: int | None = None) -> dict | None:
+    """Sem farm_id, usa a fazenda do cadastro (o índice de movimentos começa por farm_id)."""
+    if farm_id is not None:
+        farm_clause, params = "farm_id=?", (farm_id, entity_type, entity_id)
+    else:
+        table = "cattle" if entity_type == "animal" else "people"
+        farm_clause, params = f"farm_id=(SELECT farm_id FROM {table} WHERE id=?)", (entity_id, entity_type, entity_id)
+    with get_read_conn() as conn:
         row = conn.execute(
-            "SELECT detected_at FROM movements WHERE entity_type=? AND entity_id=? "
+            f"SELECT detected_at FROM movements WHERE {farm_clause} AND entity_type=? AND entity_id=? "
             "ORDER BY detected_at DESC LIMIT 1",
-            (entity_type, entity_id),
+            params,
         ).fetchone()
     return dict(row) if row else None
 
@@ -716,94 +893,256 @@ def get_last_movement(entity_type: str, entity_id: int) -> dict | None:
 # Dashboard stats
 # ---------------------------------------------------------------------------
 
+# Contadores do dashboard mantidos incrementalmente por triggers, na mesma
+# transação de cada escrita — inclusive executemany do DbWriter, exclusões em
+# cascata e a migração de farm_id. Cada resumo é definido uma vez e gera os
+# triggers de INSERT (+NEW), DELETE (-OLD) e UPDATE das colunas relevantes
+# (-OLD +NEW), além da consulta de reconstrução usada por check_dashboard_stats.
+#
+#   farm_stats          — totais por fazenda (animais por status, pessoas, usuários)
+#   farm_daily          — por dia: movimentações (entradas/saídas) e receitas/despesas
+#   farm_month_expense  — despesas do mês por categoria
+#
+# (tabela base, colunas que alteram o resumo, resumo, chaves {col: expr}, valores {col: expr}, condição)
+# Nas expressões, {r} é a linha (NEW/OLD nos triggers, a tabela na reconstrução).
+_ROLLUPS = (
+    ("cattle", ("farm_id", "status"), "farm_stats", {"farm_id": "{r}.farm_id"}, {
+        "total_animals":       "1",
+        "active_animals":      "{r}.status IS 'active'",
+        "sold_animals":        "{r}.status IS 'sold'",
+        "slaughtered_animals": "{r}.status IS 'slaughtered'",
+    }, None),
+    ("people", ("farm_id",), "farm_stats", {"farm_id": "{r}.farm_id"}, {"total_people": "1"}, None),
+    ("users", ("farm_id",), "farm_stats", {"farm_id": "{r}.farm_id"}, {"total_users": "1"}, None),
+    ("movements", ("farm_id", "detected_at", "event_type"), "farm_daily",
+     {"farm_id": "{r}.farm_id", "day": "substr({r}.detected_at, 1, 10)"}, {
+        "movements": "1",
+        "entries":   "{r}.event_type IS 'entry'",
+        "exits":     "{r}.event_type IS 'exit'",
+    }, None),
+    ("financials", ("farm_id", "occurred_at", "type", "amount"), "farm_daily",
+     {"farm_id": "{r}.farm_id", "day": "substr({r}.occurred_at, 1, 10)"}, {
+        "income":  "CASE WHEN {r}.type='income' THEN {r}.amount ELSE 0 END",
+        "expense": "CASE WHEN {r}.type='expense' THEN {r}.amount ELSE 0 END",
+    }, None),
+    ("financials", ("farm_id", "occurred_at", "type", "amount", "category"), "farm_month_expense",
+     {"farm_id": "{r}.farm_id", "month": "substr({r}.occurred_at, 1, 7)", "category": "{r}.category"},
+     {"total": "{r}.amount"}, "{r}.type='expense'"),
+)
+
+_ROLLUP_TABLES = {
+    "farm_stats": """
+        CREATE TABLE IF NOT EXISTS farm_stats (
+            farm_id             INTEGER PRIMARY KEY,
+            total_animals       INTEGER NOT NULL DEFAULT 0,
+            active_animals      INTEGER NOT NULL DEFAULT 0,
+            sold_animals        INTEGER NOT NULL DEFAULT 0,
+            slaughtered_animals INTEGER NOT NULL DEFAULT 0,
+            total_people        INTEGER NOT NULL DEFAULT 0,
+            total_users         INTEGER NOT NULL DEFAULT 0
+        )
+    """,
+    "farm_daily": """
+        CREATE TABLE IF NOT EXISTS farm_daily (
+            farm_id   INTEGER NOT NULL,
+            day       TEXT    NOT NULL,
+            movements INTEGER NOT NULL DEFAULT 0,
+            entries   INTEGER NOT NULL DEFAULT 0,
+            exits     INTEGER NOT NULL DEFAULT 0,
+            income    REAL    NOT NULL DEFAULT 0,
+            expense   REAL    NOT NULL DEFAULT 0,
+            PRIMARY KEY (farm_id, day)
+        ) WITHOUT ROWID
+    """,
+    "farm_month_expense": """
+        CREATE TABLE IF NOT EXISTS farm_month_expense (
+            farm_id  INTEGER NOT NULL,
+            month    TEXT    NOT NULL,
+            category TEXT    NOT NULL,
+            total    REAL    NOT NULL DEFAULT 0,
+            PRIMARY KEY (farm_id, month, category)
+        ) WITHOUT ROWID
+    """,
+}
+
+
+def _rollup_upsert(rollup: tuple, r: str, sign: int) -> str:
+    """Upsert que soma (sign=1) ou subtrai (sign=-1) a linha `r` no resumo."""
+    _, _, target, keys, values, cond = rollup
+    where = f"{r}.farm_id IS NOT NULL" + (f" AND {cond.format(r=r)}" if cond else "")
+    cols = [*keys, *values]
+    exprs = [e.format(r=r) for e in keys.values()] + [f"{sign} * ({e.format(r=r)})" for e in values.values()]
+    sets = ", ".join(f"{c} = {c} + excluded.{c}" for c in values)
+    return (f"INSERT INTO {target} ({', '.join(cols)}) SELECT {', '.join(exprs)} WHERE {where} "
+            f"ON CONFLICT ({', '.join(keys)}) DO UPDATE SET {sets};")
+
+
+def _create_rollups(conn: sqlite3.Connection) -> None:
+    existing = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+    for ddl in _ROLLUP_TABLES.values():
+        conn.execute(ddl)
+    for i, rollup in enumerate(_ROLLUPS):
+        table, columns, target = rollup[:3]
+        name = f"trg_{target}_{table}_{i}"
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS {name}_ins AFTER INSERT ON {table} "
+                     f"BEGIN {_rollup_upsert(rollup, 'NEW', 1)} END")
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS {name}_del AFTER DELETE ON {table} "
+                     f"BEGIN {_rollup_upsert(rollup, 'OLD', -1)} END")
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS {name}_upd AFTER UPDATE OF {', '.join(columns)} ON {table} "
+                     f"BEGIN {_rollup_upsert(rollup, 'OLD', -1)} {_rollup_upsert(rollup, 'NEW', 1)} END")
+    if not set(_ROLLUP_TABLES) <= existing:
+        # Banco anterior aos resumos: preenche a partir das tabelas base
+        _rebuild_rollups(conn, None)
+
+
+def _expected_rollups(conn: sqlite3.Connection, farm_id: int | None) -> dict[str, dict[tuple, dict]]:
+    """Resumos recalculados das tabelas base: {tabela: {chave: {coluna: valor}}}."""
+    out: dict[str, dict[tuple, dict]] = {t: {} for t in _ROLLUP_TABLES}
+    for table, _, target, keys, values, cond in _ROLLUPS:
+        where = "r.farm_id IS NOT NULL" + (f" AND {cond.format(r='r')}" if cond else "")
+        params: tuple = ()
+        if farm_id is not None:
+            where += " AND r.farm_id=?"
+            params = (farm_id,)
+        key_exprs = [e.format(r="r") for e in keys.values()]
+        sums = [f"SUM({e.format(r='r')}) AS {c}" for c, e in values.items()]
+        rows = conn.execute(
+            f"SELECT {', '.join(key_exprs)}, {', '.join(sums)} FROM {table} r WHERE {where} "
+            f"GROUP BY {', '.join(key_exprs)}", params,
+        ).fetchall()
+        for row in rows:
+            key = tuple(row[:len(keys)])
+            out[target].setdefault(key, {}).update({c: row[c] for c in values})
+    return out
+
+
+def _current_rollups(conn: sqlite3.Connection, farm_id: int | None) -> dict[str, dict[tuple, dict]]:
+    out = {}
+    for target in _ROLLUP_TABLES:
+        key_cols = next(list(r[3]) for r in _ROLLUPS if r[2] == target)
+        where, params = ("WHERE farm_id=?", (farm_id,)) if farm_id is not None else ("", ())
+        rows = conn.execute(f"SELECT * FROM {target} {where}", params).fetchall()
+        out[target] = {tuple(row[k] for k in key_cols): {k: row[k] for k in row.keys() if k not in key_cols}
+                       for row in rows}
+    return out
+
+
+def _rebuild_rollups(conn: sqlite3.Connection, farm_id: int | None) -> None:
+    expected = _expected_rollups(conn, farm_id)
+    for target, rows in expected.items():
+        key_cols = next(list(r[3]) for r in _ROLLUPS if r[2] == target)
+        if farm_id is None:
+            conn.execute(f"DELETE FROM {target}")
+        else:
+            conn.execute(f"DELETE FROM {target} WHERE farm_id=?", (farm_id,))
+        for key, values in rows.items():
+            cols = [*key_cols, *values]
+            conn.execute(f"INSERT INTO {target} ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))})",
+                         (*key, *values.values()))
+
+
+def _rollup_diff(current: dict, expected: dict) -> list[dict]:
+    diffs = []
+    for target, exp_rows in expected.items():
+        cur_rows = current.get(target, {})
+        for key in exp_rows.keys() | cur_rows.keys():
+            exp, cur = exp_rows.get(key, {}), cur_rows.get(key, {})
+            for col in exp.keys() | cur.keys():
+                e, c = exp.get(col) or 0, cur.get(col) or 0
+                if abs(e - c) > 1e-6:
+                    diffs.append({"table": target, "key": list(key), "column": col,
+                                  "expected": e, "current": c})
+    return diffs
+
+
+def check_dashboard_stats(farm_id: int | None = None, repair: bool = False) -> dict:
+    """
+    Confere os resumos do dashboard contra as tabelas base (None = todas as
+    fazendas). Com repair=True, reconstrói os resumos quando há divergência.
+    """
+    with get_conn() as conn:
+        diffs = _rollup_diff(_current_rollups(conn, farm_id), _expected_rollups(conn, farm_id))
+        if diffs and repair:
+            _rebuild_rollups(conn, farm_id)
+    if diffs and repair:
+        bump_version(farm_id)
+    return {"farm_id": farm_id, "consistent": not diffs, "repaired": bool(diffs) and repair,
+            "differences": diffs[:100], "total_differences": len(diffs)}
+
+
 def get_dashboard_stats(farm_id: int | None = None) -> dict:
+    """Lê os resumos mantidos por triggers; só as vacinas (janela móvel) são contadas na hora."""
     fid_clause = "AND farm_id=?" if farm_id is not None else ""
     fid_params = (farm_id,) if farm_id is not None else ()
+    today = datetime.now().date()
+    today_s = today.isoformat()
+    week_start = (today - timedelta(days=6)).isoformat()   # gráfico: últimos 7 dias, inteiros
+    month_start = today.replace(day=1).isoformat()
+    next_month = (today.replace(day=28) + timedelta(days=4)).replace(day=1).isoformat()
+
+    with get_read_conn() as conn:
+        totals = conn.execute(f"""
+            SELECT COALESCE(SUM(total_animals), 0)       AS total_animals,
+                   COALESCE(SUM(active_animals), 0)      AS active_animals,
+                   COALESCE(SUM(sold_animals), 0)        AS sold_animals,
+                   COALESCE(SUM(slaughtered_animals), 0) AS slaughtered_animals,
+                   COALESCE(SUM(total_people), 0)        AS total_people,
+                   COALESCE(SUM(total_users), 0)         AS total_users
+            FROM farm_stats WHERE 1=1 {fid_clause}
+        """, fid_params).fetchone()
 
-    with get_conn() as conn:
-        total_animals = conn.execute(
-            f"SELECT COUNT(*) FROM cattle WHERE 1=1 {fid_clause}", fid_params
-        ).fetchone()[0]
-        total_people = conn.execute(
-            f"SELECT COUNT(*) FROM people WHERE 1=1 {fid_clause}", fid_params
-        ).fetchone()[0]
-        total_users = conn.execute(
-            f"SELECT COUNT(*) FROM users WHERE 1=1 {fid_clause}", fid_params
-        ).fetchone()[0]
-        movements_today = conn.execute(
-            f"SELECT COUNT(*) FROM movements WHERE date(detected_at)=date('now','localtime') {fid_clause}",
-            fid_params,
-        ).fetchone()[0]
+        days = conn.execute(f"""
+            SELECT day, SUM(movements) AS movements, SUM(entries) AS entries, SUM(exits) AS exits,
+                   SUM(income) AS income, SUM(expense) AS expense
+            FROM farm_daily
+            WHERE day >= ? {fid_clause}
+            GROUP BY day
+            ORDER BY day ASC
+        """, (min(week_start, month_start), *fid_params)).fetchall()
 
         # Vacinas via JOIN para filtrar por fazenda
         if farm_id is not None:
             vaccines_upcoming = conn.execute("""
                 SELECT COUNT(*) FROM vaccines v
                 JOIN cattle c ON c.id = v.animal_id
-                WHERE v.next_due IS NOT NULL
-                  AND date(v.next_due) BETWEEN date('now') AND date('now','+30 days')
+                WHERE v.next_due >= date('now') AND v.next_due < date('now','+31 days')
                   AND c.farm_id=?
             """, (farm_id,)).fetchone()[0]
         else:
             vaccines_upcoming = conn.execute("""
                 SELECT COUNT(*) FROM vaccines
-                WHERE next_due IS NOT NULL
-                  AND date(next_due) BETWEEN date('now') AND date('now','+30 days')
+                WHERE next_due >= date('now') AND next_due < date('now','+31 days')
             """).fetchone()[0]
 
-        chart_rows = conn.execute(f"""
-            SELECT
-                date(detected_at,'localtime') as day,
-                SUM(CASE WHEN event_type='entry' THEN 1 ELSE 0 END) as entries,
-                SUM(CASE WHEN event_type='exit' THEN 1 ELSE 0 END) as exits
-            FROM movements
-            WHERE detected_at >= datetime('now','-7 days','localtime') {fid_clause}
-            GROUP BY day
-            ORDER BY day ASC
-        """, fid_params).fetchall()
-
-        fin = conn.execute(f"""
-            SELECT
-                COALESCE(SUM(CASE WHEN type='income'  THEN amount ELSE 0 END), 0) as income_month,
-                COALESCE(SUM(CASE WHEN type='expense' THEN amount ELSE 0 END), 0) as expense_month
-            FROM financials
-            WHERE strftime('%Y-%m', occurred_at) = strftime('%Y-%m', 'now', 'localtime')
-            {fid_clause}
-        """, fid_params).fetchone()
-
-        active_animals = conn.execute(
-            f"SELECT COUNT(*) FROM cattle WHERE status='active' {fid_clause}", fid_params
-        ).fetchone()[0]
-        sold_animals = conn.execute(
-            f"SELECT COUNT(*) FROM cattle WHERE status='sold' {fid_clause}", fid_params
-        ).fetchone()[0]
-        slaughtered_animals = conn.execute(
-            f"SELECT COUNT(*) FROM cattle WHERE status='slaughtered' {fid_clause}", fid_params
-        ).fetchone()[0]
-
         cat_rows = conn.execute(f"""
-            SELECT category, COALESCE(SUM(amount), 0) as total
-            FROM financials
-            WHERE type='expense'
-              AND strftime('%Y-%m', occurred_at) = strftime('%Y-%m', 'now', 'localtime')
-              {fid_clause}
+            SELECT category, SUM(total) as total
+            FROM farm_month_expense
+            WHERE month = ? {fid_clause}
             GROUP BY category
+            HAVING ABS(SUM(total)) > 0.000001
             ORDER BY total DESC
-        """, fid_params).fetchall()
+        """, (today_s[:7], *fid_params)).fetchall()
+
+    movements_today = next((r["movements"] for r in days if r["day"] == today_s), 0)
+    chart = [{"day": r["day"], "entries": r["entries"], "exits": r["exits"]}
+             for r in days if r["day"] >= week_start and r["movements"] > 0]
+    month = [r for r in days if month_start <= r["day"] < next_month]
+    income_month = sum(r["income"] for r in month)
+    expense_month = sum(r["expense"] for r in month)
 
     return {
-        "total_animals":        total_animals,
-        "active_animals":       active_animals,
-        "sold_animals":         sold_animals,
-        "slaughtered_animals":  slaughtered_animals,
-        "total_people":         total_people,
-        "total_users":          total_users,
+        "total_animals":        totals["total_animals"],
+        "active_animals":       totals["active_animals"],
+        "sold_animals":         totals["sold_animals"],
+        "slaughtered_animals":  totals["slaughtered_animals"],
+        "total_people":         totals["total_people"],
+        "total_users":          totals["total_users"],
         "movements_today":      movements_today,
         "vaccines_upcoming":    vaccines_upcoming,
-        "activity_chart":       [dict(r) for r in chart_rows],
-        "income_month":         round(fin["income_month"], 2),
-        "expense_month":        round(fin["expense_month"], 2),
-        "balance_month":        round(fin["income_month"] - fin["expense_month"], 2),
+        "activity_chart":       chart,
+        "income_month":         round(income_month, 2),
+        "expense_month":        round(expense_month, 2),
+        "balance_month":        round(income_month - expense_month, 2),
         "expense_by_category":  [{"category": r["category"], "total": round(r["total"], 2)} for r in cat_rows],
     }
 
@@ -812,6 +1151,7 @@ def get_dashboard_stats(farm_id: int | None = None) -> dict:
 # Financeiro
 # ---------------------------------------------------------------------------
 
+@_writes
 def add_financial(
     type: str,
     category: str,
@@ -860,11 +1200,12 @@ def list_financials(
         query += " WHERE " + " AND ".join(conditions)
     query += " ORDER BY f.occurred_at DESC LIMIT ?"
     params.append(limit)
-    with get_conn() as conn:
+    with get_read_conn() as conn:
         rows = conn.execute(query, params).fetchall()
     return [dict(r) for r in rows]
 
 
+@_writes
 def delete_financial(financial_id: int, farm_id: int | None = None) -> bool:
     with get_conn() as conn:
         if farm_id is not None:
@@ -879,7 +1220,7 @@ def delete_financial(financial_id: int, farm_id: int | None = None) -> bool:
 def get_financial_summary(months: int = 6, farm_id: int | None = None) -> list[dict]:
     fid_clause = "AND farm_id=?" if farm_id is not None else ""
     fid_params = (f"-{months}", farm_id) if farm_id is not None else (f"-{months}",)
-    with get_conn() as conn:
+    with get_read_conn() as conn:
         rows = conn.execute(f"""
             SELECT
                 strftime('%Y-%m', occurred_at, 'localtime') as month,
@@ -898,26 +1239,42 @@ def get_financial_summary(months: int = 6, farm_id: int | None = None) -> list[d
 # Câmeras
 # ---------------------------------------------------------------------------
 
-def add_camera(name: str, source_url: str, cam_type: str = "ip", farm_id: int | None = None) -> int:
+_CAMERA_COLUMNS = (
+    "id, farm_id, name, source_url, type, is_active, motion_threshold, "
+    "detect_source_url, detect_max_side, created_at"
+)
+
+
+@_writes
+def add_camera(
+    name: str,
+    source_url: str,
+    cam_type: str = "ip",
+    farm_id: int | None = None,
+    motion_threshold: float | None = None,
+    detect_source_url: str | None = None,
+    detect_max_side: int | None = None,
+) -> int:
     with get_conn() as conn:
         cur = conn.execute(
-            "INSERT INTO cameras (farm_id, name, source_url, type) VALUES (?,?,?,?)",
-            (farm_id, name, source_url, cam_type),
+            "INSERT INTO cameras (farm_id, name, source_url, type, motion_threshold, "
+            "detect_source_url, detect_max_side) VALUES (?,?,?,?,?,?,?)",
+            (farm_id, name, source_url, cam_type, motion_threshold, detect_source_url, detect_max_side),
         )
         return cur.lastrowid
 
 
 def get_camera(cam_id: int, farm_id: int | None = None) -> dict | None:
-    with get_conn() as conn:
+    with get_read_conn() as conn:
         if farm_id is not None:
             row = conn.execute(
-                "SELECT id, farm_id, name, source_url, type, is_active, created_at "
+                f"SELECT {_CAMERA_COLUMNS} "
                 "FROM cameras WHERE id=? AND farm_id=?",
                 (cam_id, farm_id),
             ).fetchone()
         else:
             row = conn.execute(
-                "SELECT id, farm_id, name, source_url, type, is_active, created_at "
+                f"SELECT {_CAMERA_COLUMNS} "
                 "FROM cameras WHERE id=?",
                 (cam_id,),
             ).fetchone()
@@ -925,21 +1282,22 @@ def get_camera(cam_id: int, farm_id: int | None = None) -> dict | None:
 
 
 def list_cameras(farm_id: int | None = None) -> list[dict]:
-    with get_conn() as conn:
+    with get_read_conn() as conn:
         if farm_id is not None:
             rows = conn.execute(
-                "SELECT id, farm_id, name, source_url, type, is_active, created_at "
+                f"SELECT {_CAMERA_COLUMNS} "
                 "FROM cameras WHERE farm_id=? ORDER BY created_at",
                 (farm_id,),
             ).fetchall()
         else:
             rows = conn.execute(
-                "SELECT id, farm_id, name, source_url, type, is_active, created_at "
+                f"SELECT {_CAMERA_COLUMNS} "
                 "FROM cameras ORDER BY created_at"
             ).fetchall()
     return [dict(r) for r in rows]
 
 
+@_writes
 def update_camera(
     cam_id: int,
     name: str | None = None,
@@ -947,6 +1305,9 @@ def update_camera(
     cam_type: str | None = None,
     is_active: bool | None = None,
     farm_id: int | None = None,
+    motion_threshold: float | None = None,
+    detect_source_url: str | None = None,
+    detect_max_side: int | None = None,
 ) -> bool:
     fields, params = [], []
     if name is not None:
@@ -957,6 +1318,13 @@ def update_camera(
         fields.append("type=?"); params.append(cam_type)
     if is_active is not None:
         fields.append("is_active=?"); params.append(int(is_active))
+    if motion_threshold is not None:
+        fields.append("motion_threshold=?"); params.append(motion_threshold)
+    if detect_source_url is not None:
+        # "" remove o sub-stream
+        fields.append("detect_source_url=?"); params.append(detect_source_url or None)
+    if detect_max_side is not None:
+        fields.append("detect_max_side=?"); params.append(detect_max_side)
     if not fields:
         return False
     params.append(cam_id)
@@ -969,6 +1337,7 @@ def update_camera(
     return cur.rowcount > 0
 
 
+@_writes
 def delete_camera(cam_id: int, farm_id: int | None = None) -> bool:
     with get_conn() as conn:
         if farm_id is not None:
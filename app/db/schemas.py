@@ -2,8 +2,9 @@
 schemas.py — Modelos Pydantic para request/response da API.
 """
 
+from datetime import datetime
 from typing import Optional
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field
 
 
 # ---------------------------------------------------------------------------
@@ -221,6 +222,9 @@ class CameraCreate(BaseModel):
     name: str
     source_url: str
     type: Optional[str] = "ip"   # 'ip' | 'rtsp' | 'webcam'
+    motion_threshold: Optional[float] = None   # fração de pixels alterados; 0 desliga o gate
+    detect_source_url: Optional[str] = None    # sub-stream de baixa resolução para a detecção
+    detect_max_side: Optional[int] = None      # lado maior do frame do YOLO; 0 = resolução original
 
 
 class CameraOut(BaseModel):
@@ -229,6 +233,9 @@ class CameraOut(BaseModel):
     source_url: str
     type: str
     is_active: bool
+    motion_threshold: Optional[float] = None
+    detect_source_url: Optional[str] = None
+    detect_max_side: Optional[int] = None
     created_at: str
 
 
@@ -237,3 +244,16 @@ class CameraUpdate(BaseModel):
     source_url: Optional[str] = None
     type: Optional[str] = None
     is_active: Optional[bool] = None
+    motion_threshold: Optional[float] = None
+    detect_source_url: Optional[str] = None    # "" remove o sub-stream
+    detect_max_side: Optional[int] = None
+
+
+# ---------------------------------------------------------------------------
+# Ingestao de videos
+# ---------------------------------------------------------------------------
+
+class VideoIngestRequest(BaseModel):
+    path: str                                   # caminho do video no servidor
+    started_at: Optional[datetime] = None       # inicio da gravacao (padrao: mtime - duracao)
+    stride: Optional[int] = Field(None, ge=1)   # processa 1 a cada N frames (padrao: INGEST_SAMPLE_FPS)
@@ -0,0 +1,227 @@
+"""
+app/db/writer.py — Escritor em segundo plano das gravações das câmeras.
+
+Os workers de câmera (e a ingestão de vídeo) não gravam mais no SQLite nem
+no disco dentro do loop de frames: movimentos e fotos vão para uma fila
+limitada e uma thread única os grava em lote —
+  - a cada DB_WRITE_FLUSH_MS ou DB_WRITE_BATCH operações (o que vier antes)
+  - arquivos JPEG primeiro, depois uma única transação com executemany
+  - fila cheia: a operação é descartada e contada (a câmera nunca bloqueia)
+  - falha na transação: o lote inteiro é refeito algumas vezes (rollback é atômico);
+    se ainda falhar, cada movimento perdido é registrado no log para recuperação
+
+Foto vinculada a um cadastro que não chega ao disco (ou ao banco) é
+repassada ao listener de set_photo_failure_listener — a câmera volta a
+tentar na próxima aparição.
+
+`flush()` espera a fila esvaziar (ex.: fim de uma ingestão) e `close()` é
+chamado no shutdown para não perder o que ainda está na fila.
+"""
+
+import queue
+import threading
+import time
+from datetime import datetime
+
+import cv2
+
+import app.db.database as db
+from app.core.config import DB_WRITE_BATCH, DB_WRITE_FLUSH_MS, DB_WRITE_QUEUE
+
+FLUSH_RETRIES = 3
+RETRY_DELAY = 0.5    # segundos; multiplicado pela tentativa
+
+
+class DbWriter:
+    """Fila de movimentos/fotos gravada em lote por uma thread dedicada."""
+
+    def __init__(self, flush_ms: float = DB_WRITE_FLUSH_MS, batch: int = DB_WRITE_BATCH,
+                 maxsize: int = DB_WRITE_QUEUE):
+        self.flush_interval = max(flush_ms, 1.0) / 1000.0
+        self.batch = max(1, batch)
+        self._queue: queue.Queue[tuple] = queue.Queue(maxsize=maxsize)
+        self._thread: threading.Thread | None = None
+        self._start_lock = threading.Lock()
+        self._closed = threading.Event()
+        self._idle = threading.Condition()
+        self._pending = 0    # enfileiradas e ainda não gravadas (inclui o lote em andamento)
+        self._full = False
+        self._stats_lock = threading.Lock()
+        self._photo_failed = None   # callback(farm_id, entity_type, entity_id)
+        self._stats = {"enqueued": 0, "written": 0, "flushes": 0, "dropped": 0, "errors": 0, "lost": 0,
+                       "max_depth": 0, "last_flush_ms": 0.0, "last_batch": 0}
+
+    def set_photo_failure_listener(self, listener) -> None:
+        """listener(farm_id, entity_type, entity_id): foto de cadastro não gravada ou não vinculada."""
+        self._photo_failed = listener
+
+    def _notify_photo_failed(self, farm_id, entity_type, entity_id) -> None:
+        if self._photo_failed:
+            try:
+                self._photo_failed(farm_id, entity_type, entity_id)
+            except Exception as e:
+                print(f"[DbWriter] Listener de foto falhou: {e}")
+
+    def _start(self) -> None:
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="db-writer", daemon=True)
+                self._thread.start()
+
+    def _count(self, key: str, n: int = 1) -> None:
+        with self._stats_lock:
+            self._stats[key] += n
+
+    def _submit(self, op: tuple) -> bool:
+        """Enfileira sem bloquear. Retorna False se a fila estiver cheia ou o escritor fechado."""
+        if self._closed.is_set():
+            self._count("dropped")
+            return False
+        self._start()
+        with self._idle:
+            self._pending += 1
+        try:
+            self._queue.put_nowait(op)
+        except queue.Full:
+            self._done(1)
+            self._count("dropped")
+            if not self._full:   # avisa uma vez por episódio de fila cheia
+                self._full = True
+                print(f"[DbWriter] Fila cheia ({self._queue.maxsize}) — descartando gravações.")
+            return False
+        self._full = False
+        depth = self._queue.qsize()
+        with self._stats_lock:
+            self._stats["enqueued"] += 1
+            if depth > self._stats["max_depth"]:
+                self._stats["max_depth"] = depth
+        return True
+
+    def _done(self, n: int) -> None:
+        with self._idle:
+            self._pending -= n
+            if self._pending <= 0:
+                self._idle.notify_all()
+
+    def add_movement(self, entity_type: str, entity_id: int, entity_name: str, event_type: str,
+                     source: str = "webcam", notes: str = "", farm_id: int | None = None,
+                     detected_at: str | None = None) -> bool:
+        """Mesmos argumentos de db.add_movement; sem detected_at vale a hora do enfileiramento."""
+        detected_at = detected_at or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        return self._submit(("movement", (farm_id, entity_type, entity_id, entity_name, event_type,
+                                          source, notes, detected_at)))
+
+    def save_photo(self, path: str, crop_bgr, entity_type: str | None = None,
+                   entity_id: int | None = None, farm_id: int | None = None) -> bool:
+        """
+        Grava o crop em `path` e, com entity_type/entity_id, atualiza o
+        photo_path do animal/pessoa depois que o arquivo existir.
+        """
+        return self._submit(("photo", (path, crop_bgr, entity_type, entity_id, farm_id)))
+
+    def _loop(self) -> None:
+        while True:
+            try:
+                ops = [self._queue.get(timeout=0.5)]
+            except queue.Empty:
+                if self._closed.is_set():
+                    return
+                continue
+            deadline = time.monotonic() + self.flush_interval
+            while len(ops) < self.batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    ops.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                self._flush_ops(ops)
+            finally:
+                self._done(len(ops))
+
+    def _flush_ops(self, ops: list[tuple]) -> None:
+        t0 = time.perf_counter()
+        movements, photos, linked = [], {"animal": [], "person": []}, []
+        for kind, args in ops:
+            if kind == "movement":
+                movements.append(args)
+                continue
+            path, crop, entity_type, entity_id, farm_id = args
+            try:
+                ok = cv2.imwrite(path, crop)
+            except cv2.error:
+                ok = False
+            if ok:
+                if entity_type:
+                    photos[entity_type].append((path, entity_id))
+                    linked.append((farm_id, entity_type, entity_id))
+            else:
+                self._count("errors")
+                print(f"[DbWriter] Falha ao gravar foto {path}")
+                if entity_type:
+                    self._notify_photo_failed(farm_id, entity_type, entity_id)
+        for attempt in range(1, FLUSH_RETRIES + 1):
+            try:
+                db.write_batch(movements, photos["animal"], photos["person"])
+                break
+            except Exception as e:
+                if attempt == FLUSH_RETRIES:
+                    self._count("errors")
+                    self._count("lost", len(movements) + len(photos["animal"]) + len(photos["person"]))
+                    print(f"[DbWriter] Lote de {len(ops)} operações perdido: {e}")
+                    for m in movements:
+                        # farm_id, entity_type, entity_id, entity_name, event_type, source, notes, detected_at
+                        print(f"[DbWriter] Movimento perdido: farm={m[0]} {m[1]}={m[2]} ({m[3]}) "
+                              f"{m[4]} source={m[5]} at={m[7]}")
+                    for et, rows in photos.items():
+                        for path, entity_id in rows:
+                            print(f"[DbWriter] Foto não vinculada: {et}={entity_id} path={path}")
+                    for farm_id, et, entity_id in linked:
+                        self._notify_photo_failed(farm_id, et, entity_id)
+                    return
+                time.sleep(RETRY_DELAY * attempt)
+        with self._stats_lock:
+            self._stats["written"] += len(ops)
+            self._stats["flushes"] += 1
+            self._stats["last_batch"] = len(ops)
+            self._stats["last_flush_ms"] = round((time.perf_counter() - t0) * 1000, 2)
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Espera tudo o que já foi enfileirado ser gravado. False se o timeout expirar."""
+        with self._idle:
+            return self._idle.wait_for(lambda: self._pending <= 0, timeout)
+
+    def close(self, timeout: float = 10.0) -> None:
+        """Grava o que resta na fila e encerra a thread; novas operações passam a ser descartadas."""
+        self._closed.set()
+        if self._thread is None:
+            return
+        if not self.flush(timeout):
+            print(f"[DbWriter] Encerrando com {self._queue.qsize()} operações não gravadas.")
+        self._thread.join(timeout=1.0)
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            out = dict(self._stats)
+        out.update({
+            "queue_depth": self._queue.qsize(),
+            "queue_size":  self._queue.maxsize,
+            "flush_ms":    self.flush_interval * 1000,
+            "batch_size":  self.batch,
+            "closed":      self._closed.is_set(),
+        })
+        return out
+
+
+_writer: DbWriter | None = None
+_writer_lock = threading.Lock()
+
+
+def get_writer() -> DbWriter:
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = DbWriter()
+    return _writer
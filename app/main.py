@@ -14,9 +14,11 @@ from fastapi.responses import FileResponse
 from fastapi.staticfiles import StaticFiles
 
 import app.db.database as db
-from app.api import auth, animals, people, vaccines, movements, camera, cameras, dashboard, financials, users
-from app.api.camera import set_main_loop, start_worker
+from app.api import (auth, animals, people, vaccines, movements, camera, cameras, dashboard, financials,
+                     ingest, metrics, users)
+from app.api.camera import set_main_loop, start_worker, stop_all_workers
 from app.core.config import BASE_DIR, PHOTOS_DIR
+from app.db.writer import get_writer
 
 FRONTEND_DIST = BASE_DIR / "frontend" / "dist"
 
@@ -43,9 +45,11 @@ app.include_router(vaccines.router)
 app.include_router(movements.router)
 app.include_router(camera.router)
 app.include_router(cameras.router)
+app.include_router(ingest.router)
 app.include_router(dashboard.router)
 app.include_router(financials.router)
 app.include_router(users.router)
+app.include_router(metrics.router)
 
 # Serve fotos estáticas (crops salvos pela câmera)
 PHOTOS_DIR.mkdir(exist_ok=True)
@@ -75,13 +79,24 @@ async def startup():
     cam_list = db.list_cameras()
     for cam in cam_list:
         if cam["is_active"] and cam.get("farm_id"):
-            start_worker(cam["id"], cam["source_url"], cam["name"], cam["farm_id"])
+            start_worker(cam["id"], cam["source_url"], cam["name"], cam["farm_id"],
+                         motion_threshold=cam["motion_threshold"],
+                         detect_source_url=cam["detect_source_url"],
+                         detect_max_side=cam["detect_max_side"])
             print(f"[Startup] Câmera iniciada: {cam['name']} (farm={cam['farm_id']})")
 
     print("[Startup] Cattle AI Web pronto em http://localhost:8000")
     print("[Startup] Documentação: http://localhost:8000/docs")
 
 
+@app.on_event("shutdown")
+def shutdown():
+    """Para as câmeras e grava o que restou na fila do DbWriter."""
+    stop_all_workers()
+    get_writer().close()
+    print("[Shutdown] Câmeras paradas e fila de gravação esvaziada.")
+
+
 @app.get("/api/health")
 def health():
     return {"status": "ok", "service": "Cattle AI"}
@@ -0,0 +1,99 @@
+"""
+benchmarks/bench_ann.py — Busca exata x índice IVF no DualIdentifier.
+
+Gera bancos sintéticos (vetores 1280-dim agrupados por "raça", L2-normalizados),
+carrega 95% via load e adiciona os 5% restantes incrementalmente (caminho do
+auto-cadastro). As consultas são re-observações ruidosas de vetores do banco.
+
+Mede latência por consulta (média e p95) e recall@1 do IVF em relação à
+busca exata, para cada nprobe informado.
+
+Uso:
+  python benchmarks/bench_ann.py
+  python benchmarks/bench_ann.py --sizes 1000 10000 100000 --nprobe 4 8 16 --rerank-k 16
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from app.ai.ann import IVFIndex  # noqa: E402
+from app.ai.identifier import EmbeddingBank  # noqa: E402
+
+DIM = 1280
+
+
+def _normalize(x: np.ndarray) -> np.ndarray:
+    return (x / np.linalg.norm(x, axis=-1, keepdims=True)).astype(np.float32)
+
+
+def make_bank_data(n: int, rng: np.random.Generator, clusters: int = 64) -> np.ndarray:
+    centers = _normalize(rng.standard_normal((clusters, DIM)))
+    labels = rng.integers(0, clusters, n)
+    return _normalize(centers[labels] + 0.9 * rng.standard_normal((n, DIM)) / np.sqrt(DIM))
+
+
+def make_queries(data: np.ndarray, q: int, rng: np.random.Generator) -> np.ndarray:
+    rows = rng.integers(0, len(data), q)
+    return _normalize(data[rows] + 0.3 * rng.standard_normal((q, DIM)) / np.sqrt(DIM))
+
+
+def build(data: np.ndarray, index) -> tuple[EmbeddingBank, float]:
+    split = int(len(data) * 0.95)
+    bank = EmbeddingBank(index=index)
+    t0 = time.perf_counter()
+    bank.load([{"id": i, "name": f"a{i}", "embedding": data[i]} for i in range(split)])
+    for i in range(split, len(data)):
+        bank.add(i, f"a{i}", data[i])
+    return bank, time.perf_counter() - t0
+
+
+def run_queries(bank: EmbeddingBank, queries: np.ndarray) -> tuple[list, np.ndarray]:
+    ids, times = [], np.empty(len(queries))
+    for i, q in enumerate(queries):
+        t0 = time.perf_counter()
+        hit = bank.search(q)
+        times[i] = time.perf_counter() - t0
+        ids.append(hit[0])
+    return ids, times
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark busca exata x IVF")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[4, 8, 16])
+    parser.add_argument("--rerank-k", type=int, default=0)
+    parser.add_argument("--storage", default="float32", choices=["float32", "float16"])
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    print(f"{'N':>8} {'modo':<14} {'build s':>8} {'média ms':>9} {'p95 ms':>8} {'recall@1':>9}")
+    print("-" * 62)
+    for n in args.sizes:
+        data = make_bank_data(n, rng)
+        queries = make_queries(data, args.queries, rng)
+
+        exact_bank, t_build = build(data, None)
+        truth, times = run_queries(exact_bank, queries)
+        print(f"{n:>8} {'exact':<14} {t_build:>8.2f} {times.mean()*1e3:>9.3f} "
+              f"{np.percentile(times, 95)*1e3:>8.3f} {1.0:>9.3f}")
+
+        for nprobe in args.nprobe:
+            index = IVFIndex(nprobe=nprobe, rerank_k=args.rerank_k,
+                             min_train=min(2048, n), storage=args.storage)
+            bank, t_build = build(data, index)
+            ids, times = run_queries(bank, queries)
+            recall = float(np.mean([a == b for a, b in zip(ids, truth)]))
+            label = f"ivf p={nprobe}/{index.nlist}"
+            print(f"{n:>8} {label:<14} {t_build:>8.2f} {times.mean()*1e3:>9.3f} "
+                  f"{np.percentile(times, 95)*1e3:>8.3f} {recall:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+benchmarks/bench_db_contention.py — Leituras do dashboard sob escrita das câmeras.
+
+Threads "câmera" gravam movimentações (add_movement) sem parar enquanto
+threads "API" leem get_dashboard_stats e list_movements. Mede a latência
+das leituras (p50/p95/p99/máx), leituras acima de --slow-ms, erros de lock
+e a vazão de escrita, em dois modos sobre cópias do mesmo banco sintético:
+
+  legacy — como era antes: uma conexão nova por chamada, journal de rollback
+           (DELETE) e pragmas padrão
+  pooled — conexões por thread do app (WAL, synchronous=NORMAL, cache,
+           mmap, busy_timeout e leitores query_only)
+
+A referência sem contenção é a mesma execução com --writers 0.
+
+Uso:
+  python benchmarks/bench_db_contention.py
+  python benchmarks/bench_db_contention.py --writers 0
+  python benchmarks/bench_db_contention.py --rows 1000000 --writers 8 --readers 4 --seconds 20
+"""
+
+import argparse
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from suite import build_db  # noqa: E402
+
+
+def _legacy_conn(path: str):
+    def get_conn() -> sqlite3.Connection:
+        conn = sqlite3.connect(path)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA foreign_keys = ON")
+        return conn
+    return get_conn
+
+
+def run_mode(db, mode: str, path: Path, args) -> dict:
+    db.DB_PATH = str(path)
+    if mode == "legacy":
+        with sqlite3.connect(path) as conn:
+            conn.execute("PRAGMA journal_mode = DELETE")
+        original = db.get_conn, db.get_read_conn
+        db.get_conn = db.get_read_conn = _legacy_conn(str(path))
+    stop = threading.Event()
+    reads: list[float] = []
+    writes: list[float] = []
+    errors = {"read": 0, "write": 0}
+    lock = threading.Lock()
+
+    def writer(cam: int) -> None:
+        local = []
+        while not stop.is_set():
+            t0 = time.perf_counter()
+            try:
+                db.add_movement("animal", cam, f"Boi_{cam}", "entry", source=f"camera_{cam}", farm_id=1)
+                local.append(time.perf_counter() - t0)
+            except sqlite3.OperationalError:
+                with lock:
+                    errors["write"] += 1
+            if args.write_interval:
+                time.sleep(args.write_interval)
+        with lock:
+            writes.extend(local)
+
+    def reader(i: int) -> None:
+        local = []
+        while not stop.is_set():
+            t0 = time.perf_counter()
+            try:
+                if i % 2 == 0:
+                    db.get_dashboard_stats(farm_id=1)
+                else:
+                    db.list_movements(farm_id=1)
+                local.append(time.perf_counter() - t0)
+            except sqlite3.OperationalError:
+                with lock:
+                    errors["read"] += 1
+        with lock:
+            reads.extend(local)
+
+    threads = ([threading.Thread(target=writer, args=(c + 1,)) for c in range(args.writers)]
+               + [threading.Thread(target=reader, args=(r,)) for r in range(args.readers)])
+    try:
+        for t in threads:
+            t.start()
+        time.sleep(args.seconds)
+        stop.set()
+        for t in threads:
+            t.join()
+    finally:
+        if mode == "legacy":
+            db.get_conn, db.get_read_conn = original
+
+    r = np.array(reads) * 1e3 if reads else np.zeros(1)
+    w = np.array(writes) * 1e3 if writes else np.zeros(1)
+    return {
+        "mode":        mode,
+        "reads":       len(reads),
+        "read_p50":    float(np.percentile(r, 50)),
+        "read_p95":    float(np.percentile(r, 95)),
+        "read_p99":    float(np.percentile(r, 99)),
+        "read_max":    float(r.max()),
+        "slow_reads":  int((r > args.slow_ms).sum()),
+        "writes_s":    len(writes) / args.seconds,
+        "write_p99":   float(np.percentile(w, 99)),
+        "read_errors": errors["read"],
+        "write_errors": errors["write"],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Leituras do dashboard x escritas das câmeras no SQLite")
+    parser.add_argument("--rows", type=int, default=100_000, help="movimentações no banco sintético")
+    parser.add_argument("--writers", type=int, default=4, help="threads de câmera gravando")
+    parser.add_argument("--readers", type=int, default=2, help="threads de API lendo")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--write-interval", type=float, default=0.01,
+                        help="pausa (s) entre escritas de cada câmera (0 = sem pausa)")
+    parser.add_argument("--slow-ms", type=float, default=100.0)
+    parser.add_argument("--modes", nargs="+", choices=["legacy", "pooled"], default=["legacy", "pooled"])
+    parser.add_argument("--data-dir", type=Path, default=Path(tempfile.gettempdir()) / "cattle-bench")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    os.environ["DATA_DIR"] = str(args.data_dir)
+    import app.db.database as db
+
+    args.data_dir.mkdir(parents=True, exist_ok=True)
+    base = args.data_dir / f"contention_{args.rows}_s{args.seed}.db"
+    if not base.with_suffix(".ok").exists():
+        for f in args.data_dir.glob(f"{base.name}*"):
+            f.unlink()
+        build_db(base, args.rows, args.seed)
+        db.close_thread_conns()
+        with sqlite3.connect(base) as conn:
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        base.with_suffix(".ok").touch()
+
+    print(f"{args.writers} escritores x {args.readers} leitores, {args.seconds:.0f}s, {args.rows} movimentações\n")
+    print(f"{'modo':<8} {'leituras':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'máx ms':>8} "
+          f"{'lentas':>7} {'escr/s':>8} {'escr p99':>9} {'erros L/E':>10}")
+    print("-" * 96)
+    with tempfile.TemporaryDirectory(dir=args.data_dir) as tmp:
+        for mode in args.modes:
+            path = Path(tmp) / f"{mode}.db"
+            shutil.copyfile(base, path)
+            r = run_mode(db, mode, path, args)
+            db.close_thread_conns()
+            print(f"{r['mode']:<8} {r['reads']:>8} {r['read_p50']:>8.2f} {r['read_p95']:>8.2f} "
+                  f"{r['read_p99']:>8.2f} {r['read_max']:>8.1f} {r['slow_reads']:>7} {r['writes_s']:>8.0f} "
+                  f"{r['write_p99']:>9.2f} {r['read_errors']:>5}/{r['write_errors']:<4}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,20 @@
+"""
+benchmarks/check_query_plans.py — Atalho para a guarda dos planos de consulta.
+
+Os casos e as verificações ficam em tests/test_query_plans.py (pytest);
+este script só roda esse arquivo, com os mesmos argumentos extras do pytest.
+
+Uso:
+  python benchmarks/check_query_plans.py
+  python benchmarks/check_query_plans.py -v
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+TESTS = Path(__file__).resolve().parent.parent / "tests" / "test_query_plans.py"
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([str(TESTS), "-q", *sys.argv[1:]]))
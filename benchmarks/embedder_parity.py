@@ -0,0 +1,81 @@
+"""
+benchmarks/embedder_parity.py — Paridade entre backends do CattleEmbedder.
+
+Extrai embeddings do mesmo conjunto de crops com o backend torch (referência)
+e com o backend alternativo (onnx ou onnx-int8) e reporta a concordância por
+cosine similarity (média, mínima, p5) e o tempo por crop de cada backend.
+
+Usa as fotos de photos/ (crops salvos pela câmera) quando existirem;
+caso contrário, gera crops sintéticos.
+
+Uso:
+  python benchmarks/embedder_parity.py --backend onnx
+  python benchmarks/embedder_parity.py --backend onnx-int8 --photos /data/photos --limit 200
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from embedder import CattleEmbedder  # noqa: E402
+
+
+def load_crops(photos_dir: Path, limit: int, seed: int) -> list[np.ndarray]:
+    crops = []
+    if photos_dir.is_dir():
+        for path in sorted(photos_dir.glob("*.jpg"))[:limit]:
+            img = cv2.imread(str(path))
+            if img is not None and min(img.shape[:2]) >= 20:
+                crops.append(img)
+    if crops:
+        return crops
+    print(f"[Parity] Nenhuma foto em {photos_dir} — usando {limit} crops sintéticos.")
+    rng = np.random.default_rng(seed)
+    for _ in range(limit):
+        h, w = rng.integers(60, 400, size=2)
+        img = cv2.GaussianBlur(rng.integers(0, 256, (h, w, 3), dtype=np.uint8), (0, 0), 3)
+        crops.append(img)
+    return crops
+
+
+def timed_extract(embedder: CattleEmbedder, crops: list[np.ndarray]) -> tuple[np.ndarray, float]:
+    embedder.extract_batch(crops[:2])  # aquecimento
+    t0 = time.perf_counter()
+    embs = embedder.extract_batch(crops)
+    return embs, (time.perf_counter() - t0) / len(crops)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Paridade torch x ONNX do CattleEmbedder")
+    parser.add_argument("--backend", default="onnx", choices=["onnx", "onnx-int8"])
+    parser.add_argument("--photos", default="photos")
+    parser.add_argument("--model-dir", default="models")
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    crops = load_crops(Path(args.photos), args.limit, args.seed)
+    ref = CattleEmbedder(device="cpu", backend="torch")
+    alt = CattleEmbedder(device="cpu", backend=args.backend, model_dir=args.model_dir)
+    if alt.backend != args.backend:
+        sys.exit(f"[Parity] Backend {args.backend} indisponível.")
+
+    ref_embs, ref_t = timed_extract(ref, crops)
+    alt_embs, alt_t = timed_extract(alt, crops)
+    cos = np.sum(ref_embs * alt_embs, axis=1)
+
+    print(f"Crops:               {len(crops)}")
+    print(f"Cosine média:        {cos.mean():.5f}")
+    print(f"Cosine mínima:       {cos.min():.5f}")
+    print(f"Cosine p5:           {np.percentile(cos, 5):.5f}")
+    print(f"torch ms/crop:       {ref_t * 1e3:.2f}")
+    print(f"{args.backend} ms/crop: {alt_t * 1e3:.2f}  ({ref_t / alt_t:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
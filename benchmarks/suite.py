@@ -0,0 +1,387 @@
+"""
+benchmarks/suite.py — Micro-benchmarks dos caminhos quentes, com saída JSON.
+
+Grupos (nenhum precisa de rede nem de GPU):
+  identifier — DualIdentifier.identify, max_similarity/_is_duplicate e load
+               em bancos sintéticos de vários tamanhos
+  embedder   — pré-processamento do CattleEmbedder (resize_center_crop,
+               _preprocess em lote e o transform PIL de referência); não
+               carrega pesos, mas precisa de torch/torchvision importáveis
+  db         — add_movement, list_movements, get_dashboard_stats e
+               load_all_animals_with_embeddings em bancos SQLite sintéticos
+               (N linhas de movimentações, com animais, pessoas, vacinas e
+               lançamentos proporcionais). Os bancos ficam em --data-dir e são
+               reaproveitados entre execuções.
+
+Cada caso é calibrado para que uma repetição dure ao menos --min-time e é
+repetido --repeat vezes; o JSON guarda min/mediana/média/desvio por chamada.
+O comando compare confronta dois JSONs e sai com código 1 se algum caso
+ficou mais lento que o limite.
+
+Uso:
+  python benchmarks/suite.py run --out base.json
+  python benchmarks/suite.py run --groups db --db-rows 10000 100000 1000000 --out new.json
+  python benchmarks/suite.py compare base.json new.json --threshold 0.10
+"""
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+DIM = 1280
+GROUPS = ("identifier", "embedder", "db")
+BENCH_FARMS = 4          # movimentações distribuídas entre as fazendas; os casos consultam a fazenda 1
+GEN_CHUNK = 100_000      # linhas por executemany na geração dos bancos
+
+
+# ---------------------------------------------------------------------------
+# Medição
+# ---------------------------------------------------------------------------
+
+def _run(fn, number: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(number):
+        fn()
+    return time.perf_counter() - t0
+
+
+def measure(fn, repeat: int, min_time: float) -> dict:
+    """Tempo por chamada de fn() (segundos): calibra o nº de chamadas por repetição."""
+    fn()  # aquecimento
+    number = 1
+    while True:
+        t = _run(fn, number)
+        if t >= min_time or number >= 1 << 20:
+            break
+        number = max(number * 2, int(number * min_time / max(t, 1e-9) * 1.1))
+    samples = [t / number] + [_run(fn, number) / number for _ in range(max(1, repeat) - 1)]
+    return {
+        "unit":       "s",
+        "number":     number,
+        "repeat":     len(samples),
+        "min":        min(samples),
+        "median":     statistics.median(samples),
+        "mean":       statistics.fmean(samples),
+        "stdev":      statistics.stdev(samples) if len(samples) > 1 else 0.0,
+    }
+
+
+def _normalize(x: np.ndarray) -> np.ndarray:
+    return (x / np.linalg.norm(x, axis=-1, keepdims=True)).astype(np.float32)
+
+
+# ---------------------------------------------------------------------------
+# Grupo: identifier
+# ---------------------------------------------------------------------------
+
+def bench_identifier(args, rng: np.random.Generator):
+    from app.ai.identifier import DualIdentifier
+
+    try:
+        from app.api.camera import _is_duplicate
+    except ImportError as e:   # app.api.camera puxa ultralytics/torch
+        print(f"[Bench] _is_duplicate indisponível ({e}) — medindo só max_similarity.")
+        _is_duplicate = None
+
+    for n in args.bank_sizes:
+        data = _normalize(rng.standard_normal((n, DIM)))
+        records = [{"id": i, "name": f"a{i}", "description": "", "embedding": data[i]} for i in range(n)]
+        # Metade das consultas são re-observações ruidosas (conhecidos), metade vetores novos
+        known = _normalize(data[rng.integers(0, n, 64)] + 0.02 * rng.standard_normal((64, DIM)))
+        queries = itertools.cycle(np.concatenate([known, _normalize(rng.standard_normal((64, DIM)))]))
+
+        ident = DualIdentifier()
+        yield f"identifier.load[n={n}]", {"n": n}, lambda: ident.load_animals(records)
+        yield f"identifier.identify[n={n}]", {"n": n}, lambda: ident.identify(next(queries), "animal")
+        yield f"identifier.max_similarity[n={n}]", {"n": n}, \
+            lambda: ident.max_similarity(next(queries), "animal")
+        if _is_duplicate is not None:
+            yield f"identifier.is_duplicate[n={n}]", {"n": n}, \
+                lambda: _is_duplicate(next(queries), "animal", ident)
+
+
+# ---------------------------------------------------------------------------
+# Grupo: embedder
+# ---------------------------------------------------------------------------
+
+def _synthetic_crops(rng: np.random.Generator, count: int) -> list[np.ndarray]:
+    # Tamanhos típicos de bounding boxes (frames de 720p a 1080p), em retrato e paisagem
+    shapes = [(180, 240), (320, 260), (420, 610), (560, 720), (96, 140), (700, 380)]
+    crops = []
+    for i in range(count):
+        h, w = shapes[i % len(shapes)]
+        crops.append(rng.integers(0, 256, (h, w, 3), dtype=np.uint8))
+    return crops
+
+
+def bench_embedder(args, rng: np.random.Generator):
+    import cv2
+    from PIL import Image
+
+    from embedder import CROP_SIZE, CattleEmbedder, resize_center_crop
+
+    # Só o pré-processamento: instância sem modelo (nenhum peso é baixado)
+    emb = CattleEmbedder.__new__(CattleEmbedder)
+    emb.max_batch_size = max(args.embed_batches)
+    emb._init_buffers()
+    emb._build_transform()
+
+    crops = _synthetic_crops(rng, emb.max_batch_size)
+    out = np.empty((CROP_SIZE, CROP_SIZE, 3), dtype=np.uint8)
+    for h, w in sorted({c.shape[:2] for c in crops}):
+        crop = next(c for c in crops if c.shape[:2] == (h, w))
+        yield f"embedder.resize_center_crop[{h}x{w}]", {"shape": [h, w]}, \
+            lambda crop=crop: resize_center_crop(crop, out)
+    for b in args.embed_batches:
+        yield f"embedder.preprocess[batch={b}]", {"batch": b}, lambda b=b: emb._preprocess(crops[:b])
+
+    pil = [Image.fromarray(cv2.cvtColor(c, cv2.COLOR_BGR2RGB)) for c in crops]
+    pil_iter = itertools.cycle(pil)
+    yield "embedder.transform_pil[batch=1]", {"batch": 1}, lambda: emb.transform(next(pil_iter))
+
+
+# ---------------------------------------------------------------------------
+# Grupo: db
+# ---------------------------------------------------------------------------
+
+def _timestamps(rng: np.random.Generator, n: int, days: int, now: datetime) -> list[str]:
+    offsets = rng.integers(0, days * 86400, n)
+    return [(now - timedelta(seconds=int(s))).strftime("%Y-%m-%d %H:%M:%S") for s in offsets]
+
+
+def build_db(path: Path, rows: int, seed: int) -> None:
+    """Banco sintético: `rows` movimentações e demais tabelas proporcionais."""
+    import app.db.database as db
+
+    rng = np.random.default_rng(seed)
+    now = datetime.now()
+    n_animals = max(50, rows // 100)
+    n_people = max(10, n_animals // 10)
+    print(f"[Bench] Gerando {path.name}: {rows} movimentações, {n_animals} animais, {n_people} pessoas...")
+    t0 = time.perf_counter()
+
+    db.DB_PATH = str(path)
+    db.init_db()
+    conn = sqlite3.connect(path)   # conexão própria para a carga em massa, fora do pool do app
+    conn.execute("PRAGMA synchronous = OFF")
+    with conn:
+        conn.executemany("INSERT INTO farms (id, name) VALUES (?, ?)",
+                         [(f, f"Fazenda {f}") for f in range(1, BENCH_FARMS + 1)])
+        conn.executemany(
+            "INSERT INTO users (farm_id, name, email, password_hash, role) VALUES (?,?,?,?,?)",
+            [(f, f"user{f}", f"user{f}@bench", "x", "admin") for f in range(1, BENCH_FARMS + 1)],
+        )
+        statuses = np.array(["active"] * 8 + ["sold", "slaughtered"])
+        for table, count in (("cattle", n_animals), ("people", n_people)):
+            for start in range(0, count, GEN_CHUNK // 10):
+                n = min(GEN_CHUNK // 10, count - start)
+                embs = _normalize(rng.standard_normal((n, DIM)))
+                farms = rng.integers(1, BENCH_FARMS + 1, n)
+                if table == "cattle":
+                    st = rng.choice(statuses, n)
+                    conn.executemany(
+                        "INSERT INTO cattle (farm_id, name, description, status, embedding_blob) VALUES (?,?,?,?,?)",
+                        [(int(farms[i]), f"Boi_{start + i}", "", str(st[i]), embs[i].tobytes()) for i in range(n)],
+                    )
+                else:
+                    conn.executemany(
+                        "INSERT INTO people (farm_id, name, description, embedding_blob) VALUES (?,?,?,?)",
+                        [(int(farms[i]), f"Visitante_{start + i}", "", embs[i].tobytes()) for i in range(n)],
+                    )
+        conn.executemany(
+            "INSERT INTO vaccines (animal_id, vaccine_name, applied_at, next_due) VALUES (?,?,?,?)",
+            [(i + 1, "Aftosa", a[:10], (now + timedelta(days=int(d))).strftime("%Y-%m-%d"))
+             for i, (a, d) in enumerate(zip(_timestamps(rng, n_animals, 180, now),
+                                             rng.integers(-60, 60, n_animals)))],
+        )
+        for start in range(0, rows, GEN_CHUNK):
+            n = min(GEN_CHUNK, rows - start)
+            farms = rng.integers(1, BENCH_FARMS + 1, n)
+            is_person = rng.random(n) < 0.15
+            ids = np.where(is_person, rng.integers(1, n_people + 1, n), rng.integers(1, n_animals + 1, n))
+            exits = rng.random(n) < 0.5
+            conn.executemany(
+                "INSERT INTO movements (farm_id, entity_type, entity_id, entity_name, event_type, source, "
+                "detected_at) VALUES (?,?,?,?,?,?,?)",
+                [(int(farms[i]), "person" if is_person[i] else "animal", int(ids[i]), f"e{ids[i]}",
+                  "exit" if exits[i] else "entry", f"camera_{farms[i]}", ts)
+                 for i, ts in enumerate(_timestamps(rng, n, 90, now))],
+            )
+        n_fin = max(100, rows // 10)
+        farms = rng.integers(1, BENCH_FARMS + 1, n_fin)
+        income = rng.random(n_fin) < 0.3
+        cats = rng.choice(np.array(["ração", "vacina", "mão de obra", "manutenção", "venda"]), n_fin)
+        amounts = rng.uniform(10, 5000, n_fin).round(2)
+        conn.executemany(
+            "INSERT INTO financials (farm_id, type, category, amount, occurred_at) VALUES (?,?,?,?,?)",
+            [(int(farms[i]), "income" if income[i] else "expense", str(cats[i]), float(amounts[i]), ts)
+             for i, ts in enumerate(_timestamps(rng, n_fin, 365, now))],
+        )
+    conn.close()
+    print(f"[Bench] {path.name} pronto em {time.perf_counter() - t0:.1f}s")
+
+
+def bench_db(args, rng: np.random.Generator):
+    import app.db.database as db
+
+    args.data_dir.mkdir(parents=True, exist_ok=True)
+    for rows in args.db_rows:
+        path = args.data_dir / f"bench_{rows}_s{args.seed}.db"
+        done = path.with_suffix(".ok")   # marca geração completa (uma geração interrompida é refeita)
+        if not done.exists():
+            for f in args.data_dir.glob(f"{path.name}*"):
+                f.unlink()
+            build_db(path, rows, args.seed)
+            done.touch()
+        db.DB_PATH = str(path)
+        db.init_db()   # aplica migrações/índices novos a bancos gerados por versões antigas
+
+        with db.get_conn() as conn:
+            last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM movements").fetchone()[0]
+        try:
+            yield f"db.add_movement[rows={rows}]", {"rows": rows}, \
+                lambda: db.add_movement("animal", 1, "Boi_0", "entry", source="bench", farm_id=1)
+        finally:
+            with db.get_conn() as conn:
+                conn.execute("DELETE FROM movements WHERE id > ?", (last_id,))
+        yield f"db.list_movements[rows={rows}]", {"rows": rows}, lambda: db.list_movements(farm_id=1)
+        yield f"db.list_movements_by_type[rows={rows}]", {"rows": rows}, \
+            lambda: db.list_movements(entity_type="person", farm_id=1)
+        yield f"db.get_dashboard_stats[rows={rows}]", {"rows": rows}, lambda: db.get_dashboard_stats(farm_id=1)
+        yield f"db.load_all_animals_with_embeddings[rows={rows}]", {"rows": rows}, \
+            lambda: db.load_all_animals_with_embeddings(farm_id=1)
+
+
+# ---------------------------------------------------------------------------
+# Execução e comparação
+# ---------------------------------------------------------------------------
+
+_BENCHES = {"identifier": bench_identifier, "embedder": bench_embedder, "db": bench_db}
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, timeout=10).stdout.strip()
+    except Exception:
+        return ""
+
+
+def _fmt(seconds: float) -> str:
+    for unit, scale in (("s", 1.0), ("ms", 1e-3), ("µs", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.3f} {unit}"
+    return f"{seconds / 1e-9:.1f} ns"
+
+
+def cmd_run(args) -> int:
+    results, skipped = {}, {}
+    for group in args.groups:
+        rng = np.random.default_rng(args.seed)
+        try:
+            for name, params, fn in _BENCHES[group](args, rng):
+                if args.filter and not any(f in name for f in args.filter):
+                    continue
+                r = measure(fn, args.repeat, args.min_time)
+                results[name] = {"group": group, "params": params, **r}
+                print(f"{name:<52} {_fmt(r['median']):>12}  (±{_fmt(r['stdev'])}, {r['number']}x{r['repeat']})")
+        except ImportError as e:
+            skipped[group] = str(e)
+            print(f"[Bench] Grupo {group} ignorado: {e}")
+
+    report = {
+        "meta": {
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "commit":     _git_commit(),
+            "python":     platform.python_version(),
+            "numpy":      np.__version__,
+            "platform":   platform.platform(),
+            "machine":    platform.machine(),
+            "cpus":       os.cpu_count(),
+            "args":       {k: (str(v) if isinstance(v, Path) else v)
+                           for k, v in vars(args).items() if k != "func"},
+        },
+        "results": results,
+        "skipped": skipped,
+    }
+    args.out.parent.mkdir(parents=True, exist_ok=True)
+    args.out.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+    print(f"[Bench] {len(results)} resultados em {args.out}")
+    return 0
+
+
+def cmd_compare(args) -> int:
+    base = json.loads(args.base.read_text())["results"]
+    new = json.loads(args.new.read_text())["results"]
+    regressions = 0
+    print(f"{'caso':<52} {'base':>12} {'novo':>12} {'variação':>9}")
+    print("-" * 90)
+    for name in sorted(base.keys() | new.keys()):
+        if name not in new:
+            print(f"{name:<52} {_fmt(base[name][args.metric]):>12} {'—':>12} {'':>9}  removido")
+            continue
+        if name not in base:
+            print(f"{name:<52} {'—':>12} {_fmt(new[name][args.metric]):>12} {'':>9}  novo")
+            continue
+        b, n = base[name][args.metric], new[name][args.metric]
+        change = n / b - 1 if b else 0.0
+        status = ""
+        if change > args.threshold:
+            status = "REGRESSÃO"
+            regressions += 1
+        elif change < -args.threshold:
+            status = "melhora"
+        print(f"{name:<52} {_fmt(b):>12} {_fmt(n):>12} {change:>+9.1%}  {status}")
+    print(f"\n{regressions} regressão(ões) acima de {args.threshold:.0%} ({args.metric})")
+    return 1 if regressions else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Micro-benchmarks do Cattle AI")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="executa os benchmarks e grava o JSON")
+    run.add_argument("--groups", nargs="+", choices=GROUPS, default=list(GROUPS))
+    run.add_argument("--filter", nargs="+", help="só casos cujo nome contém algum destes trechos")
+    run.add_argument("--out", type=Path,
+                     default=ROOT / "benchmarks" / "results" / f"{datetime.now():%Y%m%d_%H%M%S}.json")
+    run.add_argument("--bank-sizes", type=int, nargs="+", default=[100, 1_000, 10_000])
+    run.add_argument("--embed-batches", type=int, nargs="+", default=[1, 8, 32])
+    run.add_argument("--db-rows", type=int, nargs="+", default=[10_000, 100_000])
+    run.add_argument("--data-dir", type=Path, default=Path(tempfile.gettempdir()) / "cattle-bench")
+    run.add_argument("--repeat", type=int, default=7)
+    run.add_argument("--min-time", type=float, default=0.2, help="s mínimos por repetição")
+    run.add_argument("--seed", type=int, default=0)
+    run.set_defaults(func=cmd_run)
+
+    cmp_ = sub.add_parser("compare", help="compara dois JSONs e aponta regressões")
+    cmp_.add_argument("base", type=Path)
+    cmp_.add_argument("new", type=Path)
+    cmp_.add_argument("--threshold", type=float, default=0.10, help="variação relativa tolerada")
+    cmp_.add_argument("--metric", choices=["median", "min", "mean"], default="median")
+    cmp_.set_defaults(func=cmd_compare)
+
+    args = parser.parse_args()
+    if args.command == "run":
+        # Fotos/banco do app (init_db) ficam no diretório dos benchmarks, nunca nos dados reais
+        os.environ["DATA_DIR"] = str(args.data_dir)
+    sys.exit(args.func(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -60,12 +60,13 @@ class ClaudeAnalyzer:
     def available(self) -> bool:
         return self._client is not None
 
-    def analyze(self, crop_bgr: np.ndarray) -> dict:
+    def analyze(self, crop_bgr: np.ndarray, raise_errors: bool = False) -> dict:
         """
         Analisa um crop BGR e retorna dict com:
           { "description": str, "breed": str, "weight": float | None }
 
-        Retorna dict com strings vazias em caso de falha.
+        Retorna dict com strings vazias em caso de falha, ou propaga a
+        exceção se raise_errors=True (usado pela fila com retry).
         """
         empty = {"description": "", "breed": "", "weight": None}
         if self._client is None:
@@ -105,6 +106,8 @@ class ClaudeAnalyzer:
             return self._parse_response(raw)
 
         except Exception as e:
+            if raise_errors:
+                raise
             print(f"[ClaudeAnalyzer] Falha na API: {e}")
             return empty
 
@@ -5,6 +5,10 @@ Remove o classificador e usa a saída do avgpool (1280-dim) como
 vetor de features L2-normalizado para comparação por cosine similarity.
 """
 
+import threading
+from pathlib import Path
+
+import cv2
 import numpy as np
 import torch
 import torch.nn as nn
@@ -13,6 +17,36 @@ from torchvision import models, transforms
 from torchvision.models import EfficientNet_B0_Weights
 
 EMBEDDING_DIM = 1280  # Dimensão de saída do avgpool do EfficientNet-B0
+DEFAULT_MAX_BATCH = 32  # Máximo de crops por forward pass em extract_batch()
+BACKENDS = ("torch", "onnx", "onnx-int8")
+ONNX_FP32_NAME = "efficientnet_b0_headless.onnx"
+ONNX_INT8_NAME = "efficientnet_b0_headless.int8.onnx"
+
+RESIZE_SHORT = 256
+CROP_SIZE = 224
+IMAGENET_MEAN = np.array([0.485, 0.456, 0.406], dtype=np.float32)
+IMAGENET_STD = np.array([0.229, 0.224, 0.225], dtype=np.float32)
+
+
+def resize_center_crop(bgr: np.ndarray, out: np.ndarray) -> None:
+    """
+    Resize do lado menor para 256 + center crop 224, direto no ndarray BGR.
+
+    Mesmo tamanho de saída e mesmo arredondamento do Resize/CenterCrop do
+    torchvision. Reduções usam INTER_AREA (mais próximo do BICUBIC com
+    antialias do PIL); ampliações usam INTER_CUBIC. Escreve em `out`
+    (224, 224, 3) uint8.
+    """
+    h, w = bgr.shape[:2]
+    if h <= w:
+        nh, nw = RESIZE_SHORT, int(RESIZE_SHORT * w / h)
+    else:
+        nh, nw = int(RESIZE_SHORT * h / w), RESIZE_SHORT
+    interp = cv2.INTER_AREA if min(h, w) > RESIZE_SHORT else cv2.INTER_CUBIC
+    resized = cv2.resize(bgr, (nw, nh), interpolation=interp)
+    top = int(round((nh - CROP_SIZE) / 2.0))
+    left = int(round((nw - CROP_SIZE) / 2.0))
+    out[:] = resized[top:top + CROP_SIZE, left:left + CROP_SIZE]
 
 
 class CattleEmbedder:
@@ -22,12 +56,57 @@ class CattleEmbedder:
 
     O modelo é carregado uma vez e mantido em modo eval.
     Usa GPU (CUDA) se disponível, caso contrário CPU.
+
+    extract_batch() processa vários crops em um único forward pass,
+    limitado a max_batch_size crops por tensor. O pré-processamento é feito
+    em cv2/NumPy sobre buffers pré-alocados, sem passar por PIL; a diferença
+    para o transform do torchvision (usado em extract()) fica em média
+    ~0.006 e no máximo ~0.05 por elemento do tensor normalizado.
+
+    Backends:
+      - "torch"     — PyTorch eager (padrão)
+      - "onnx"      — ONNX Runtime (CPU) com o modelo exportado para model_dir
+      - "onnx-int8" — idem, com quantização dinâmica INT8 dos pesos
+    O arquivo .onnx é exportado uma única vez e reaproveitado nos próximos
+    startups. Sem onnxruntime instalado, cai para "torch".
     """
 
-    def __init__(self, device: str | None = None):
+    def __init__(
+        self,
+        device: str | None = None,
+        max_batch_size: int = DEFAULT_MAX_BATCH,
+        backend: str = "torch",
+        model_dir: str | Path = "models",
+    ):
+        if backend not in BACKENDS:
+            raise ValueError(f"Backend inválido: {backend!r} (use {', '.join(BACKENDS)})")
         self.device = device or ("cuda" if torch.cuda.is_available() else "cpu")
-        self._build_model()
+        self.max_batch_size = max(1, max_batch_size)
+        self.backend = backend
+        self.model = None
+        self._session = None
+        if backend != "torch":
+            try:
+                self._build_onnx(Path(model_dir), quantize=(backend == "onnx-int8"))
+            except ImportError:
+                print(
+                    "[CattleEmbedder] Pacote 'onnxruntime' não instalado — usando backend torch. "
+                    "Execute: pip install onnxruntime onnx"
+                )
+                self.backend = "torch"
+        if self.backend == "torch":
+            self._build_model()
         self._build_transform()
+        self._init_buffers()
+
+    def _init_buffers(self) -> None:
+        # Buffers reutilizados por extract_batch() (BGR uint8 NHWC e float32 NCHW)
+        self._buf_lock = threading.Lock()
+        self._buf_u8 = np.empty((self.max_batch_size, CROP_SIZE, CROP_SIZE, 3), dtype=np.uint8)
+        self._buf_f32 = np.empty((self.max_batch_size, 3, CROP_SIZE, CROP_SIZE), dtype=np.float32)
+        # (x/255 - mean)/std == x*scale - shift, na ordem RGB
+        self._scale = (1.0 / (255.0 * IMAGENET_STD)).reshape(3, 1, 1)
+        self._shift = (IMAGENET_MEAN / IMAGENET_STD).reshape(3, 1, 1)
 
     def _build_model(self) -> None:
         weights = EfficientNet_B0_Weights.DEFAULT
@@ -39,18 +118,52 @@ class CattleEmbedder:
         self.model = base.to(self.device)
         self.model.eval()
 
+    def _build_onnx(self, model_dir: Path, quantize: bool) -> None:
+        import onnxruntime as ort
+
+        model_dir.mkdir(parents=True, exist_ok=True)
+        path = model_dir / ONNX_FP32_NAME
+        if not path.exists():
+            print(f"[CattleEmbedder] Exportando EfficientNet-B0 para ONNX: {path}")
+            self.device = "cpu"
+            self._build_model()
+            self._export_onnx(path)
+            self.model = None
+        if quantize:
+            fp32, path = path, model_dir / ONNX_INT8_NAME
+            if not path.exists():
+                from onnxruntime.quantization import QuantType, quantize_dynamic
+                print(f"[CattleEmbedder] Quantizando pesos para INT8: {path}")
+                tmp = path.with_suffix(".tmp.onnx")
+                quantize_dynamic(str(fp32), str(tmp), weight_type=QuantType.QInt8)
+                tmp.replace(path)
+        self._session = ort.InferenceSession(str(path), providers=["CPUExecutionProvider"])
+        self._input_name = self._session.get_inputs()[0].name
+        self.device = "cpu"
+
+    @torch.no_grad()
+    def _export_onnx(self, path: Path) -> None:
+        tmp = path.with_suffix(".tmp.onnx")
+        torch.onnx.export(
+            self.model,
+            torch.zeros(1, 3, 224, 224),
+            str(tmp),
+            input_names=["input"],
+            output_names=["embedding"],
+            dynamic_axes={"input": {0: "batch"}, "embedding": {0: "batch"}},
+            opset_version=17,
+        )
+        tmp.replace(path)
+
     def _build_transform(self) -> None:
         # Pré-processamento oficial do EfficientNet-B0 (ImageNet)
         self.transform = transforms.Compose([
             transforms.Resize(
                 256, interpolation=transforms.InterpolationMode.BICUBIC
             ),
-            transforms.CenterCrop(224),
+            transforms.CenterCrop(CROP_SIZE),
             transforms.ToTensor(),
-            transforms.Normalize(
-                mean=[0.485, 0.456, 0.406],
-                std=[0.229, 0.224, 0.225],
-            ),
+            transforms.Normalize(mean=IMAGENET_MEAN.tolist(), std=IMAGENET_STD.tolist()),
         ])
 
     @torch.no_grad()
@@ -61,20 +174,57 @@ class CattleEmbedder:
         Returns:
             Vetor float32 L2-normalizado de shape (1280,).
         """
-        tensor = self.transform(pil_image).unsqueeze(0).to(self.device)
-        features = self.model(tensor)  # (1, 1280)
-        vec = features.squeeze().cpu().numpy().astype(np.float32)
-        norm = np.linalg.norm(vec)
-        if norm > 1e-8:
-            vec = vec / norm
-        return vec
+        tensor = self.transform(pil_image).unsqueeze(0)
+        return self._forward(tensor.numpy())[0]
 
     def extract_from_bgr(self, bgr_crop: np.ndarray) -> np.ndarray:
         """
         Aceita crop BGR do OpenCV (HxWxC uint8).
-        Converte para PIL RGB e chama extract().
+        Atalho para extract_batch() com um único crop.
+        """
+        return self.extract_batch([bgr_crop])[0]
+
+    @torch.no_grad()
+    def extract_batch(self, bgr_crops: list[np.ndarray]) -> np.ndarray:
+        """
+        Extrai embeddings de vários crops BGR de uma vez.
+
+        Os crops são pré-processados e empilhados em tensores de até
+        max_batch_size imagens, cada um executado em um único forward pass.
+
+        Returns:
+            Matriz float32 (N, 1280) com uma linha L2-normalizada por crop,
+            na mesma ordem da entrada.
         """
-        import cv2
-        rgb = cv2.cvtColor(bgr_crop, cv2.COLOR_BGR2RGB)
-        pil = Image.fromarray(rgb)
-        return self.extract(pil)
+        if not bgr_crops:
+            return np.empty((0, EMBEDDING_DIM), dtype=np.float32)
+
+        out = np.empty((len(bgr_crops), EMBEDDING_DIM), dtype=np.float32)
+        with self._buf_lock:
+            for start in range(0, len(bgr_crops), self.max_batch_size):
+                chunk = bgr_crops[start:start + self.max_batch_size]
+                out[start:start + len(chunk)] = self._forward(self._preprocess(chunk))
+        return out
+
+    def _preprocess(self, bgr_crops: list[np.ndarray]) -> np.ndarray:
+        """Crops BGR → lote (B, 3, 224, 224) float32 normalizado (view do buffer)."""
+        n = len(bgr_crops)
+        u8, f32 = self._buf_u8[:n], self._buf_f32[:n]
+        for i, c in enumerate(bgr_crops):
+            resize_center_crop(c, u8[i])
+        # BGR→RGB e NHWC→NCHW numa única view, normalização sem temporários extras
+        np.multiply(u8[..., ::-1].transpose(0, 3, 1, 2), self._scale, out=f32)
+        f32 -= self._shift
+        return f32
+
+    def _forward(self, batch: np.ndarray) -> np.ndarray:
+        """Forward + normalização L2 por linha. Retorna (B, 1280) float32."""
+        if self._session is not None:
+            features = self._session.run(None, {self._input_name: batch})[0]
+            vecs = np.asarray(features, dtype=np.float32)
+        else:
+            features = self.model(torch.from_numpy(batch).to(self.device))  # (B, 1280)
+            vecs = features.cpu().numpy().astype(np.float32)
+        norms = np.linalg.norm(vecs, axis=1, keepdims=True)
+        np.divide(vecs, norms, out=vecs, where=norms > 1e-8)
+        return vecs
@@ -35,7 +35,8 @@ export default function Camera() {
     loadCameras()
 
     const protocol = window.location.protocol === 'https:' ? 'wss' : 'ws'
-    const ws = new WebSocket(`${protocol}://${window.location.host}/api/camera/events`)
+    const token = encodeURIComponent(localStorage.getItem('token') || '')
+    const ws = new WebSocket(`${protocol}://${window.location.host}/api/camera/events?token=${token}`)
     wsRef.current = ws
 
     ws.onopen = () => {
@@ -45,12 +46,24 @@ export default function Camera() {
       }, 20000)
       ws._ping = ping
     }
+    function handleEvent(ev) {
+      if (ev.event === 'auto_registered') {
+        setEvents(prev => [ev, ...prev].slice(0, 25))
+      } else if (ev.event === 'description_ready') {
+        // Descrição do Claude chega depois do cadastro
+        setEvents(prev => prev.map(p =>
+          p.entity_type === ev.entity_type && p.entity_id === ev.entity_id
+            ? { ...p, description: ev.description }
+            : p
+        ))
+      }
+    }
     ws.onmessage = e => {
       try {
-        const ev = JSON.parse(e.data)
-        if (ev.event === 'auto_registered') {
-          setEvents(prev => [ev, ...prev].slice(0, 25))
-        }
+        const msg = JSON.parse(e.data)
+        // Rajadas chegam agrupadas em uma única mensagem
+        if (msg.event === 'batch') msg.events.forEach(handleEvent)
+        else handleEvent(msg)
       } catch {}
     }
     ws.onerror  = () => setWsStatus('error')
@@ -72,6 +72,14 @@ Exemplos:
         "--db", default="cattle.db",
         help="Caminho do banco SQLite. Padrão: cattle.db",
     )
+    run_p.add_argument(
+        "--embed-batch", type=int, default=32,
+        help="Máximo de crops por forward pass do EfficientNet. Padrão: 32",
+    )
+    run_p.add_argument(
+        "--embed-backend", default="torch", choices=["torch", "onnx", "onnx-int8"],
+        help="Backend do EfficientNet (onnx/onnx-int8 requerem onnxruntime). Padrão: torch",
+    )
     run_p.add_argument(
         "--no-claude", action="store_true",
         help="Desabilitar geração de descrição via Claude API",
@@ -178,7 +186,7 @@ def run_registration(
         return False
 
     print("[CADASTRO] Extraindo embedding...")
-    embedding = embedder.extract_from_bgr(crop)
+    embedding = embedder.extract_batch([crop])[0]
 
     # Descrição via Claude
     description = ""
@@ -247,8 +255,8 @@ def run(args: argparse.Namespace) -> None:
     )
 
     print("[Init] Carregando EfficientNet-B0...")
-    embedder = CattleEmbedder()
-    print(f"[Init] Embedder no device: {embedder.device}")
+    embedder = CattleEmbedder(max_batch_size=args.embed_batch, backend=args.embed_backend)
+    print(f"[Init] Embedder no device: {embedder.device} (backend: {embedder.backend})")
 
     print("[Init] Conectando ao banco de dados...")
     db = CattleDatabase(args.db)
@@ -299,16 +307,18 @@ def run(args: argparse.Namespace) -> None:
 
         # Detecção + identificação
         detections = detector.detect(frame)
+        crops = [detector.crop(frame, det, padding=10) for det in detections]
+        valid = [i for i, c in enumerate(crops) if c.size > 0 and min(c.shape[:2]) >= 16]
+        # Um único forward pass para todos os crops válidos do frame
+        embeddings = dict(zip(valid, embedder.extract_batch([crops[i] for i in valid])))
         matches: list[IdentityMatch] = []
-        for det in detections:
-            crop = detector.crop(frame, det, padding=10)
-            if crop.size == 0 or min(crop.shape[:2]) < 16:
+        for i in range(len(detections)):
+            if i not in embeddings:
                 matches.append(
                     IdentityMatch(name=UNKNOWN_LABEL, similarity=0.0, is_known=False)
                 )
                 continue
-            emb = embedder.extract_from_bgr(crop)
-            matches.append(identifier.identify(emb))
+            matches.append(identifier.identify(embeddings[i]))
 
         # Guarda para uso no cadastro
         last_detections = detections
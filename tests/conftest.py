@@ -0,0 +1,25 @@
+"""
+tests/conftest.py — Fixtures comuns dos testes.
+
+Rodar (na raiz do projeto):
+  python -m pytest -q
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import app.db.database as db  # noqa: E402
+
+
+@pytest.fixture
+def fresh_db(tmp_path, monkeypatch):
+    """Banco SQLite novo (init_db) em tmp_path; as conexões da thread são fechadas no fim."""
+    monkeypatch.setattr(db, "DB_PATH", str(tmp_path / "cattle.db"))
+    monkeypatch.setattr(db, "PHOTOS_DIR", tmp_path / "photos")
+    db.init_db()
+    yield db
+    db.close_thread_conns()
@@ -0,0 +1,91 @@
+"""
+tests/test_query_plans.py — Guarda dos planos de consulta do SQLite.
+
+Chama as funções de leitura do app.db.database por fazenda, captura o SQL
+realmente executado (trace callback, com os parâmetros já expandidos) e
+confere o EXPLAIN QUERY PLAN de cada comando:
+
+  - nenhuma tabela (nem índice) lida por SCAN completo
+  - cada caso usa os índices esperados (ex.: idx_movements_farm_time;
+    "tabela.pk" = busca pela chave primária, como nos resumos do dashboard)
+  - listagens com LIMIT não ordenam em TEMP B-TREE
+"""
+
+import re
+
+import pytest
+
+FARM = 1
+# SCAN = leitura da tabela (ou do índice) inteira; SEARCH = busca por faixa do índice
+_FULL_SCAN = re.compile(r"^SCAN (?!CONSTANT ROW)")
+
+# nome → (chamada, índices que devem aparecer no plano, proíbe ordenação em TEMP B-TREE)
+CASES = {
+    "get_dashboard_stats":     (lambda db: db.get_dashboard_stats(FARM),
+                                {"farm_stats.pk", "farm_daily.pk", "farm_month_expense.pk",
+                                 "idx_vaccines_next_due"}, False),
+    "list_movements":          (lambda db: db.list_movements(farm_id=FARM),
+                                {"idx_movements_farm_time"}, True),
+    "list_movements[type]":    (lambda db: db.list_movements("person", farm_id=FARM),
+                                {"idx_movements_farm_time"}, True),
+    "get_last_movement":       (lambda db: db.get_last_movement("animal", 1, FARM),
+                                {"idx_movements_farm_entity"}, True),
+    "get_last_movement[auto]": (lambda db: db.get_last_movement("animal", 1),
+                                {"idx_movements_farm_entity"}, True),
+    "list_upcoming_vaccines":  (lambda db: db.list_upcoming_vaccines(30, FARM),
+                                {"idx_vaccines_next_due"}, True),
+    "list_financials":         (lambda db: db.list_financials(farm_id=FARM),
+                                {"idx_financials_farm_time"}, True),
+    "get_financial_summary":   (lambda db: db.get_financial_summary(6, FARM),
+                                {"idx_financials_farm_time"}, False),
+}
+
+
+def capture_plans(db, call) -> list[tuple[str, list[str]]]:
+    """Executa a chamada e retorna (sql, linhas do plano) de cada SELECT executado."""
+    conn = db.get_read_conn()
+    statements: list[str] = []
+    conn.set_trace_callback(statements.append)
+    try:
+        call(db)
+    finally:
+        conn.set_trace_callback(None)
+    plans = []
+    for sql in statements:
+        if not sql.lstrip().upper().startswith("SELECT"):
+            continue
+        plan = [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql)]
+        plans.append((" ".join(sql.split()), plan))
+    return plans
+
+
+def plan_problems(plans, indexes: set[str], no_sort: bool) -> list[str]:
+    problems = []
+    used = set()
+    for sql, plan in plans:
+        for line in plan:
+            used.update(re.findall(r"INDEX (\w+)", line))
+            used.update(f"{t}.pk" for t in re.findall(r"^SEARCH (\w+) USING (?:INTEGER )?PRIMARY KEY", line))
+            if _FULL_SCAN.match(line):
+                problems.append(f"{line}  <- {sql[:100]}")
+            if no_sort and line == "USE TEMP B-TREE FOR ORDER BY":
+                problems.append(f"ordenação sem índice  <- {sql[:100]}")
+    for name in sorted(indexes - used):
+        problems.append(f"índice {name} não usado")
+    return problems
+
+
+@pytest.mark.parametrize("name", list(CASES))
+def test_query_plan(fresh_db, name):
+    call, indexes, no_sort = CASES[name]
+    plans = capture_plans(fresh_db, call)
+    assert plans, f"{name} não executou nenhum SELECT"
+    problems = plan_problems(plans, indexes, no_sort)
+    assert not problems, "plano de consulta regrediu:\n" + "\n".join(problems)
+
+
+def test_full_scan_is_detected(fresh_db):
+    """A guarda acusa uma consulta sem índice (sanidade do próprio teste)."""
+    plans = capture_plans(fresh_db, lambda db: db.get_read_conn().execute(
+        "SELECT COUNT(*) FROM movements WHERE date(detected_at)=date('now')").fetchone())
+    assert any("SCAN movements" in p for p in plan_problems(plans, set(), False))